@@ -0,0 +1,202 @@
+"""
+Benchmarks of circuit construction, transpilation, simulation and post-processing.
+
+```
+python benchmarks/run_benchmarks.py --output bench.json
+python benchmarks/run_benchmarks.py --output new.json --baseline bench.json --tolerance 0.2
+```
+
+Each record has the benchmark name, its parameters and its metrics: wall times in seconds (`*_time`), the peak resident memory of the process in bytes (`ru_maxrss`, which includes the allocations of Aer, and is the high-water mark of the process so far), and qubit count, gate count and depth of the circuit.
+With `--baseline`, the times are compared with the stored results, and it exits with 1 if any of them regresses more than `--tolerance`.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from qqz.backends import METHODS, configure_backend, get_backend, run, transpile
+from qqz.elementary import adder, adder_modM, ctrl_multi_modM, ax_modM, clear_gate_cache
+from qqz.qft import qft
+from qqz.order_finding import order_finding_circuit, order_finding_width, order_from_measurements
+from qqz.discrete_log import discrete_log_circuit, discrete_log_width, discrete_log_from_measurements
+from qqz.shor import factor_from_order
+from qqz.grover import grover_circuit, sample_oracle
+from qqz.execution import get_counts
+
+
+GRIDS = {
+    'small': {
+        'gate_sizes': [2, 3, 4],
+        'qft_sizes': [4, 8, 16],
+        'order_finding': [(2, 3), (3, 5), (7, 15)],
+        'discrete_log': [(2, 1, 3), (2, 4, 7)],
+        'shor': [(15, 7)],
+        'grover': [3, 4, 5],
+    },
+    'medium': {
+        'gate_sizes': [4, 6, 8],
+        'qft_sizes': [16, 32, 64],
+        'order_finding': [(7, 15), (2, 21), (5, 33)],
+        'discrete_log': [(2, 4, 7), (3, 5, 11)],
+        'shor': [(15, 7), (21, 2)],
+        'grover': [5, 7, 9],
+    },
+}
+
+
+@contextmanager
+def measure(metrics: dict, name: str):
+    """Stores the wall time of the block in `metrics[name + '_time']` and updates `metrics['peak_memory']`.
+    The block is not traced, so that the time is not inflated by tracing.
+    """
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics[f'{name}_time'] = time.perf_counter() - start
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak *= 1 if sys.platform == 'darwin' else 1024 # bytes on macOS, KiB on Linux
+            metrics['peak_memory'] = max(metrics.get('peak_memory', 0), peak)
+
+def circuit_metrics(qc) -> dict:
+    return {'qubits': qc.num_qubits, 'gates': qc.size(), 'depth': qc.depth()}
+
+def bench_gate(name: str, build, **params) -> dict:
+    clear_gate_cache()
+    metrics = {}
+    with measure(metrics, 'build'):
+        gate = build()
+    metrics.update(circuit_metrics(gate.definition))
+    return {'name': name, 'params': params, 'metrics': metrics}
+
+def bench_pipeline(name: str, build, post_process, shots: int, entangled_qubits=None, branches=None, **params) -> dict:
+    clear_gate_cache()
+    metrics = {'shots': shots}
+    with measure(metrics, 'build'):
+        qc = build()
+    backend = get_backend(qc.num_qubits, entangled_qubits, branches)
+    metrics['method'] = backend.options.method
+    with measure(metrics, 'transpile'):
+        qc = transpile(qc, backend)
+    metrics.update(circuit_metrics(qc))
+    with measure(metrics, 'simulate'):
+        hist = get_counts(run(backend, qc, shots=shots))
+    with measure(metrics, 'post_process'):
+        metrics['answer'] = post_process(hist)
+    return {'name': name, 'params': params, 'metrics': metrics}
+
+def run_benchmarks(grid: dict, engine: str, shots: int):
+    for n in grid['gate_sizes']:
+        M = 2 ** n - 1
+        yield bench_gate('adder', lambda: adder(n), n=n)
+        yield bench_gate('adder_modM', lambda: adder_modM(M, n), M=M, N_len=n)
+        yield bench_gate('ctrl_multi_modM', lambda: ctrl_multi_modM(2, M, n), a=2, M=M, N_len=n)
+        yield bench_gate('ax_modM', lambda: ax_modM(2, M, n), a=2, M=M, N_len=n)
+    for n in grid['qft_sizes']:
+        yield bench_gate('qft', lambda: qft(n), n=n)
+
+    for x, N in grid['order_finding']:
+        t = 2 * int(np.ceil(np.log2(N)))
+        yield bench_pipeline(
+            'order_finding',
+            lambda: order_finding_circuit(x=x, N=N, t=t, engine=engine),
+            lambda hist: order_from_measurements(x=x, N=N, t=t, measured_values=hist.sorted().register(0, t).tolist()),
+            shots, *order_finding_width(N=N, t=t, engine=engine)[1:], x=x, N=N, t=t, engine=engine,
+        )
+
+    for a, b, p in grid['discrete_log']:
+        t = int(np.ceil(np.log2(p)))
+        r = next(r for r in range(1, p) if pow(a, r, p) == 1) # the order is computed classically to benchmark this circuit only
+        yield bench_pipeline(
+            'discrete_log',
+            lambda: discrete_log_circuit(a=a, b=b, p=p, t=t, engine=engine),
+            lambda hist: discrete_log_from_measurements(a=a, b=b, p=p, r=r, t=t, measured_values=zip(*[values.tolist() for values in hist.sorted().split([t, t])])),
+            shots, *discrete_log_width(p=p, t=t, engine=engine)[1:], a=a, b=b, p=p, t=t, engine=engine,
+        )
+
+    for N, a in grid['shor']:
+        t = 2 * int(np.ceil(np.log2(N)))
+
+        def post_process(hist):
+            r = order_from_measurements(x=a, N=N, t=t, measured_values=hist.sorted().register(0, t).tolist())
+            return None if r is None else factor_from_order(a, r, N)
+
+        yield bench_pipeline('shor', lambda: order_finding_circuit(x=a, N=N, t=t, engine=engine), post_process, shots, *order_finding_width(N=N, t=t, engine=engine)[1:], N=N, a=a, t=t, engine=engine)
+
+    for N_len in grid['grover']:
+        k_time = int(np.pi / 4 * np.sqrt(2 ** N_len))
+        yield bench_pipeline(
+            'grover',
+            lambda: grover_circuit(N_len, sample_oracle(N_len), 1, k_time),
+            lambda hist: int(hist.sorted().values[0]),
+            shots, N_len=N_len, k_time=k_time,
+        )
+
+def record_key(record: dict) -> str:
+    return json.dumps([record['name'], record['params']], sort_keys=True)
+
+def compare(records: list, baseline: list, tolerance: float) -> list:
+    """Times which are slower than the baseline by more than `tolerance`.
+
+    Returns:
+        tuples of the record key, the metric name, the baseline value and the current value
+    """
+
+    baseline_metrics = {record_key(record): record['metrics'] for record in baseline}
+    regressions = []
+    for record in records:
+        old_metrics = baseline_metrics.get(record_key(record))
+        if old_metrics is None:
+            continue
+        for metric, value in record['metrics'].items():
+            if metric.endswith('_time') and metric in old_metrics and value > old_metrics[metric] * (1 + tolerance):
+                regressions.append((record_key(record), metric, old_metrics[metric], value))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--grid', choices=sorted(GRIDS), default='small')
+    parser.add_argument('--engine', default='vbe')
+    parser.add_argument('--shots', type=int, default=1000)
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--method', choices=METHODS, default='auto')
+    parser.add_argument('--max-parallel-threads', type=int, default=0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    configure_backend(method=args.method, max_parallel_threads=args.max_parallel_threads, seed_simulator=args.seed)
+
+    records = []
+    for record in run_benchmarks(GRIDS[args.grid], args.engine, args.shots):
+        print(record['name'], record['params'], {name: round(value, 4) if isinstance(value, float) else value for name, value in record['metrics'].items()}, flush=True)
+        records.append(record)
+
+    with open(args.output, 'w') as f:
+        json.dump(records, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(records, json.load(f), args.tolerance)
+        for key, metric, old, new in regressions:
+            print(f'REGRESSION {key} {metric}: {old:.4f}s -> {new:.4f}s')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,77 @@
 .. include:: ../README.md
 """
 
-from .classical_utils import *
-from .discrete_log import *
-from .elementary import *
-from .grover import *
-from .order_finding import *
-from .qft import *
-from .shor import *
+import importlib
+import sys
+import types
+
+
+_SUBMODULES = (
+    'backends',
+    'beauregard',
+    'branch',
+    'circuit_cache',
+    'classical_utils',
+    'counts',
+    'discrete_log',
+    'elementary',
+    'emulation',
+    'execution',
+    'grover',
+    'modexp',
+    'order_finding',
+    'qft',
+    'resources',
+    'result',
+    'reversible',
+    'shor',
+    'sweep',
+)
+
+# the attributes of the package and their submodules, which are imported on first access
+_ATTRIBUTES = {
+    **dict.fromkeys(['BranchSimulator'], 'branch'),
+    **dict.fromkeys(['configure_backend', 'reset_backend', 'backend_options', 'select_method', 'get_backend'], 'backends'),
+    **dict.fromkeys(['lcm', 'decode_bin', 'convergents', 'batch_convergents', 'factorize', 'multiplicative_order', 'baby_step_giant_step'], 'classical_utils'),
+    **dict.fromkeys(['Counts'], 'counts'),
+    **dict.fromkeys(['discrete_log_from_measurements', 'discrete_log_width', 'discrete_log_target_circuit', 'discrete_log_base_circuit', 'discrete_log_circuit', 'discrete_log', 'discrete_log_many', 'discrete_log_multi'], 'discrete_log'),
+    **dict.fromkeys(['GATE_CACHE_MAXSIZE', 'cached_gate', 'gate_cache_info', 'clear_gate_cache', 'carry', 'qsum', 'adder', 'adder_modM', 'ctrl_multi_modM', 'ctrl_ua_modM', 'ax_modM', 'window_multi_modM', 'window_ua_modM', 'ax_modM_windowed', 'ax_modM_ops', 'append_ops', 'inverse_ops'], 'elementary'),
+    **dict.fromkeys(['MCZ_MODES', 'mcz_ancillas', 'grover_circuit', 'grover', 'optimal_k_time', 'grover_statevector', 'grover_emulated', 'verify_oracle', 'sample_oracle', 'sample_predicate'], 'grover'),
+    **dict.fromkeys(['OrderNotFoundError', 'append_semi_classical_phase_estimation', 'order_from_measurements', 'order_finding_width', 'order_finding_circuit', 'order_finding', 'order_finding_many', 'cached_order_finding', 'known_order', 'remember_order', 'clear_order_cache'], 'order_finding'),
+    **dict.fromkeys(['qft', 'qft_ops', 'qft_fidelity_bound'], 'qft'),
+    **dict.fromkeys(['REVERSIBLE_GATES', 'reversible_ops', 'simulate_registers'], 'reversible'),
+    **dict.fromkeys(['factor_from_order', 'shor'], 'shor'),
+    **dict.fromkeys(['shor_instances', 'order_finding_instances', 'discrete_log_instances', 'grover_instances', 'run_instance', 'load_records', 'sweep', 'plot_records'], 'sweep'),
+}
+
+__all__ = list(_ATTRIBUTES)
+
+# the functions named after their submodules, which win over the submodules as before
+_SHADOWING_FUNCTIONS = [name for name in _ATTRIBUTES if name in _SUBMODULES]
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name: str, value):
+        # importing a submodule binds it to the package, even if it is imported directly (e.g. `import qqz.shor`)
+        if name in _SHADOWING_FUNCTIONS and isinstance(value, types.ModuleType):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+sys.modules[__name__].__class__ = _Package
+
+
+def __getattr__(name: str):
+    """Imports a submodule on first access of it or of its attribute, so that `import qqz` does not import qiskit, Aer or matplotlib until they are needed."""
+
+    if name in _ATTRIBUTES:
+        value = getattr(importlib.import_module(f'.{_ATTRIBUTES[name]}', __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_ATTRIBUTES) | set(_SUBMODULES))
@@ -0,0 +1,181 @@
+r"""
+Pooled and configured simulators (Aer, and `branch.BranchSimulator`) shared by `order_finding`, `discrete_log` and `grover`
+
+```
+>>> from qqz.backends import configure_backend
+>>> configure_backend(max_parallel_threads=4, seed_simulator=1234)
+>>> order_finding(x=7, N=15)
+4
+```
+
+The simulation method is chosen per circuit by `select_method` unless it is fixed by `configure_backend(method=...)`.
+"""
+
+from typing import Any, Dict, Optional
+
+
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    'method': 'auto',
+    'max_statevector_qubits': 24,
+    'max_parallel_threads': 0,
+    'max_parallel_experiments': 1,
+    'fusion_enable': True,
+    'matrix_product_state_truncation_threshold': 1e-16,
+    'precision': 'double',
+    'seed_simulator': None,
+    'max_branches': 2 ** 24,
+}
+"""The options of `configure_backend` by default. `max_parallel_threads=0` uses all the cores"""
+
+METHODS = ('auto', 'statevector', 'matrix_product_state', 'branch')
+
+# the options which are not passed to `AerSimulator`
+_SELECTION_OPTIONS = ('method', 'max_statevector_qubits', 'seed_simulator', 'max_branches')
+
+_options: Dict[str, Any] = dict(DEFAULT_OPTIONS)
+_pool: Dict[str, Any] = {}
+_runs = 0
+
+
+def configure_backend(**options):
+    """Updates the options of the simulators returned by `get_backend` after this. The pooled simulators are discarded, unless only `seed_simulator` changes, which is applied by `run`.
+
+    Args:
+        options: any of `DEFAULT_OPTIONS`:
+
+            * `method`: one of `METHODS`. `'auto'` chooses one for each circuit by `select_method`
+            * `max_statevector_qubits`: the largest width simulated by the statevector method in `'auto'`
+            * `max_parallel_threads`, `max_parallel_experiments`, `fusion_enable`, `matrix_product_state_truncation_threshold` and `precision`: passed to `AerSimulator`
+            * `seed_simulator`: if not None, the $i$-th run of `run` after this is seeded by `seed_simulator + i`, so that a sequence of runs (e.g. the batches of `execution.run_and_post_process`) is reproducible
+            * `max_branches`: passed to `branch.BranchSimulator`
+    """
+
+    global _runs
+
+    unknown_options = set(options) - set(DEFAULT_OPTIONS)
+    if unknown_options:
+        raise ValueError(f'unknown options: {sorted(unknown_options)}')
+    if options.get('method', _options['method']) not in METHODS:
+        raise ValueError(f'method must be one of {METHODS}, but {options["method"]!r} is given')
+
+    if any(name != 'seed_simulator' and _options[name] != value for name, value in options.items()):
+        _pool.clear()
+    _options.update(options)
+    _runs = 0
+
+def reset_backend():
+    """Restores `DEFAULT_OPTIONS` and discards the pooled simulators."""
+
+    configure_backend(**DEFAULT_OPTIONS)
+
+def backend_options() -> Dict[str, Any]:
+    """The current options of `configure_backend`.
+
+    Returns:
+        a copy of the options
+    """
+
+    return dict(_options)
+
+def select_method(num_qubits: int, entangled_qubits: Optional[int] = None, branches: Optional[int] = None) -> str:
+    r"""Chooses the simulation method of a circuit by the estimated memory of each method.
+    The statevector method holds $2^n$ amplitudes whatever the entanglement is, and the matrix product state method holds about $2n\chi^2$ with the bond dimension $\chi\le 2^{\lfloor e/2\rfloor}$ when only $e$ qubits are entangled (e.g. the registers of phase estimation, but not the auxiliary qubits of the arithmetic which are uncomputed).
+    The branch method holds $b$ amplitudes and $b$ basis states of $n$ bits if the state is a superposition of at most $b$ basis states.
+
+    Args:
+        num_qubits (int): the width $n$ of the circuit
+        entangled_qubits (Optional[int]): a number $e$ of qubits which can be entangled. If None, all the qubits are assumed to be
+        branches (Optional[int]): the bound $b$ if the circuit is supported by `branch.BranchSimulator`, otherwise None
+
+    Returns:
+        `'statevector'` if $n$ is at most `max_statevector_qubits` and it needs no more memory than the matrix product state method, otherwise the one of `'branch'` and `'matrix_product_state'` which needs less memory. The configured method if it is not `'auto'`
+    """
+
+    if _options['method'] != 'auto':
+        return _options['method']
+
+    if entangled_qubits is None:
+        entangled_qubits = num_qubits
+    statevector_memory = 2 ** num_qubits
+    matrix_product_state_memory = 2 * num_qubits * 4 ** (min(entangled_qubits, num_qubits) // 2)
+
+    if num_qubits <= _options['max_statevector_qubits'] and statevector_memory <= matrix_product_state_memory:
+        return 'statevector'
+    if branches is not None and branches * (1 + num_qubits / 128) <= matrix_product_state_memory: # a basis state of $n$ bits is $n/128$ of a complex amplitude
+        return 'branch'
+    return 'matrix_product_state'
+
+def get_backend(num_qubits: Optional[int] = None, entangled_qubits: Optional[int] = None, branches: Optional[int] = None, method: Optional[str] = None):
+    """An `AerSimulator` (or a `branch.BranchSimulator` for `'branch'`) with the options of `configure_backend`, which is created once for each method and reused.
+
+    Args:
+        num_qubits (Optional[int]): the width of the circuit to run, which is required to choose the method by `select_method`
+        entangled_qubits (Optional[int]): see `select_method`
+        branches (Optional[int]): see `select_method`
+        method (Optional[str]): the method, which overrides the configured one
+
+    Returns:
+        the simulator
+    """
+
+    if method is None or method == 'auto':
+        if _options['method'] == 'auto' and num_qubits is None:
+            raise ValueError('num_qubits is required to choose the method')
+        method = select_method(num_qubits, entangled_qubits, branches)
+    if method not in METHODS:
+        raise ValueError(f'method must be one of {METHODS}, but {method!r} is given')
+
+    if method == 'branch' and method not in _pool:
+        from .branch import BranchSimulator
+
+        _pool[method] = BranchSimulator(max_branches=_options['max_branches'])
+    if method not in _pool:
+        try:
+            from qiskit_aer import AerSimulator
+        except ImportError: # qiskit-aer < 0.11
+            from qiskit.providers.aer import AerSimulator
+
+        simulator_options = {name: value for name, value in _options.items() if name not in _SELECTION_OPTIONS}
+        _pool[method] = AerSimulator(method=method, **simulator_options)
+    return _pool[method]
+
+def run(backend, circuits, shots: int):
+    """Runs transpiled circuits, seeded by the configured `seed_simulator`.
+
+    Args:
+        backend: a simulator of `get_backend`, or a backend-like object such as `emulation.EmulatedBackend`
+        circuits: a transpiled circuit or a list of them
+        shots (int): the number of shots of each circuit
+
+    Returns:
+        the job
+    """
+
+    global _runs
+
+    if _options['seed_simulator'] is None:
+        return backend.run(circuits, shots=shots)
+
+    seed = _options['seed_simulator'] + _runs
+    _runs += 1
+    return backend.run(circuits, shots=shots, seed_simulator=seed)
+
+def transpile(circuits, backend):
+    """Transpiles circuits for a backend of `get_backend`. `branch.BranchSimulator` runs them as they are.
+
+    Args:
+        circuits: a circuit or a list of them
+        backend: the backend
+
+    Returns:
+        the transpiled circuits
+    """
+
+    from .branch import BranchSimulator
+
+    if isinstance(backend, BranchSimulator):
+        return circuits
+
+    from qiskit import transpile as qiskit_transpile
+
+    return qiskit_transpile(circuits, backend)
@@ -0,0 +1,258 @@
+r"""
+Implementing [arXiv:quant-ph/0205095](https://arxiv.org/abs/quant-ph/0205095), the arithmetic in the Fourier basis by Draper and Beauregard.
+
+Classical numbers such as $a$ and $M$ are added as phases, so no register holds them.
+A controlled $U_a$ (`ctrl_ua_modM_qft`) requires $2n+3$ qubits, while `elementary.ctrl_ua_modM` requires $9n-1$ qubits.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from qiskit import QuantumCircuit, QuantumRegister
+from qiskit.circuit import Gate, Instruction
+from qiskit.circuit.library import PhaseGate, MCPhaseGate, XGate, CXGate, CSwapGate
+
+from .qft import qft, qft_ops
+from .elementary import cached_gate, append_ops, block_ops
+
+
+@cached_gate
+def phi_adder(a: int, n: int, num_ctrl: int = 0) -> Gate:
+    r"""$\phi\mathrm{ADD}(a)$: $\phi(b)\to\phi(a+b)$, where $\phi(b)$ is the QFT of $b$. It requires $\mathit{num\_ctrl}+n+1$ qubits: the controls use $\mathit{num\_ctrl}$ qubits and $\phi(b)$ uses $n+1$ qubits.
+
+    Args:
+        a (int): $a$
+        n (int): $n$ bits for representing $a$ and $b$. The extra qubit of $\phi(b)$ holds the overflow
+        num_ctrl (int): a number of control qubits
+
+    Returns:
+        its gate
+    """
+
+    qc = QuantumCircuit(QuantumRegister(num_ctrl + n + 1))
+    append_ops(qc, phi_adder_ops(qc.qubits, a, n, num_ctrl))
+    return qc.to_gate()
+
+def phi_adder_ops(qubits: Sequence, a: int, n: int, num_ctrl: int = 0) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `phi_adder` on the given qubits (see `elementary.append_ops`).
+
+    Args:
+        qubits (Sequence): $\mathit{num\_ctrl}+n+1$ qubits in the order of `phi_adder`
+        a (int): see `phi_adder`
+        n (int): see `phi_adder`
+        num_ctrl (int): see `phi_adder`
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    qubits = list(qubits)
+    ctrl, b = qubits[:num_ctrl], qubits[num_ctrl:]
+
+    ops = []
+    for j, qubit in enumerate(b):
+        angle = 2 * np.pi * a * 2 ** j / 2 ** (n + 1)
+        angle = angle % (2 * np.pi)
+        if angle == 0:
+            continue
+        if num_ctrl == 0:
+            ops.append((PhaseGate(angle), [qubit]))
+        else:
+            ops.append((MCPhaseGate(angle, num_ctrl), ctrl + [qubit]))
+
+    return ops
+
+@cached_gate
+def phi_adder_modM(a: int, M: int, n: int) -> Gate:
+    r"""Doubly controlled $\phi\mathrm{ADD}(a)\mathrm{MOD}(M)$: $\phi(b)\to\phi(a+b\mod M)$ if both controls are 1. It requires $n+4$ qubits: the controls use 2 qubits, $\phi(b)$ uses $n+1$ qubits, and the ancilla uses 1 qubit.
+
+    Args:
+        a (int): $a<M$
+        M (int): $M<2^n$
+        n (int): $n$ bits for representing $a$, $b$ and $M$
+
+    Returns:
+        its gate
+    """
+
+    qc = QuantumCircuit(QuantumRegister(2 + n + 1 + 1))
+    append_ops(qc, phi_adder_modM_ops(qc.qubits, a, M, n, flat=False))
+    return qc.to_gate()
+
+def phi_adder_modM_ops(qubits: Sequence, a: int, M: int, n: int, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `phi_adder_modM` on the given qubits.
+
+    Args:
+        qubits (Sequence): $n+4$ qubits in the order of `phi_adder_modM`
+        a (int): see `phi_adder_modM`
+        M (int): see `phi_adder_modM`
+        n (int): see `phi_adder_modM`
+        flat (bool): if True, `phi_adder` and `qft.qft` are inlined, otherwise they are nested gates (see `elementary.block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    qubits = list(qubits)
+    ctrl, left_qubits = qubits[:2], qubits[2:]
+    b, left_qubits = left_qubits[:n + 1], left_qubits[n + 1:]
+    anc = left_qubits[:1]
+
+    ops = []
+    ops += block_ops(phi_adder, phi_adder_ops, ctrl + b, (a, n, 2), flat=flat)
+    ops += block_ops(phi_adder, phi_adder_ops, b, (M, n), flat=flat, inverse=True)
+    ops += block_ops(qft, qft_ops, b, (n + 1,), flat=flat, inverse=True)
+    ops.append((CXGate(), [b[-1], anc[0]]))
+    ops += block_ops(qft, qft_ops, b, (n + 1,), flat=flat)
+    ops += block_ops(phi_adder, phi_adder_ops, anc + b, (M, n, 1), flat=flat)
+
+    ops += block_ops(phi_adder, phi_adder_ops, ctrl + b, (a, n, 2), flat=flat, inverse=True)
+    ops += block_ops(qft, qft_ops, b, (n + 1,), flat=flat, inverse=True)
+    ops.append((XGate(), [b[-1]]))
+    ops.append((CXGate(), [b[-1], anc[0]]))
+    ops.append((XGate(), [b[-1]]))
+    ops += block_ops(qft, qft_ops, b, (n + 1,), flat=flat)
+    ops += block_ops(phi_adder, phi_adder_ops, ctrl + b, (a, n, 2), flat=flat)
+
+    return ops
+
+@cached_gate
+def ctrl_multi_modM_qft(a: int, M: int, n: int) -> Gate:
+    r"""CMULT(a)MOD(M): $x,b\to x,b+ax\mod M$ if $\mathit{ctrl}=1$, otherwise $x,b\to x,b$. It requires $2n+3$ qubits: $\mathit{ctrl}$ uses 1 qubit, $x$ uses $n$ qubits, $b$ uses $n+1$ qubits, and the ancilla of `phi_adder_modM` uses 1 qubit.
+
+    Args:
+        a (int): $a$
+        M (int): $M<2^n$
+        n (int): $n$ bits for representing $x$ and $b$
+
+    Returns:
+        its gate
+    """
+
+    qc = QuantumCircuit(QuantumRegister(1 + n + n + 1 + 1))
+    append_ops(qc, ctrl_multi_modM_qft_ops(qc.qubits, a, M, n, flat=False))
+    return qc.to_gate()
+
+def ctrl_multi_modM_qft_ops(qubits: Sequence, a: int, M: int, n: int, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `ctrl_multi_modM_qft` on the given qubits.
+
+    Args:
+        qubits (Sequence): $2n+3$ qubits in the order of `ctrl_multi_modM_qft`
+        a (int): see `ctrl_multi_modM_qft`
+        M (int): see `ctrl_multi_modM_qft`
+        n (int): see `ctrl_multi_modM_qft`
+        flat (bool): if True, `phi_adder_modM` and `qft.qft` are inlined, otherwise they are nested gates (see `elementary.block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    qubits = list(qubits)
+    ctrl, left_qubits = qubits[:1], qubits[1:]
+    x, left_qubits = left_qubits[:n], left_qubits[n:]
+    b, left_qubits = left_qubits[:n + 1], left_qubits[n + 1:]
+    anc = left_qubits[:1]
+
+    ops = []
+    ops += block_ops(qft, qft_ops, b, (n + 1,), flat=flat)
+    for i in range(n):
+        ops += block_ops(phi_adder_modM, phi_adder_modM_ops, ctrl + [x[i]] + b + anc, (2 ** i * a % M, M, n), flat=flat)
+    ops += block_ops(qft, qft_ops, b, (n + 1,), flat=flat, inverse=True)
+
+    return ops
+
+@cached_gate
+def ctrl_ua_modM_qft(a: int, M: int, n: int) -> Gate:
+    r"""Ctrl $U_a$: $x,0\to ax\mod M,0$ if $\mathit{ctrl}=1$, otherwise $x,0\to x,0$. It requires $2n+3$ qubits in the same order as `ctrl_multi_modM_qft`.
+
+    Args:
+        a (int): $a$, which must be coprime to $M$
+        M (int): $M<2^n$
+        n (int): $n$ bits for representing $x$
+
+    Returns:
+        its gate
+    """
+
+    qc = QuantumCircuit(QuantumRegister(2 * n + 3))
+    append_ops(qc, ctrl_ua_modM_qft_ops(qc.qubits, a, M, n, flat=False))
+    return qc.to_gate()
+
+def ctrl_ua_modM_qft_ops(qubits: Sequence, a: int, M: int, n: int, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `ctrl_ua_modM_qft` on the given qubits.
+
+    Args:
+        qubits (Sequence): $2n+3$ qubits in the order of `ctrl_multi_modM_qft`
+        a (int): see `ctrl_ua_modM_qft`
+        M (int): see `ctrl_ua_modM_qft`
+        n (int): see `ctrl_ua_modM_qft`
+        flat (bool): if True, `ctrl_multi_modM_qft` is inlined, otherwise it is a nested gate (see `elementary.block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    qubits = list(qubits)
+    ctrl, left_qubits = qubits[:1], qubits[1:]
+    x, left_qubits = left_qubits[:n], left_qubits[n:]
+    b = left_qubits[:n + 1]
+
+    ops = []
+    ops += block_ops(ctrl_multi_modM_qft, ctrl_multi_modM_qft_ops, qubits, (a, M, n), flat=flat)
+    ops += [(CSwapGate(), [ctrl[0], x[j], b[j]]) for j in range(n)]
+    ops += block_ops(ctrl_multi_modM_qft, ctrl_multi_modM_qft_ops, qubits, (pow(a, -1, M), M, n), flat=flat, inverse=True)
+
+    return ops
+
+@cached_gate
+def ax_modM_qft(a: int, M: int, x_len: int, n: Optional[int] = None, x_0_at_first: bool = True) -> Gate:
+    r"""Modular exponentiation, $a^x\mod M$, by `ctrl_ua_modM_qft`. It requires $x_\mathit{len}+2n+2$ qubits: $x$ uses $x_\mathit{len}$ qubits, $y$ uses $n$ qubits, $b$ uses $n+1$ qubits, and the ancilla of `phi_adder_modM` uses 1 qubit.
+
+    Args:
+        a (int): $a$
+        M (int): $M<2^n$
+        x_len (int): a number of bits for representing $x$
+        n (Optional[int]): a number of bits for representing $y$. If None, $\lceil\log_2 M\rceil$
+        x_0_at_first (bool): if True, it adds 1 into the target register before calculating modular exponentiation
+
+    Returns:
+        its gate
+    """
+
+    if n is None:
+        n = int(np.ceil(np.log2(M)))
+
+    qc = QuantumCircuit(QuantumRegister(x_len + 2 * n + 2))
+    append_ops(qc, ax_modM_qft_ops(qc.qubits, a, M, x_len, n, x_0_at_first, flat=False))
+    return qc.to_gate()
+
+def ax_modM_qft_ops(qubits: Sequence, a: int, M: int, x_len: int, n: Optional[int] = None, x_0_at_first: bool = True, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `ax_modM_qft` on the given qubits.
+
+    Args:
+        qubits (Sequence): $x_\mathit{len}+2n+2$ qubits in the order of `ax_modM_qft`
+        a (int): see `ax_modM_qft`
+        M (int): see `ax_modM_qft`
+        x_len (int): see `ax_modM_qft`
+        n (Optional[int]): see `ax_modM_qft`
+        x_0_at_first (bool): see `ax_modM_qft`
+        flat (bool): if True, `ctrl_ua_modM_qft` is inlined, otherwise it is a nested gate (see `elementary.block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    if n is None:
+        n = int(np.ceil(np.log2(M)))
+
+    qubits = list(qubits)
+    x, left_qubits = qubits[:x_len], qubits[x_len:]
+    y = left_qubits[:n]
+
+    ops = []
+    if x_0_at_first:
+        ops.append((XGate(), [y[0]]))
+    for i in range(x_len):
+        ops += block_ops(ctrl_ua_modM_qft, ctrl_ua_modM_qft_ops, [x[i]] + left_qubits, (pow(a, 2 ** i, M), M, n), flat=flat)
+
+    return ops
@@ -0,0 +1,340 @@
+r"""
+Sparse simulation of circuits whose state stays a superposition of few basis states, e.g. `order_finding.order_finding_circuit`.
+
+The state is kept as a list of basis states (branches) and their amplitudes, so the width of the circuit does not matter:
+
+* H (or another gate on a qubit which is not diagonal) doubles the branches, which are merged if they interfere
+* X, CX, CCX, CSWAP and SWAP, and the gates made of them (e.g. `elementary.ax_modM`), are evaluated on all the branches at once by `reversible.simulate`
+* unitary gates which are permutation matrices (e.g. `modexp.ctrl_multi_modM_permutation`) map the indices of the branches
+* diagonal gates (Z, S, T, P, CZ and CP) multiply the amplitudes
+* `qft.qft` and its inverse are deferred to the measurement, where the state is grouped by the other qubits and transformed by an FFT for each group that is sampled
+
+Mid-circuit measurements, resets and classically conditioned gates (e.g. the semi-classical circuits) are not supported.
+"""
+
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from qiskit import QuantumCircuit
+
+from .reversible import REVERSIBLE_GATES, reversible_ops, simulate
+
+
+DEFAULT_MAX_BRANCHES = 2 ** 24
+"""The maximum number of branches, and of the amplitudes transformed at once by an FFT, by default"""
+
+_PHASES = {'z': np.pi, 's': np.pi / 2, 'sdg': -np.pi / 2, 't': np.pi / 4, 'tdg': -np.pi / 4, 'cz': np.pi}
+
+_TOLERANCE = 1e-24 # branches whose probabilities are below this are dropped after interference
+
+
+def _to_planes(bits: np.ndarray) -> np.ndarray:
+    words = -(-bits.shape[1] // 64)
+    packed = np.packbits(bits, axis=1, bitorder='little')
+    packed = np.pad(packed, ((0, 0), (0, 8 * words - packed.shape[1])))
+    return packed.view(np.uint64)
+
+def _from_planes(planes: np.ndarray, size: int) -> np.ndarray:
+    return np.unpackbits(np.ascontiguousarray(planes).view(np.uint8), axis=1, bitorder='little')[:, :size]
+
+def _values(bits: np.ndarray) -> np.ndarray:
+    """Integers of the rows of bits, the first row being the least significant"""
+
+    return (bits.astype(np.int64) << np.arange(len(bits), dtype=np.int64)[:, None]).sum(axis=0)
+
+def _unique_columns(bits: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct columns of bits, and the index of each column among them"""
+
+    if len(bits) == 0:
+        return np.zeros((0, 1), dtype=np.uint8), np.zeros(bits.shape[1], dtype=np.int64)
+    rows = np.packbits(bits.T, axis=1)
+    unique_rows, inverse = np.unique(rows, axis=0, return_inverse=True)
+    return np.unpackbits(unique_rows, axis=1, count=len(bits)).T, inverse.ravel()
+
+
+class BranchState:
+    r"""The state of `BranchSimulator`: a basis state of all the qubits (a column of `bits`) and its amplitude for each branch, and the QFTs which are not applied yet.
+
+    Args:
+        num_qubits (int): a number of qubits
+        max_branches (int): see `BranchSimulator`
+    """
+
+    def __init__(self, num_qubits: int, max_branches: int = DEFAULT_MAX_BRANCHES):
+        self.num_qubits = num_qubits
+        self.max_branches = max_branches
+        self.bits = np.zeros((num_qubits, 1), dtype=np.uint8)
+        self.amplitudes = np.ones(1, dtype=complex)
+        self.pending_qfts: List[Tuple[List[int], bool]] = [] # qubits and whether it is inverse
+        self.max_branches_used = 1
+
+        self._ops: List[List[int]] = [] # reversible gates which are not applied yet
+        self._reversible_ops: Dict[int, Optional[np.ndarray]] = {}
+        self._permutations: Dict[int, np.ndarray] = {}
+
+    def apply_circuit(self, qc: QuantumCircuit, qubit_indices: Optional[List[int]] = None, measured: Optional[Dict[int, int]] = None) -> Dict[int, int]:
+        """Applies the gates of a circuit.
+
+        Args:
+            qc (QuantumCircuit): the circuit
+            qubit_indices (Optional[List[int]]): the qubits of this state on which the qubits of `qc` act. If None, they are the same
+            measured (Optional[Dict[int, int]]): the measured qubit of each clbit so far, which is updated
+
+        Returns:
+            the measured qubit of each clbit
+        """
+
+        if qubit_indices is None:
+            qubit_indices = list(range(qc.num_qubits))
+        if measured is None:
+            measured = {}
+
+        for instruction in qc.data:
+            operation = instruction.operation
+            qubits = [qubit_indices[qc.find_bit(qubit).index] for qubit in instruction.qubits]
+            name = operation.name
+
+            if name == 'barrier':
+                continue
+            if getattr(operation, 'condition', None) is not None or name == 'reset':
+                raise ValueError(f'{name} with a classical condition or a reset is not supported')
+            if set(qubits) & set(measured.values()) and name != 'measure':
+                raise ValueError('gates after a measurement are not supported')
+            if name == 'measure':
+                measured[qc.find_bit(instruction.clbits[0]).index] = qubits[0]
+                continue
+
+            if name in ('qft', 'qft_dg'):
+                self._defer_qft(qubits, inverse=name == 'qft_dg')
+                continue
+
+            self._apply_pending_qfts(qubits)
+            if name in REVERSIBLE_GATES:
+                self._ops.append([REVERSIBLE_GATES[name]] + qubits + [0] * (3 - len(qubits)))
+            elif name == 'swap':
+                self._ops.append([REVERSIBLE_GATES['cx'], qubits[0], qubits[1], 0])
+                self._ops.append([REVERSIBLE_GATES['cx'], qubits[1], qubits[0], 0])
+                self._ops.append([REVERSIBLE_GATES['cx'], qubits[0], qubits[1], 0])
+            elif name in _PHASES or name in ('p', 'cp', 'u1'):
+                self._phase(qubits, _PHASES[name] if name in _PHASES else float(operation.params[0]))
+            elif name == 'unitary' and len(qubits) > 1:
+                self._permute(qubits, self._permutation(operation))
+            elif len(qubits) == 1 and hasattr(operation, 'to_matrix'):
+                self._single_qubit_gate(qubits[0], np.asarray(operation.to_matrix()))
+            elif operation.definition is not None:
+                ops = self._flattened(operation.definition)
+                if ops is None:
+                    self.apply_circuit(operation.definition, qubits, measured)
+                else:
+                    mapped_ops = ops.copy()
+                    mapped_ops[:, 1:] = np.array(qubits, dtype=np.int64)[ops[:, 1:]]
+                    self._ops.extend(mapped_ops.tolist())
+            else:
+                raise ValueError(f'{name} is not supported')
+
+        return measured
+
+    def sample_counts(self, qc: QuantumCircuit, measured: Dict[int, int], shots: int, rng: np.random.Generator) -> Dict[str, int]:
+        """Samples the measured clbits. The branches are grouped by the qubits out of the deferred QFTs, and each group sampled is transformed by an FFT.
+
+        Args:
+            qc (QuantumCircuit): the circuit, whose classical registers determine the format of the bitstrings
+            measured (Dict[int, int]): the measured qubit of each clbit
+            shots (int): the number of shots
+            rng (np.random.Generator): the random generator
+
+        Returns:
+            a dict from bitstrings (with a space between classical registers, as Aer) to their counts
+        """
+
+        self._flush()
+
+        qft_qubits = [qubit for qubits, _ in self.pending_qfts for qubit in qubits]
+        rest_qubits = [qubit for qubit in range(self.num_qubits) if qubit not in set(qft_qubits)]
+        group_bits, groups = _unique_columns(self.bits[rest_qubits])
+        probabilities = np.bincount(groups, weights=np.abs(self.amplitudes) ** 2, minlength=group_bits.shape[1])
+        group_shots = rng.multinomial(shots, probabilities / probabilities.sum())
+
+        outcomes = [] # columns of all the qubits
+        outcome_counts = []
+        for group in np.flatnonzero(group_shots):
+            in_group = groups == group
+            shape = [2 ** len(qubits) for qubits, _ in self.pending_qfts]
+            if int(np.prod(shape)) > self.max_branches:
+                raise ValueError(f'the QFTs on {len(qft_qubits)} qubits exceed max_branches={self.max_branches}')
+
+            if not self.pending_qfts: # the group is a single basis state
+                dense = np.array(self.amplitudes[in_group].sum(), dtype=complex)
+            else:
+                dense = np.zeros(shape, dtype=complex)
+                dense[tuple(_values(self.bits[qubits][:, in_group]) for qubits, _ in self.pending_qfts)] = self.amplitudes[in_group]
+            for axis, (_, inverse) in enumerate(self.pending_qfts):
+                dense = np.fft.fft(dense, axis=axis, norm='ortho') if inverse else np.fft.ifft(dense, axis=axis, norm='ortho')
+
+            dense_probabilities = np.abs(dense.ravel()) ** 2
+            dense_counts = rng.multinomial(group_shots[group], dense_probabilities / dense_probabilities.sum())
+            for index in np.flatnonzero(dense_counts):
+                column = np.zeros(self.num_qubits, dtype=np.uint8)
+                column[rest_qubits] = group_bits[:, group]
+                for (qubits, _), value in zip(self.pending_qfts, np.unravel_index(index, shape)):
+                    column[qubits] = (int(value) >> np.arange(len(qubits))) & 1
+                outcomes.append(column)
+                outcome_counts.append(int(dense_counts[index]))
+
+        counts: Dict[str, int] = {}
+        for column, count in zip(outcomes, outcome_counts):
+            clbits = [0] * qc.num_clbits
+            for clbit, qubit in measured.items():
+                clbits[clbit] = int(column[qubit])
+            registers = []
+            for register in reversed(qc.cregs):
+                registers.append(''.join(str(clbits[qc.find_bit(clbit).index]) for clbit in reversed(register)))
+            key = ' '.join(registers)
+            counts[key] = counts.get(key, 0) + count
+        return counts
+
+    def _flattened(self, definition: QuantumCircuit) -> Optional[np.ndarray]:
+        if id(definition) not in self._reversible_ops:
+            try:
+                self._reversible_ops[id(definition)] = reversible_ops(definition)
+            except ValueError: # e.g. it has a permutation matrix
+                self._reversible_ops[id(definition)] = None
+        return self._reversible_ops[id(definition)]
+
+    def _permutation(self, operation) -> np.ndarray:
+        if id(operation) not in self._permutations:
+            matrix = np.asarray(operation.to_matrix())
+            permutation = np.argmax(np.abs(matrix), axis=0) # column $j$ is moved to row permutation[j]
+            if not np.allclose(matrix[permutation, np.arange(len(matrix))], 1) or len(set(permutation)) != len(permutation):
+                raise ValueError('unitary gates other than permutation matrices are not supported')
+            self._permutations[id(operation)] = permutation
+        return self._permutations[id(operation)]
+
+    def _flush(self):
+        if self._ops:
+            planes = _to_planes(self.bits)
+            simulate(np.array(self._ops, dtype=np.int64), planes)
+            self.bits = _from_planes(planes, self.bits.shape[1])
+            self._ops = []
+
+    def _set_branches(self, bits: np.ndarray, amplitudes: np.ndarray, merge: bool):
+        if merge:
+            bits, inverse = _unique_columns(bits)
+            amplitudes = np.bincount(inverse, weights=amplitudes.real) + 1j * np.bincount(inverse, weights=amplitudes.imag)
+            kept = np.abs(amplitudes) ** 2 > _TOLERANCE
+            bits, amplitudes = bits[:, kept], amplitudes[kept]
+        if bits.shape[1] > self.max_branches:
+            raise ValueError(f'{bits.shape[1]} branches exceed max_branches={self.max_branches}')
+        self.bits = np.ascontiguousarray(bits)
+        self.amplitudes = amplitudes
+        self.max_branches_used = max(self.max_branches_used, bits.shape[1])
+
+    def _single_qubit_gate(self, qubit: int, matrix: np.ndarray):
+        self._flush()
+        old_bits = self.bits[qubit].copy()
+        if matrix[0, 1] == 0 and matrix[1, 0] == 0:
+            self.amplitudes = matrix[old_bits, old_bits] * self.amplitudes
+            return
+
+        bits = np.concatenate([self.bits, self.bits], axis=1)
+        bits[qubit] = np.repeat(np.array([0, 1], dtype=np.uint8), self.bits.shape[1])
+        amplitudes = np.concatenate([matrix[0, old_bits] * self.amplitudes, matrix[1, old_bits] * self.amplitudes])
+        self._set_branches(bits, amplitudes, merge=bool(old_bits.any() and not old_bits.all())) # they interfere only if the qubit is not constant
+
+    def _phase(self, qubits: List[int], phase: float):
+        self._flush()
+        self.amplitudes = np.where(np.all(self.bits[qubits] == 1, axis=0), np.exp(1j * phase), 1) * self.amplitudes
+
+    def _permute(self, qubits: List[int], permutation: np.ndarray):
+        self._flush()
+        values = permutation[_values(self.bits[qubits])]
+        self.bits[qubits] = (values >> np.arange(len(qubits))[:, None]) & 1
+
+    def _defer_qft(self, qubits: List[int], inverse: bool):
+        self._apply_pending_qfts(qubits)
+        self.pending_qfts.append((qubits, inverse))
+
+    def _apply_pending_qfts(self, qubits: List[int]):
+        """Applies the deferred QFTs overlapping with the qubits, group by group of the other qubits"""
+
+        for qft_qubits, inverse in list(self.pending_qfts):
+            if not set(qft_qubits) & set(qubits):
+                continue
+            self.pending_qfts.remove((qft_qubits, inverse))
+            self._flush()
+
+            rest_qubits = [qubit for qubit in range(self.num_qubits) if qubit not in set(qft_qubits)]
+            group_bits, groups = _unique_columns(self.bits[rest_qubits])
+            if group_bits.shape[1] * 2 ** len(qft_qubits) > self.max_branches:
+                raise ValueError(f'the QFT on {len(qft_qubits)} qubits exceeds max_branches={self.max_branches}')
+
+            dense = np.zeros((group_bits.shape[1], 2 ** len(qft_qubits)), dtype=complex)
+            dense[groups, _values(self.bits[qft_qubits])] = self.amplitudes
+            dense = np.fft.fft(dense, axis=1, norm='ortho') if inverse else np.fft.ifft(dense, axis=1, norm='ortho')
+
+            group_indices, values = np.nonzero(np.abs(dense) ** 2 > _TOLERANCE)
+            bits = np.zeros((self.num_qubits, len(values)), dtype=np.uint8)
+            bits[rest_qubits] = group_bits[:, group_indices]
+            bits[qft_qubits] = (values >> np.arange(len(qft_qubits))[:, None]) & 1
+            self._set_branches(bits, dense[group_indices, values], merge=False)
+
+
+class BranchSimulator:
+    """A backend-like object for `backends.get_backend(method='branch')`, which runs untranspiled circuits by `BranchState`.
+
+    Args:
+        max_branches (int): the maximum number of branches, beyond which `ValueError` is raised instead of running out of memory
+    """
+
+    def __init__(self, max_branches: int = DEFAULT_MAX_BRANCHES):
+        self.max_branches = max_branches
+        self.options = SimpleNamespace(method='branch')
+
+    def name(self) -> str:
+        return 'branch_simulator'
+
+    def run(self, circuits, shots: int = 1024, seed_simulator: Optional[int] = None):
+        rng = np.random.default_rng(seed_simulator)
+        start = time.perf_counter()
+
+        experiments = []
+        for qc in circuits if isinstance(circuits, (list, tuple)) else [circuits]:
+            experiment_start = time.perf_counter()
+            state = BranchState(qc.num_qubits, self.max_branches)
+            measured = state.apply_circuit(qc)
+            counts = state.sample_counts(qc, measured, shots, rng)
+            experiments.append(SimpleNamespace(counts=counts, metadata={
+                'method': 'branch',
+                'num_qubits': qc.num_qubits,
+                'max_branches_used': state.max_branches_used,
+                'time_taken': time.perf_counter() - experiment_start,
+            }))
+
+        return _BranchJob(_BranchResult(experiments, time.perf_counter() - start))
+
+
+class _BranchResult:
+    backend_name = 'branch_simulator'
+    backend_version = '1'
+
+    def __init__(self, results: list, time_taken: float):
+        self.results = results
+        self.time_taken = time_taken
+        self.metadata = {}
+
+    def get_counts(self, experiment: Optional[int] = None) -> Dict[str, int]:
+        if experiment is None:
+            if len(self.results) != 1:
+                raise ValueError('experiment is required for a job of multiple circuits')
+            experiment = 0
+        return self.results[experiment].counts
+
+
+class _BranchJob:
+    def __init__(self, result: _BranchResult):
+        self._result = result
+
+    def result(self) -> _BranchResult:
+        return self._result
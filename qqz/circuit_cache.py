@@ -0,0 +1,164 @@
+"""
+Opt-in on-disk cache of transpiled circuits serialized with QPY
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Callable, Dict, Optional
+
+from qiskit import QuantumCircuit, __version__ as qiskit_version
+from qiskit.circuit import Gate
+try:
+    from qiskit import qpy
+except ImportError: # qiskit-terra < 0.19
+    from qiskit.circuit import qpy_serialization as qpy
+
+from .backends import transpile
+from .result import timed
+
+
+CACHE_FORMAT_VERSION = 1
+"""Bumped whenever the construction of the cached circuits changes, which invalidates older entries."""
+
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+_ANONYMOUS_GATE_NAME = re.compile(r'^circuit-\d+')
+
+
+def backend_name(backend) -> str:
+    """Name of a backend, for both `BackendV1` (`name()`) and `BackendV2` (`name`). The simulation method of `AerSimulator` is appended as in `Aer.get_backend`, e.g. `aer_simulator_matrix_product_state`.
+
+    Args:
+        backend: a qiskit backend
+
+    Returns:
+        its name
+    """
+
+    name = backend.name() if callable(backend.name) else backend.name
+    method = getattr(getattr(backend, 'options', None), 'method', None)
+    if name == 'aer_simulator' and method not in (None, 'automatic'):
+        name = f'{name}_{method}'
+    return name
+
+def gate_fingerprint(gate: Gate) -> str:
+    """Hash of the definition of a gate. Gates made by `to_gate()` get a fresh name such as `circuit-123` per process, so the definition is walked recursively instead.
+
+    Args:
+        gate (Gate): a gate such as an oracle for `grover`
+
+    Returns:
+        a hex digest which is stable across processes
+    """
+
+    digest = hashlib.sha256()
+
+    def visit(definition: QuantumCircuit):
+        qubit_indices = {qubit: i for i, qubit in enumerate(definition.qubits)}
+        for circuit_instruction in definition.data:
+            instruction = circuit_instruction.operation
+            name = '' if _ANONYMOUS_GATE_NAME.match(instruction.name) else instruction.name
+            qubits = [qubit_indices[qubit] for qubit in circuit_instruction.qubits]
+            digest.update(repr((name, [str(param) for param in instruction.params], qubits)).encode())
+            if not name and instruction.definition is not None:
+                visit(instruction.definition)
+
+    digest.update(repr((gate.num_qubits, [str(param) for param in gate.params])).encode())
+    if gate.definition is not None:
+        visit(gate.definition)
+    return digest.hexdigest()
+
+def cache_key(algorithm: str, backend, **params) -> str:
+    """Key of a cache entry.
+
+    Args:
+        algorithm (str): name of the algorithm, e.g. `order_finding`
+        backend: the backend used for transpilation
+        params: parameters which determine the circuit (`x`, `N`, `t`, `coef_t`, an oracle hash, ...)
+
+    Returns:
+        a hex digest
+    """
+
+    key = {
+        'algorithm': algorithm,
+        'params': {name: str(value) for name, value in sorted(params.items())},
+        'backend': backend_name(backend),
+        'qiskit': qiskit_version,
+        'format': CACHE_FORMAT_VERSION,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def _evict(cache_dir: str, max_bytes: int):
+    entries = []
+    for filename in os.listdir(cache_dir):
+        if not filename.endswith('.qpy'):
+            continue
+        path = os.path.join(cache_dir, filename)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError: # removed by another process
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def transpile_cached(build: Callable[[], QuantumCircuit], backend, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES, algorithm: str = '', timings: Optional[Dict[str, float]] = None, **params) -> QuantumCircuit:
+    """Transpiles the circuit made by `build`, reusing the result stored in `cache_dir` if exists.
+    On a hit, neither `build` nor `transpile` is called.
+    The least recently used entries are evicted when the directory exceeds `max_bytes`.
+
+    Args:
+        build (Callable[[], QuantumCircuit]): makes the circuit to transpile
+        backend: the backend to transpile for
+        cache_dir (Optional[str]): the cache directory. If None, the cache is disabled
+        max_bytes (int): the size cap of the cache directory
+        algorithm (str): see `cache_key`
+        timings (Optional[Dict[str, float]]): if given, the wall times of `'build'` and `'transpile'`, or `'load'` on a hit, are added (see `result.timed`)
+        params: see `cache_key`
+
+    Returns:
+        the transpiled circuit
+    """
+
+    if cache_dir is None:
+        with timed(timings, 'build'):
+            qc = build()
+        with timed(timings, 'transpile'):
+            return transpile(qc, backend)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, cache_key(algorithm, backend, **params) + '.qpy')
+
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        pass
+    else:
+        with timed(timings, 'load'), f:
+            qc = qpy.load(f)[0]
+        os.utime(path) # marks it as recently used
+        return qc
+
+    with timed(timings, 'build'):
+        qc = build()
+    with timed(timings, 'transpile'):
+        qc = transpile(qc, backend)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        qpy.dump(qc, f)
+    os.replace(tmp_path, path)
+    _evict(cache_dir, max_bytes)
+
+    return qc
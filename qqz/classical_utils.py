@@ -1,4 +1,6 @@
 import math
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
 
 def lcm(a, b):
     """Least common multiple: $\mathrm{lcm}(a,b)$
@@ -11,7 +13,7 @@ def lcm(a, b):
         $\mathrm{lcm}(a,b)$
     """
 
-    return a * b / math.gcd(a, b)
+    return a * b // math.gcd(a, b)
 
 
 def decode_bin(register_bin: str) -> int:
@@ -32,3 +34,131 @@ def decode_bin(register_bin: str) -> int:
     """
 
     return int(register_bin[-len(register_bin):], 2)
+
+
+@lru_cache(maxsize=2 ** 16)
+def convergents(numerator: int, denominator: int) -> Tuple[Tuple[int, int], ...]:
+    r"""Convergents of the continued fraction of $\mathit{numerator}/\mathit{denominator}$, computed only with integers.
+
+    Args:
+        numerator (int): a non-negative numerator
+        denominator (int): a positive denominator
+
+    Returns:
+        pairs of the numerator and the denominator of each convergent, which are coprime
+
+    Examples:
+
+    ```
+    >>> convergents(3, 8)
+    ((0, 1), (1, 2), (1, 3), (3, 8))
+    ```
+    """
+
+    result = []
+    p_prev, p = 0, 1
+    q_prev, q = 1, 0
+    while denominator:
+        a, remainder = divmod(numerator, denominator)
+        p_prev, p = p, a * p + p_prev
+        q_prev, q = q, a * q + q_prev
+        result.append((p, q))
+        numerator, denominator = denominator, remainder
+    return tuple(result)
+
+def batch_convergents(values: Iterable[int], t: int) -> Dict[int, Tuple[Tuple[int, int], ...]]:
+    r"""Convergents of $\mathit{value}/2^t$ for many measured values at once. Duplicated values are computed once.
+
+    Args:
+        values (Iterable[int]): measured values of a $t$-qubit register
+        t (int): $t$
+
+    Returns:
+        a dict from each distinct value to its `convergents`
+    """
+
+    return {value: convergents(value, 2 ** t) for value in set(values)}
+
+
+def factorize(n: int) -> Dict[int, int]:
+    """Prime factorization by trial division.
+
+    Args:
+        n (int): a positive integer
+
+    Returns:
+        a dict from each prime factor to its multiplicity
+    """
+
+    factors = {}
+    d = 2
+    while d * d <= n:
+        while n % d == 0:
+            factors[d] = factors.get(d, 0) + 1
+            n //= d
+        d += 1 if d == 2 else 2
+    if n > 1:
+        factors[n] = factors.get(n, 0) + 1
+    return factors
+
+def multiplicative_order(x: int, N: int) -> int:
+    r"""Order $r$ of $x$ modulo $N$ computed classically: the divisors of the Carmichael function $\lambda(N)$ are tried from the factorization of $N$.
+
+    Args:
+        x (int): $x$, which must be coprime to $N$
+        N (int): $N$
+
+    Returns:
+        the smallest $r>0$ such that $x^r\equiv 1\pmod N$
+    """
+
+    if math.gcd(x, N) != 1:
+        raise ValueError(f'x={x} is not coprime to N={N}')
+    if N == 1:
+        return 1
+
+    carmichael = 1
+    for prime, multiplicity in factorize(N).items():
+        if prime == 2 and multiplicity >= 3:
+            prime_power_lambda = 2 ** (multiplicity - 2)
+        else:
+            prime_power_lambda = (prime - 1) * prime ** (multiplicity - 1)
+        carmichael = lcm(carmichael, prime_power_lambda)
+
+    r = carmichael
+    for prime in factorize(carmichael):
+        while r % prime == 0 and pow(x, r // prime, N) == 1:
+            r //= prime
+    return r
+
+def baby_step_giant_step(a: int, b: int, p: int, r: Optional[int] = None) -> int:
+    r"""Discrete log computed classically by the baby-step giant-step algorithm.
+
+    Args:
+        a (int): $a$
+        b (int): $b$
+        p (int): $p$
+        r (Optional[int]): the order of $a$ modulo $p$, which is computed by `multiplicative_order` if None
+
+    Returns:
+        the smallest $s\ge 0$ such that $a^s\equiv b\pmod p$
+    """
+
+    if r is None:
+        r = multiplicative_order(a, p)
+
+    m = math.isqrt(r - 1) + 1
+    baby_steps = {}
+    value = 1
+    for j in range(m):
+        baby_steps.setdefault(value, j)
+        value = value * a % p
+
+    giant_step = pow(a, -m, p)
+    value = b % p
+    for i in range(m):
+        if value in baby_steps:
+            return i * m + baby_steps[value]
+        value = value * giant_step % p
+
+    raise ValueError(f'b={b} is not a power of a={a} modulo p={p}')
@@ -0,0 +1,151 @@
+r"""
+Measurement counts as NumPy arrays of the distinct measured values and their frequencies, converted once from the bitstrings of a job
+
+Bit $i$ of a value is the classical bit $i$, i.e. the $i$-th character from the right of the bitstring without spaces, so the registers are split by shifts and masks of all the values at once:
+
+```
+>>> counts = Counts.from_dict({'01 10': 3, '11 00': 1})
+>>> first_values, second_values = counts.split([2, 2])
+>>> first_values, second_values
+(array([2, 0], dtype=uint64), array([1, 3], dtype=uint64))
+```
+
+The values are `np.uint64` up to 64 bits, and Python integers (of an object array) beyond, e.g. for `emulation` of large $N$.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+def _dtype(num_bits: int):
+    return np.uint64 if num_bits <= 64 else object
+
+def _parse(keys: List[str], num_bits: int) -> np.ndarray:
+    if num_bits > 64:
+        return np.array([int(key, 2) for key in keys], dtype=object)
+    if not keys:
+        return np.zeros(0, dtype=np.uint64)
+
+    bits = np.zeros((len(keys), 64), dtype=np.uint8)
+    bits[:, 64 - num_bits:] = np.frombuffer(''.join(keys).encode(), dtype=np.uint8).reshape(len(keys), num_bits) - ord('0')
+    return np.packbits(bits, axis=1).view('>u8').ravel().astype(np.uint64)
+
+
+@dataclass(eq=False)
+class Counts:
+    """Counts of measured values.
+
+    Attributes:
+        values (np.ndarray): the distinct measured values
+        frequencies (np.ndarray): the number of shots of each value
+        num_bits (int): a number of classical bits
+    """
+
+    values: np.ndarray
+    frequencies: np.ndarray
+    num_bits: int
+
+    @classmethod
+    def from_dict(cls, hist: Mapping[str, int], num_bits: Optional[int] = None) -> 'Counts':
+        """Converts the counts of `job.result().get_counts()`. The spaces between classical registers are ignored.
+
+        Args:
+            hist (Mapping[str, int]): a dict from bitstrings to their counts
+            num_bits (Optional[int]): a number of classical bits. If None, the length of the bitstrings
+
+        Returns:
+            the counts in the same order as `hist`
+        """
+
+        keys = [measured_key.replace(' ', '') for measured_key in hist]
+        if num_bits is None:
+            num_bits = len(keys[0]) if keys else 0
+        return cls(_parse(keys, num_bits), np.fromiter(hist.values(), dtype=np.int64, count=len(keys)), num_bits)
+
+    @classmethod
+    def from_samples(cls, samples: np.ndarray, num_bits: int) -> 'Counts':
+        """Counts the measured value of each shot.
+
+        Args:
+            samples (np.ndarray): the measured values
+            num_bits (int): a number of classical bits
+
+        Returns:
+            the counts in ascending order of the values
+        """
+
+        values, frequencies = np.unique(np.asarray(samples, dtype=_dtype(num_bits)), return_counts=True)
+        return cls(values, frequencies.astype(np.int64), num_bits)
+
+    @property
+    def shots(self) -> int:
+        """The total number of shots"""
+
+        return int(self.frequencies.sum())
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def sorted(self) -> 'Counts':
+        """The counts in descending order of the frequencies. The ties keep their order, as `sorted` of the items of a dict.
+
+        Returns:
+            the sorted counts
+        """
+
+        order = np.argsort(-self.frequencies, kind='stable')
+        return Counts(self.values[order], self.frequencies[order], self.num_bits)
+
+    def register(self, start: int, length: int) -> np.ndarray:
+        r"""The values of the classical bits $[\mathit{start},\mathit{start}+\mathit{length})$ of all the measured values.
+
+        Args:
+            start (int): the first classical bit
+            length (int): a number of classical bits
+
+        Returns:
+            the values of the register in the same order as `values`
+        """
+
+        if self.values.dtype == object:
+            return (self.values >> start) & (2 ** length - 1)
+        return (self.values >> np.uint64(start)) & np.uint64(2 ** length - 1)
+
+    def split(self, register_lens: Sequence[int]) -> List[np.ndarray]:
+        """Splits the measured values into consecutive registers, the first of which is on the lowest classical bits (the rightmost in a bitstring).
+
+        Args:
+            register_lens (Sequence[int]): a number of classical bits of each register
+
+        Returns:
+            the values of each register
+        """
+
+        starts = np.cumsum([0] + list(register_lens[:-1]))
+        return [self.register(int(start), register_len) for start, register_len in zip(starts, register_lens)]
+
+    def merge(self, other: 'Counts') -> 'Counts':
+        """Adds the counts of another run of the same circuit.
+
+        Args:
+            other (Counts): the counts
+
+        Returns:
+            the accumulated counts
+        """
+
+        values, inverse = np.unique(np.concatenate([self.values, other.values]), return_inverse=True)
+        frequencies = np.zeros(len(values), dtype=np.int64)
+        np.add.at(frequencies, inverse, np.concatenate([self.frequencies, other.frequencies]))
+        return Counts(values, frequencies, max(self.num_bits, other.num_bits))
+
+    def to_dict(self) -> Dict[str, int]:
+        """The counts as bitstrings without spaces, e.g. for `qiskit.visualization.plot_histogram`.
+
+        Returns:
+            a dict from measured bitstrings to their counts
+        """
+
+        return {format(int(value), f'0{self.num_bits}b'): int(frequency) for value, frequency in zip(self.values, self.frequencies)}
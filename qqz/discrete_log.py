@@ -1,104 +1,427 @@
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 import math
 
 import numpy as np
-import matplotlib.pyplot as plt
-from sympy import gcdex
-from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, Aer, transpile, assemble
-from qiskit.visualization import plot_histogram
-from sympy import Rational, gcdex
-from sympy.ntheory.continued_fraction import continued_fraction, continued_fraction_convergents
-
-from qft import qft
-from elementary import ax_modM
-from order_finding import order_finding
-from classical_utils import decode_bin
-
-def discrete_log(a: int, b: int, p: int, show_hist: Optional[bool] = False, coef_t: Optional[int] = 1) -> int:
-    """Shor's discrete log algorithm: given $a,b,p\in\mathbb{Z}$, it finds $s$ such that $a^s\equiv b\pmod p$.
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+
+from .qft import qft
+from .modexp import modexp_gate, modexp_ops, modexp_register_lens, ctrl_modmul_register_lens
+from .elementary import append_ops
+from .order_finding import order_finding, order_finding_many, cached_order_finding, known_order, remember_order, append_semi_classical_phase_estimation
+from .classical_utils import batch_convergents, baby_step_giant_step
+from .circuit_cache import transpile_cached
+from .backends import get_backend
+from .execution import run_and_post_process, run_many, transpile_many
+from .result import RunResult, emit
+from .emulation import EmulatedBackend, discrete_log_counts
+
+def discrete_log_from_measurements(a: int, b: int, p: int, r: int, t: int, measured_values: Iterable[Tuple[int, int]], stats: Optional[dict] = None, convergents: Optional[Dict[int, tuple]] = None) -> Optional[int]:
+    r"""Classical post-processing of `discrete_log`. The convergents of all the measured values are computed at once by `classical_utils.batch_convergents`.
 
     Args:
         a (int): $a$
         b (int): $b$
         p (int): $p$
+        r (int): the order of $a$
+        t (int): a number of qubits of each of the first and second registers
+        measured_values (Iterable[Tuple[int, int]]): pairs of measured values of the first and second registers in order of priority
+        stats (Optional[dict]): if given, `'keys_examined'` is set to the number of distinct pairs examined
+        convergents (Optional[Dict[int, tuple]]): if given, the convergents of the measured values are looked up in and added to this dict, which can be shared by the runs with the same $t$
+
+    Returns:
+        $s$, or None if it is not found
     """
 
-    r = order_finding(x=a, N=p, show_hist=False)
-    t = coef_t * int(np.ceil(np.log2(p)))
-
-    first_register = QuantumRegister(t)
-    second_register = QuantumRegister(t)
-    third_register = QuantumRegister(2 * t)
-    auxiliary_register_mid = QuantumRegister(t)
-    auxiliary_register_end = QuantumRegister(6 * t - 2)
-    classical_register = ClassicalRegister(2 * t)
-
-    qc = QuantumCircuit(
-        first_register,
-        second_register,
-        third_register,
-        auxiliary_register_mid,
-        auxiliary_register_end,
-        classical_register,
+    measured_values = list(dict.fromkeys(measured_values))
+    all_convergents = {} if convergents is None else convergents
+    all_convergents.update(batch_convergents([value for pair in measured_values for value in pair if value not in all_convergents], t))
+
+    def numerator_with_denominator_r(measured_value: int) -> Optional[int]:
+        for numerator, denominator in all_convergents[measured_value]:
+            if denominator == r:
+                return numerator
+        return None
+
+    if stats is not None:
+        stats['keys_examined'] = 0
+
+    for keys_examined, (first_value, second_value) in enumerate(measured_values, 1):
+        if stats is not None:
+            stats['keys_examined'] = keys_examined
+        if second_value == 0: # $\widetilde{l/r}=0$
+            continue
+
+        l = numerator_with_denominator_r(second_value) # get correct $l$
+        if l is None:
+            continue
+
+        if first_value == 0: # $\widetilde{\beta/r}=0$
+            if pow(a, 0, p) == b: # the case where b == 1
+                return r # returning 0 is also ok
+            continue
+
+        beta = numerator_with_denominator_r(first_value) # get correct $\beta$
+        if beta is None:
+            continue
+
+        s = pow(l, -1, r) * beta % r # $sl\equiv\beta\pmod r$
+        if pow(a, s, p) == b:
+            return s
+
+    return None
+
+def discrete_log_width(p: int, t: int, engine: str = 'vbe', semi_classical: bool = False) -> Tuple[int, int, Optional[int]]:
+    r"""A number of qubits of `discrete_log_circuit` and that of the qubits which can be entangled, i.e. all but the auxiliary register, and a bound of the number of basis states in superposition, for `backends.get_backend`.
+
+    Args:
+        p (int): $p$
+        t (int): a number of qubits of each of the first and second registers
+        engine (str): see `discrete_log_circuit`
+        semi_classical (bool): see `discrete_log_circuit`
+
+    Returns:
+        the width, the number of the entangled qubits, and $2^{2t}$ (the superposition of the first and second registers, which the arithmetic only permutes) or None if `branch.BranchSimulator` does not fit (the engine `'qft'` or `semi_classical`)
+    """
+
+    third_register_len, auxiliary_register_len = ctrl_modmul_register_lens(M=p, engine=engine) if semi_classical else modexp_register_lens(M=p, x_len=t, engine=engine)
+    entangled_len = (1 if semi_classical else 2 * t) + third_register_len
+    branches = None if engine == 'qft' or semi_classical else 2 ** (2 * t)
+    return entangled_len + auxiliary_register_len, entangled_len, branches
+
+def _discrete_log_registers(p: int, t: int, engine: str, semi_classical: bool) -> QuantumCircuit:
+    third_register_len, auxiliary_register_len = ctrl_modmul_register_lens(M=p, engine=engine) if semi_classical else modexp_register_lens(M=p, x_len=t, engine=engine)
+
+    if semi_classical:
+        return QuantumCircuit(
+            QuantumRegister(1), # control
+            QuantumRegister(third_register_len),
+            QuantumRegister(auxiliary_register_len),
+            *[ClassicalRegister(1) for _ in range(2 * t)], # first, then second
+        )
+
+    return QuantumCircuit(
+        QuantumRegister(t), # first
+        QuantumRegister(t), # second
+        QuantumRegister(third_register_len),
+        QuantumRegister(auxiliary_register_len),
+        ClassicalRegister(2 * t),
     )
 
+def discrete_log_target_circuit(b: int, p: int, t: int, engine: str = 'vbe', semi_classical: bool = False, approximation_degree: int = 0, flat: bool = False, window: int = 1) -> QuantumCircuit:
+    r"""The first half of `discrete_log_circuit`, which is the only part depending on $b$: the modular exponentiation $b^{x_1}\mod p$ of the first register (and its measurement if `semi_classical`).
+
+    Args:
+        b (int): $b$
+        p (int): $p$
+        t (int): see `discrete_log_circuit`
+        engine (str): see `discrete_log_circuit`
+        semi_classical (bool): see `discrete_log_circuit`
+        approximation_degree (int): see `discrete_log_circuit`
+        flat (bool): see `discrete_log_circuit`
+        window (int): see `discrete_log_circuit`
+
+    Returns:
+        the circuit on the registers of `discrete_log_circuit`, to which `discrete_log_base_circuit` is composed
+    """
+
+    if semi_classical and window > 1:
+        raise ValueError('window requires the first and second registers, which semi_classical replaces by one qubit')
+
+    qc = _discrete_log_registers(p=p, t=t, engine=engine, semi_classical=semi_classical)
+
+    if semi_classical:
+        control_register, third_register, auxiliary_register = qc.qregs
+        qc.x(third_register[0])
+        append_semi_classical_phase_estimation(qc, control_register[0], list(third_register) + list(auxiliary_register), a=b, M=p, x_len=t, classical_registers=qc.cregs[:t], engine=engine, approximation_degree=approximation_degree, flat=flat)
+        return qc
+
+    first_register, _, third_register, auxiliary_register = qc.qregs
     qc.h(first_register)
-    qc.h(second_register)
+    if flat:
+        append_ops(qc, modexp_ops(list(first_register) + list(third_register) + list(auxiliary_register), a=b, M=p, x_len=t, engine=engine, window=window))
+    else:
+        qc.append(modexp_gate(a=b, M=p, x_len=t, engine=engine, window=window), list(first_register) + list(third_register) + list(auxiliary_register))
+
+    return qc
 
-    qc.append(ax_modM(a=b, M=p, N_len=t), list(first_register) + list(auxiliary_register_mid) + list(third_register) + list(auxiliary_register_end))
-    qc.append(ax_modM(a=a, M=p, N_len=t, x_0_at_first=False), list(second_register) + list(auxiliary_register_mid) + list(third_register) + list(auxiliary_register_end))
+def discrete_log_base_circuit(a: int, p: int, t: int, engine: str = 'vbe', semi_classical: bool = False, approximation_degree: int = 0, flat: bool = False, window: int = 1) -> QuantumCircuit:
+    r"""The second half of `discrete_log_circuit`, which depends only on $a$: the modular exponentiation $a^{x_2}\mod p$ of the second register, the inverse QFTs and the measurements.
+    It is the same for all the targets $b$ of `discrete_log_multi`, so it is transpiled once.
 
-    qc.append(qft(n=t).inverse(), first_register)
-    qc.append(qft(n=t).inverse(), second_register)
+    Args:
+        a (int): $a$
+        p (int): $p$
+        t (int): see `discrete_log_circuit`
+        engine (str): see `discrete_log_circuit`
+        semi_classical (bool): see `discrete_log_circuit`
+        approximation_degree (int): see `discrete_log_circuit`
+        flat (bool): see `discrete_log_circuit`
+        window (int): see `discrete_log_circuit`
+
+    Returns:
+        the circuit on the registers of `discrete_log_circuit`, which follows `discrete_log_target_circuit`
+    """
+
+    if semi_classical and window > 1:
+        raise ValueError('window requires the first and second registers, which semi_classical replaces by one qubit')
+
+    qc = _discrete_log_registers(p=p, t=t, engine=engine, semi_classical=semi_classical)
+
+    if semi_classical:
+        control_register, third_register, auxiliary_register = qc.qregs
+        append_semi_classical_phase_estimation(qc, control_register[0], list(third_register) + list(auxiliary_register), a=a, M=p, x_len=t, classical_registers=qc.cregs[t:], engine=engine, approximation_degree=approximation_degree, flat=flat)
+        return qc
+
+    first_register, second_register, third_register, auxiliary_register = qc.qregs
+    classical_register, = qc.cregs
+
+    qc.h(second_register)
+    if flat:
+        append_ops(qc, modexp_ops(list(second_register) + list(third_register) + list(auxiliary_register), a=a, M=p, x_len=t, engine=engine, x_0_at_first=False, window=window))
+    else:
+        qc.append(modexp_gate(a=a, M=p, x_len=t, engine=engine, x_0_at_first=False, window=window), list(second_register) + list(third_register) + list(auxiliary_register))
+
+    qc.append(qft(n=t, approximation_degree=approximation_degree).inverse(), first_register)
+    qc.append(qft(n=t, approximation_degree=approximation_degree).inverse(), second_register)
 
     qc.measure(list(first_register) + list(second_register), classical_register)
     #qc.measure(third_register, classical_register)
 
-    backend = Aer.get_backend('aer_simulator_matrix_product_state')#('aer_simulator')
-    qc = transpile(qc, backend)
-    job = backend.run(qc, shots=10000)
-    hist = job.result().get_counts()
+    return qc
+
+def discrete_log_circuit(a: int, b: int, p: int, t: int, engine: str = 'vbe', semi_classical: bool = False, approximation_degree: int = 0, flat: bool = False, window: int = 1) -> QuantumCircuit:
+    r"""The circuit of `discrete_log` before transpilation, which is `discrete_log_target_circuit` followed by `discrete_log_base_circuit`.
+
+    Args:
+        a (int): $a$
+        b (int): $b$
+        p (int): $p$
+        t (int): a number of qubits of each of the first and second registers
+        engine (str): the engine of modular exponentiation (see `modexp.ENGINES`)
+        semi_classical (bool): if True, the first and second registers are replaced by one qubit (see `order_finding.append_semi_classical_phase_estimation`). The measured bits are stored in $2t$ registers of 1 bit
+        approximation_degree (int): the approximation degree of the inverse QFTs (see `qft.qft`)
+        flat (bool): if True, the modular exponentiations are appended as their basic gates (see `order_finding.order_finding_circuit`)
+        window (int): a number of bits of the first and second registers for each multiplication (see `modexp.modexp_gate`). It requires those registers, so not `semi_classical`
+
+    Returns:
+        the circuit which measures the first and second registers
+    """
+
+    kwargs = dict(p=p, t=t, engine=engine, semi_classical=semi_classical, approximation_degree=approximation_degree, flat=flat, window=window)
+    return discrete_log_target_circuit(b=b, **kwargs).compose(discrete_log_base_circuit(a=a, **kwargs))
+
+def discrete_log(a: int, b: int, p: int, show_hist: Optional[bool] = False, coef_t: Optional[int] = 1, cache_dir: Optional[str] = None, engine: str = 'vbe', semi_classical: bool = False, approximation_degree: int = 0, shots: int = 10000, adaptive: bool = False, stats: Optional[dict] = None, return_result: bool = False, emulate: bool = False, flat: bool = False, window: int = 1) -> Union[int, RunResult]:
+    """Shor's discrete log algorithm: given $a,b,p\in\mathbb{Z}$, it finds $s$ such that $a^s\equiv b\pmod p$.
+    The order of $a$ modulo $p$ is remembered (see `order_finding.known_order`), so `order_finding` is run only once for each pair of $a$ and $p$.
+
+    Args:
+        a (int): $a$
+        b (int): $b$
+        p (int): $p$
+        cache_dir (Optional[str]): if given, the transpiled circuits are stored in and loaded from this directory (see `circuit_cache.transpile_cached`)
+        engine (str): the engine of modular exponentiation (see `modexp.ENGINES`)
+        semi_classical (bool): if True, the semi-classical phase estimation is used for both `order_finding` and this (see `order_finding.append_semi_classical_phase_estimation`)
+        approximation_degree (int): the approximation degree of the inverse QFTs for both `order_finding` and this (see `qft.qft` and `qft.qft_fidelity_bound`)
+        shots (int): the number of shots for each of `order_finding` and this, which is the budget if `adaptive` is True
+        adaptive (bool): if True, the shots are run in growing batches until $a^s\equiv b\pmod p$ is verified (see `execution.run_and_post_process`)
+        stats (Optional[dict]): if given, `'shots'` is set to the number of shots used including `order_finding`
+        return_result (bool): if True, a `result.RunResult` is returned instead of $s$, whose `sub_results` has that of `order_finding` unless the order was known. The result is passed to the hooks of `result.add_hook` in either case
+        emulate (bool): if True, no circuit is built for both `order_finding` and this, and the outcomes are sampled from the ideal distribution with $s$ computed classically (see `emulation.discrete_log_counts`)
+        flat (bool): if True, the arithmetic is emitted directly into the circuits of both `order_finding` and this (see `discrete_log_circuit`)
+        window (int): a number of bits of each register for each modular multiplication in both `order_finding` and this (see `discrete_log_circuit`)
+    """
+
+    r = known_order(a, p)
+    sub_results = []
+    if r is None:
+        order_finding_result = order_finding(
+            x=a,
+            N=p,
+            show_hist=False,
+            cache_dir=cache_dir,
+            engine=engine,
+            semi_classical=semi_classical,
+            approximation_degree=approximation_degree,
+            shots=shots,
+            adaptive=adaptive,
+            return_result=True,
+            emulate=emulate,
+            flat=flat,
+            window=window,
+        )
+        r = order_finding_result.answer
+        remember_order(a, p, r)
+        sub_results.append(order_finding_result)
+    t = coef_t * (p - 1).bit_length() # $\lceil\log_2 p\rceil$
+
+    result = RunResult('discrete_log', params={'a': a, 'b': b, 'p': p, 't': t, 'coef_t': coef_t, 'engine': engine, 'semi_classical': semi_classical, 'approximation_degree': approximation_degree, 'shots': shots, 'adaptive': adaptive, 'emulate': emulate}, sub_results=sub_results)
+
+    if emulate:
+        s_emulated = baby_step_giant_step(a, b, p, r)
+        backend = EmulatedBackend(lambda shots, rng: discrete_log_counts(a=a, b=b, p=p, t=t, shots=shots, r=r, s=s_emulated, rng=rng))
+        qc = None
+    else:
+        backend = get_backend(*discrete_log_width(p=p, t=t, engine=engine, semi_classical=semi_classical))
+        qc = transpile_cached(
+            lambda: discrete_log_circuit(a=a, b=b, p=p, t=t, engine=engine, semi_classical=semi_classical, approximation_degree=approximation_degree, flat=flat, window=window),
+            backend,
+            cache_dir=cache_dir,
+            algorithm='discrete_log',
+            timings=result.timings,
+            a=a,
+            b=b,
+            p=p,
+            t=t,
+            coef_t=coef_t,
+            engine=engine,
+            semi_classical=semi_classical,
+            approximation_degree=approximation_degree,
+            flat=flat,
+            window=window,
+        )
+
+    post_process_stats = {}
+    def post_process(hist):
+        first_values, second_values = hist.sorted().split([t, t])
+        measured_values = zip(first_values.tolist(), second_values.tolist())
+        return discrete_log_from_measurements(a=a, b=b, p=p, r=r, t=t, measured_values=measured_values, stats=post_process_stats)
+
+    s, hist, shots_used = run_and_post_process(qc, backend, post_process, shots=shots, adaptive=adaptive, result=result)
+    if stats is not None:
+        stats['shots'] = sum(sub_result.shots for sub_result in sub_results) + shots_used
+
+    result.answer = s
+    result.keys_examined = post_process_stats.get('keys_examined')
+    emit(result)
 
     if show_hist:
+        import matplotlib.pyplot as plt # deferred, since it is slow to import
+        from qiskit.visualization import plot_histogram
+
         figsize_x = max(7 * (len(hist) // 8), 7)
-        plot_histogram(hist, figsize=(figsize_x, 5))
+        plot_histogram(hist.to_dict(), figsize=(figsize_x, 5))
         plt.savefig(f'img/discrete_log_a{a}_b{b}_p{p}_r{r}_t{t}.png', bbox_inches='tight')
 
-    for measured_key, _ in sorted(hist.items(), key=lambda x: x[1], reverse=True):
-        tilde_l_per_r = Rational(decode_bin(measured_key[:t]), 2 ** t) # decoded from second register: $\widetilde{l/r}$
-        if tilde_l_per_r == 0:
-            continue
+    if s is not None:
+        return result if return_result else s
+
+    raise Exception('s is NOT found!')
 
-        l = None
-        for fraction in continued_fraction_convergents(continued_fraction(tilde_l_per_r)):
-            if fraction.denominator == r:
-                l = fraction.numerator # get correct $l$
-                break
+def discrete_log_many(instances: Sequence[Tuple[int, int, int]], coef_t: int = 1, engine: str = 'vbe', semi_classical: bool = False, approximation_degree: int = 0, shots: int = 10000, flat: bool = False, window: int = 1) -> List[Union[int, Exception]]:
+    r"""`discrete_log` of many instances by two backend jobs: `order_finding.order_finding_many` for the distinct pairs of $a$ and $p$ whose orders are not known yet, and one job of multiple experiments for all the instances (see `execution.run_many`). Each instance is post-processed independently.
 
-        if l is None:
+    Args:
+        instances (Sequence[Tuple[int, int, int]]): triples of $a$, $b$ and $p$
+        coef_t (int): see `discrete_log`
+        engine (str): see `discrete_log`
+        semi_classical (bool): see `discrete_log`
+        approximation_degree (int): see `discrete_log`
+        shots (int): the number of shots of each circuit
+        flat (bool): see `discrete_log`
+        window (int): see `discrete_log`
+
+    Returns:
+        $s$ of each instance in the same order, or the exception raised for it
+    """
+
+    order_finding_instances = list(dict.fromkeys((a, p) for a, _, p in instances if known_order(a, p) is None))
+    orders = order_finding_many(order_finding_instances, engine=engine, semi_classical=semi_classical, approximation_degree=approximation_degree, shots=shots, flat=flat, window=window)
+    for (a, p), r in zip(order_finding_instances, orders):
+        if not isinstance(r, Exception):
+            remember_order(a, p, r)
+
+    results: List[Union[int, Exception, None]] = [None] * len(instances)
+    circuits, indices, ts = [], [], []
+    for i, (a, b, p) in enumerate(instances):
+        if known_order(a, p) is None:
+            results[i] = orders[order_finding_instances.index((a, p))]
             continue
+        try:
+            t = coef_t * (p - 1).bit_length() # as in `discrete_log`
+            circuits.append(discrete_log_circuit(a=a, b=b, p=p, t=t, engine=engine, semi_classical=semi_classical, approximation_degree=approximation_degree, flat=flat, window=window))
+        except Exception as e:
+            results[i] = e
+            continue
+        indices.append(i)
+        ts.append(t)
 
-        tilde_beta_per_r = Rational(decode_bin(measured_key[-t:]), 2 ** t) # decoded from first register: $\widetilde{\beta/r}$
-        if tilde_beta_per_r == 0:
-            if pow(a, 0, p) == b: # the case where b == 1
-                return r # returning 0 is also ok
+    widths, entangled_lens, branches = zip(*[discrete_log_width(p=instances[i][2], t=t, engine=engine, semi_classical=semi_classical) for i, t in zip(indices, ts)] or [(0, 0, None)])
+    backend = get_backend(max(widths), max(entangled_lens), None if None in branches else max(branches))
+    for i, t, hist in zip(indices, ts, run_many(circuits, backend, shots=shots)):
+        if isinstance(hist, Exception):
+            results[i] = hist
             continue
 
-        beta = None
-        for fraction in continued_fraction_convergents(continued_fraction(tilde_beta_per_r)):
-            if fraction.denominator == r:
-                beta = fraction.numerator # get correct $\beta$
-                break
+        a, b, p = instances[i]
+        first_values, second_values = hist.sorted().split([t, t])
+        measured_values = zip(first_values.tolist(), second_values.tolist())
+        s = discrete_log_from_measurements(a=a, b=b, p=p, r=known_order(a, p), t=t, measured_values=measured_values)
+        results[i] = s if s is not None else Exception('s is NOT found!')
 
-        if beta is None:
+    return results
+
+def discrete_log_multi(a: int, bs: Sequence[int], p: int, coef_t: int = 1, cache_dir: Optional[str] = None, engine: str = 'vbe', semi_classical: bool = False, approximation_degree: int = 0, shots: int = 10000, flat: bool = False, window: int = 1) -> List[Union[int, Exception]]:
+    r"""`discrete_log` of many targets $b$ for the same $a$ and $p$.
+    The order of $a$ is found once (see `order_finding.cached_order_finding`), and `discrete_log_base_circuit` is built and transpiled once as a template (stored in `cache_dir` if given).
+    Only `discrete_log_target_circuit` of each $b$ is transpiled, to which the template is composed, and all of them are run as one job of multiple experiments (see `execution.run_many`).
+    The convergents of the measured values are shared by the post-processing of all the targets.
+
+    Args:
+        a (int): $a$
+        bs (Sequence[int]): the targets $b$
+        p (int): $p$
+        coef_t (int): see `discrete_log`
+        cache_dir (Optional[str]): see `discrete_log`
+        engine (str): see `discrete_log`
+        semi_classical (bool): see `discrete_log`
+        approximation_degree (int): see `discrete_log`
+        shots (int): the number of shots of `order_finding` and of each target
+        flat (bool): see `discrete_log`
+        window (int): see `discrete_log`
+
+    Returns:
+        $s$ of each target in the same order, or the exception raised for it
+    """
+
+    r = known_order(a, p)
+    if r is None:
+        r = cached_order_finding(x=a, N=p, cache_dir=cache_dir, engine=engine, semi_classical=semi_classical, approximation_degree=approximation_degree, shots=shots, flat=flat, window=window)
+    t = coef_t * (p - 1).bit_length() # $\lceil\log_2 p\rceil$
+
+    kwargs = dict(p=p, t=t, engine=engine, semi_classical=semi_classical, approximation_degree=approximation_degree, flat=flat, window=window)
+    backend = get_backend(*discrete_log_width(p=p, t=t, engine=engine, semi_classical=semi_classical))
+    template = transpile_cached(
+        lambda: discrete_log_base_circuit(a=a, **kwargs),
+        backend,
+        cache_dir=cache_dir,
+        algorithm='discrete_log_base',
+        a=a,
+        **kwargs,
+    )
+
+    results: List[Union[int, Exception, None]] = [None] * len(bs)
+    circuits, indices = [], []
+    for i, b in enumerate(bs):
+        try:
+            circuits.append(discrete_log_target_circuit(b=b, **kwargs))
+        except Exception as e:
+            results[i] = e
             continue
+        indices.append(i)
 
-        s, alpha, _ = gcdex(l, -r)
-        s = int(s * beta)
-        if pow(a, s, p) == b:
-            return s
+    circuits = [qc if isinstance(qc, Exception) else qc.compose(template) for qc in transpile_many(circuits, backend)]
+    convergents = {}
+    for i, hist in zip(indices, run_many(circuits, backend, shots=shots, transpiled=True)):
+        if isinstance(hist, Exception):
+            results[i] = hist
+            continue
 
-    raise Exception('s is NOT found!')
+        first_values, second_values = hist.sorted().split([t, t])
+        measured_values = zip(first_values.tolist(), second_values.tolist())
+        s = discrete_log_from_measurements(a=a, b=bs[i], p=p, r=r, t=t, measured_values=measured_values, convergents=convergents)
+        results[i] = s if s is not None else Exception('s is NOT found!')
+
+    return results
 
 
 if __name__ == '__main__':
@@ -2,13 +2,144 @@
 Implementing [arXiv:quant-ph/9511018](https://arxiv.org/abs/quant-ph/9511018)
 """
 
-from typing import Optional
+from collections import OrderedDict
+from functools import wraps
+import inspect
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
 from qiskit import QuantumCircuit, QuantumRegister
-from qiskit.circuit import Gate
+from qiskit.circuit import Gate, Instruction
+from qiskit.circuit.library import XGate, CXGate, CCXGate, CSwapGate
 
 
+GATE_CACHE_MAXSIZE = 256
+"""The maximum number of gates kept by the gate cache shared among the builders in this module."""
+
+_gate_cache = OrderedDict()
+_gate_cache_stats = {'hits': 0, 'misses': 0}
+
+_X, _CX, _CCX, _CSWAP = XGate(), CXGate(), CCXGate(), CSwapGate()
+_SELF_INVERSE_GATES = {'x', 'cx', 'ccx', 'cswap', 'h', 'swap'}
+
+
+def cached_gate(builder: Callable[..., Gate]) -> Callable[..., Gate]:
+    """Memoizes a gate builder with the LRU cache shared by `carry`, `qsum`, `adder`, `adder_modM`, `ctrl_multi_modM`, `ctrl_ua_modM`, `ax_modM` and `cached_inverse`.
+
+    Gates are keyed by the builder name and its bound arguments, so identical blocks are built once per process and shared.
+    The returned gates must not be mutated.
+
+    Args:
+        builder (Callable[..., Gate]): a function returning a gate
+
+    Returns:
+        the memoized builder
+    """
+
+    signature = inspect.signature(builder)
+
+    @wraps(builder)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (builder.__module__, builder.__qualname__, tuple(bound.arguments.items()))
+
+        if key in _gate_cache:
+            _gate_cache_stats['hits'] += 1
+            _gate_cache.move_to_end(key)
+            return _gate_cache[key]
+
+        _gate_cache_stats['misses'] += 1
+        gate = builder(*args, **kwargs)
+        if GATE_CACHE_MAXSIZE > 0:
+            _gate_cache[key] = gate
+            while len(_gate_cache) > GATE_CACHE_MAXSIZE:
+                _gate_cache.popitem(last=False)
+        return gate
+
+    return wrapper
+
+def gate_cache_info() -> dict:
+    """Statistics of the gate cache.
+
+    Returns:
+        a dict with `hits`, `misses`, `size` and `maxsize`
+    """
+
+    return dict(_gate_cache_stats, size=len(_gate_cache), maxsize=GATE_CACHE_MAXSIZE)
+
+def clear_gate_cache():
+    """Removes all cached gates and resets the statistics."""
+
+    _gate_cache.clear()
+    _gate_cache_stats['hits'] = 0
+    _gate_cache_stats['misses'] = 0
+
+
+@cached_gate
+def cached_inverse(builder: Callable[..., Gate], *args) -> Gate:
+    """The inverse of a cached gate, which is also cached, so that the definition is copied once.
+
+    Args:
+        builder (Callable[..., Gate]): a builder memoized by `cached_gate`
+        args: the arguments of the builder
+
+    Returns:
+        the inverse of `builder(*args)`
+    """
+
+    return builder(*args).inverse()
+
+def append_ops(qc: QuantumCircuit, ops: Iterable[Tuple[Instruction, Sequence]]) -> QuantumCircuit:
+    """Appends operations emitted by a `*_ops` function (e.g. `ax_modM_ops`) to a circuit as they are, without wrapping them in a gate.
+    It uses `QuantumCircuit._append`, the fast path documented by qiskit 1.x for trusted arguments, which skips the broadcasting and checks of `QuantumCircuit.append` (about 4 times faster for the arithmetic), so it must not be called inside a control-flow builder block.
+
+    Args:
+        qc (QuantumCircuit): the circuit
+        ops (Iterable[Tuple[Instruction, Sequence]]): pairs of an operation and its qubits, which must be qubits of `qc` (not their indices)
+
+    Returns:
+        `qc`
+    """
+
+    for operation, qubits in ops:
+        qc._append(operation, qubits, ())
+    return qc
+
+def inverse_ops(ops: Iterable[Tuple[Instruction, Sequence]]) -> List[Tuple[Instruction, Sequence]]:
+    """The inverse of operations by reversed emission: the operations in reverse order, each of which is inverted.
+
+    Args:
+        ops (Iterable[Tuple[Instruction, Sequence]]): pairs of an operation and its qubits
+
+    Returns:
+        the inverse operations
+    """
+
+    return [(operation if operation.name in _SELF_INVERSE_GATES else operation.inverse(), qubits) for operation, qubits in reversed(list(ops))]
+
+def block_ops(builder: Callable[..., Gate], ops_builder: Callable[..., list], qubits: Sequence, args: tuple = (), flat: bool = True, inverse: bool = False) -> List[Tuple[Instruction, Sequence]]:
+    """A block of an arithmetic circuit on the given qubits: either the operations of `ops_builder(qubits, *args)` inlined, or the nested gate of `builder(*args)`.
+
+    Args:
+        builder (Callable[..., Gate]): a builder memoized by `cached_gate`, e.g. `adder`
+        ops_builder (Callable[..., list]): its `*_ops` function, e.g. `adder_ops`
+        qubits (Sequence): the qubits of the block
+        args (tuple): the arguments of both builders
+        flat (bool): if True, the operations are inlined, otherwise one nested gate is used
+        inverse (bool): if True, the inverse of the block
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    if flat:
+        ops = ops_builder(qubits, *args)
+        return inverse_ops(ops) if inverse else ops
+    return [(cached_inverse(builder, *args) if inverse else builder(*args), list(qubits))]
+
+
+@cached_gate
 def carry() -> Gate:
     """CARRY. It requires 4 qubits.
     
@@ -17,11 +148,26 @@ def carry() -> Gate:
     """
 
     qc = QuantumCircuit(4)
-    qc.ccx(1, 2, 3)
-    qc.cx(1, 2)
-    qc.ccx(0, 2, 3)
+    append_ops(qc, carry_ops(qc.qubits))
     return qc.to_gate()
 
+def carry_ops(qubits: Sequence) -> List[Tuple[Instruction, Sequence]]:
+    """The operations of `carry` on the given qubits.
+
+    Args:
+        qubits (Sequence): 4 qubits
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    return [
+        (_CCX, [qubits[1], qubits[2], qubits[3]]),
+        (_CX, [qubits[1], qubits[2]]),
+        (_CCX, [qubits[0], qubits[2], qubits[3]]),
+    ]
+
+@cached_gate
 def qsum() -> Gate:
     """SUM. It requires 3 qubits.
     
@@ -30,10 +176,25 @@ def qsum() -> Gate:
     """
 
     qc = QuantumCircuit(3)
-    qc.cx(1, 2)
-    qc.cx(0, 2)
+    append_ops(qc, qsum_ops(qc.qubits))
     return qc.to_gate()
 
+def qsum_ops(qubits: Sequence) -> List[Tuple[Instruction, Sequence]]:
+    """The operations of `qsum` on the given qubits.
+
+    Args:
+        qubits (Sequence): 3 qubits
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    return [
+        (_CX, [qubits[1], qubits[2]]),
+        (_CX, [qubits[0], qubits[2]]),
+    ]
+
+@cached_gate
 def adder(n: int) -> Gate:
     r"""ADDER: $a,b\to a,a+b$. It requires $3n+1$ qubits: $a$ uses $n$ qubits, $b$ uses $n+1$ qubits, and $c$ uses $n$ qubits.
 
@@ -44,27 +205,40 @@ def adder(n: int) -> Gate:
         its gate
     """
 
-    qubits = QuantumRegister(n + (n + 1) + n)
+    qc = QuantumCircuit(QuantumRegister(n + (n + 1) + n))
+    append_ops(qc, adder_ops(qc.qubits, n, flat=False))
+    return qc.to_gate()
+
+def adder_ops(qubits: Sequence, n: int, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    """The operations of `adder` on the given qubits.
+
+    Args:
+        qubits (Sequence): $3n+1$ qubits in the order of `adder`
+        n (int): see `adder`
+        flat (bool): if True, `carry` and `qsum` are inlined, otherwise they are nested gates (see `block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    qubits = list(qubits)
     a = qubits[:n]
     b = qubits[n:n + (n + 1)]
     c = qubits[n + (n + 1):]
-    qc = QuantumCircuit(qubits)
-
-    carry_gate = carry()
-    carry_gate_dag = carry_gate.inverse()
-    sum_gate = qsum()
 
+    ops = []
     for i in range(n - 1):
-        qc.append(carry_gate, [c[i]] + [a[i]] + [b[i]] + [c[i + 1]])
-    qc.append(carry_gate, [c[n - 1]] + [a[-1]] + [b[n - 1]] + [b[n]])
-    qc.cx(a[-1], b[n - 1])
-    qc.append(sum_gate, [c[n - 1]] + [a[-1]] + [b[n - 1]])
+        ops += block_ops(carry, carry_ops, [c[i]] + [a[i]] + [b[i]] + [c[i + 1]], flat=flat)
+    ops += block_ops(carry, carry_ops, [c[n - 1]] + [a[-1]] + [b[n - 1]] + [b[n]], flat=flat)
+    ops.append((_CX, [a[-1], b[n - 1]]))
+    ops += block_ops(qsum, qsum_ops, [c[n - 1]] + [a[-1]] + [b[n - 1]], flat=flat)
     for i in reversed(range(n - 1)):
-        qc.append(carry_gate_dag, [c[i]] + [a[i]] + [b[i]] + [c[i + 1]])
-        qc.append(sum_gate, [c[i]] + [a[i]] + [b[i]])
+        ops += block_ops(carry, carry_ops, [c[i]] + [a[i]] + [b[i]] + [c[i + 1]], flat=flat, inverse=True)
+        ops += block_ops(qsum, qsum_ops, [c[i]] + [a[i]] + [b[i]], flat=flat)
 
-    return qc.to_gate()
+    return ops
 
+@cached_gate
 def adder_modM(M: int, N_len: int) -> Gate:
     r"""ADDER MOD: $a,b\to a,a+b\mod M$. It requires $4N_\mathit{len}+2$ qubits: $a$ uses $N_\mathit{len}$ qubits, $b$ uses $N_\mathit{len}+1$ qubits, $c$ uses $N_\mathit{len}$ qubits, $M$ uses $N_\mathit{len}$ qubits, and $t$ uses 1 qubit.
 
@@ -76,45 +250,54 @@ def adder_modM(M: int, N_len: int) -> Gate:
         its gate
     """
 
+    qc = QuantumCircuit(QuantumRegister(N_len + (N_len + 1) + N_len + N_len + 1))
+    append_ops(qc, adder_modM_ops(qc.qubits, M, N_len, flat=False))
+    return qc.to_gate()
+
+def adder_modM_ops(qubits: Sequence, M: int, N_len: int, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `adder_modM` on the given qubits.
+
+    Args:
+        qubits (Sequence): $4N_\mathit{len}+2$ qubits in the order of `adder_modM`
+        M (int): see `adder_modM`
+        N_len (int): see `adder_modM`
+        flat (bool): if True, `adder` is inlined, otherwise it is a nested gate (see `block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
     M_val = M
 
-    qubits = QuantumRegister(N_len + (N_len + 1) + N_len + N_len + 1)
+    qubits = list(qubits)
     a, left_qubits = qubits[:N_len], qubits[N_len:]
     b, left_qubits = left_qubits[:N_len + 1], left_qubits[N_len + 1:]
     c, left_qubits = left_qubits[:N_len], left_qubits[N_len:]
     M, left_qubits = left_qubits[:N_len], left_qubits[N_len:]
     t = left_qubits[:1]
-    qc = QuantumCircuit(qubits)
-
-    adder_gate = adder(N_len)
-    adder_gate_dag = adder_gate.inverse()
-
-    for i, char in enumerate(bin(M_val)[2:][::-1]):
-        if char == '1':
-            qc.x(M[i])
-
-    qc.append(adder_gate, a + b + c)
-    qc.append(adder_gate_dag, M + b + c)
-    qc.x(b[-1])
-    qc.cx(b[-1], t[0])
-    qc.x(b[-1])
-    for i, char in enumerate(bin(M_val)[2:][::-1]):
-        if char == '1':
-            qc.cx(t[0], M[i])
-    qc.append(adder_gate, M + b + c)
-    for i, char in enumerate(bin(M_val)[2:][::-1]):
-        if char == '1':
-            qc.cx(t[0], M[i])
-    qc.append(adder_gate_dag, a + b + c)
-    qc.cx(b[-1], t[0])
-    qc.append(adder_gate, a + b + c)
-
-    for i, char in enumerate(bin(M_val)[2:][::-1]):
-        if char == '1':
-            qc.x(M[i])
 
-    return qc.to_gate()
+    M_bits = [i for i, char in enumerate(bin(M_val)[2:][::-1]) if char == '1']
+
+    ops = []
+    ops += [(_X, [M[i]]) for i in M_bits]
+
+    ops += block_ops(adder, adder_ops, a + b + c, (N_len,), flat=flat)
+    ops += block_ops(adder, adder_ops, M + b + c, (N_len,), flat=flat, inverse=True)
+    ops.append((_X, [b[-1]]))
+    ops.append((_CX, [b[-1], t[0]]))
+    ops.append((_X, [b[-1]]))
+    ops += [(_CX, [t[0], M[i]]) for i in M_bits]
+    ops += block_ops(adder, adder_ops, M + b + c, (N_len,), flat=flat)
+    ops += [(_CX, [t[0], M[i]]) for i in M_bits]
+    ops += block_ops(adder, adder_ops, a + b + c, (N_len,), flat=flat, inverse=True)
+    ops.append((_CX, [b[-1], t[0]]))
+    ops += block_ops(adder, adder_ops, a + b + c, (N_len,), flat=flat)
 
+    ops += [(_X, [M[i]]) for i in M_bits]
+
+    return ops
+
+@cached_gate
 def ctrl_multi_modM(a: int, M: int, N_len: int) -> Gate:
     r"""Ctrl MULT MOD: $x,0\to x,ax\mod M$ if $c=1$, otherwise $x,0\to x,x$. It requires $9N_\mathit{len}-1$ qubits: $\mathit{ctrl}$ uses 1 qubit, $x$ uses $N_\mathit{len}$ qubits, $y$ uses $2N_\mathit{len}$ qubits, $\mathit{xx}$ (which is a register in the middle of Fig. 5 in the paper) uses $2N_\mathit{len}-1$ qubits, $c$ (which is $c$ for ADDER MOD) uses $2N_\mathit{len}-1$ qubits, $M$ (which is $M$ for ADDER MOD) uses $2N_\mathit{len}-1$ qubits, and $t$ (which is $t$ for ADDER MOD) uses 1 qubit.
 
@@ -127,37 +310,91 @@ def ctrl_multi_modM(a: int, M: int, N_len: int) -> Gate:
         its gate
     """
 
+    qc = QuantumCircuit(QuantumRegister(9 * N_len - 1))
+    append_ops(qc, ctrl_multi_modM_ops(qc.qubits, a, M, N_len, flat=False))
+    return qc.to_gate()
+
+def ctrl_multi_modM_ops(qubits: Sequence, a: int, M: int, N_len: int, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `ctrl_multi_modM` on the given qubits.
+
+    Args:
+        qubits (Sequence): $9N_\mathit{len}-1$ qubits in the order of `ctrl_multi_modM`
+        a (int): see `ctrl_multi_modM`
+        M (int): see `ctrl_multi_modM`
+        N_len (int): see `ctrl_multi_modM`
+        flat (bool): if True, `adder_modM` is inlined, otherwise it is a nested gate (see `block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
     M_val = M
-    N_len = N_len
 
-    qubits = QuantumRegister(9 * N_len - 1)
+    qubits = list(qubits)
     ctrl, left_qubits = qubits[:1], qubits[1:]
     x, left_qubits = left_qubits[:N_len], left_qubits[N_len:]
     y, left_qubits = left_qubits[:2 * N_len], left_qubits[2 * N_len:]
     xx, left_qubits = left_qubits[:2 * N_len - 1], left_qubits[2 * N_len - 1:]
     c, left_qubits = left_qubits[:2 * N_len - 1], left_qubits[2 * N_len - 1:]
     M, left_qubits = left_qubits[:2 * N_len - 1], left_qubits[2 * N_len - 1:]
-    t, left_qubits = left_qubits[:1], qubits[1:]
+    t = left_qubits[:1]
 
-    qc = QuantumCircuit(qubits)
+    ops = []
+    for i in range(N_len):
+        xx_bits = [j for j, char in enumerate(bin(2 ** i * a % M_val)[2:][::-1]) if char == '1']
+        ops += [(_CCX, [ctrl[0], x[i], xx[j]]) for j in xx_bits]
+        ops += block_ops(adder_modM, adder_modM_ops, xx + y + c + M + t, (M_val, 2 * N_len - 1), flat=flat)
+        ops += [(_CCX, [ctrl[0], x[i], xx[j]]) for j in xx_bits]
+    ops.append((_X, [ctrl[0]]))
+    ops += [(_CCX, [ctrl[0], x_bit, y_bit]) for x_bit, y_bit in zip(x, y)]
+    ops.append((_X, [ctrl[0]]))
 
-    adder_modM_gate = adder_modM(M=M_val, N_len=2 * N_len - 1)
+    return ops
 
-    for i in range(N_len):
-        for j, char in enumerate(bin(2 ** i * a % M_val)[2:][::-1]):
-            if char == '1':
-                qc.ccx(ctrl[0], x[i], xx[j])
-        qc.append(adder_modM_gate, xx + y + c + M + t)
-        for j, char in enumerate(bin(2 ** i * a % M_val)[2:][::-1]):
-            if char == '1':
-                qc.ccx(ctrl[0], x[i], xx[j])
-    qc.x(ctrl[0])
-    for x_bit, y_bit in zip(x, y):
-        qc.ccx(ctrl[0], x_bit, y_bit)
-    qc.x(ctrl[0])
+@cached_gate
+def ctrl_ua_modM(a: int, M: int, N_len: int) -> Gate:
+    r"""Ctrl $U_a$: $x,0\to ax\mod M,0$ if $\mathit{ctrl}=1$, otherwise $x,0\to x,0$. It is a step of `ax_modM`: `ctrl_multi_modM` by $a$, swapping $x$ and $y$, and the inverse of `ctrl_multi_modM` by $a^{-1}\mod M$. It requires $9N_\mathit{len}-1$ qubits in the same order as `ctrl_multi_modM`.
 
+    Args:
+        a (int): $a$, which must be coprime to $M$
+        M (int): $M$ (see `adder_modM`)
+        N_len (int): a number of bits for representing $x$
+
+    Returns:
+        its gate
+    """
+
+    qc = QuantumCircuit(QuantumRegister(9 * N_len - 1))
+    append_ops(qc, ctrl_ua_modM_ops(qc.qubits, a, M, N_len, flat=False))
     return qc.to_gate()
 
+def ctrl_ua_modM_ops(qubits: Sequence, a: int, M: int, N_len: int, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `ctrl_ua_modM` on the given qubits.
+
+    Args:
+        qubits (Sequence): $9N_\mathit{len}-1$ qubits in the order of `ctrl_multi_modM`
+        a (int): see `ctrl_ua_modM`
+        M (int): see `ctrl_ua_modM`
+        N_len (int): see `ctrl_ua_modM`
+        flat (bool): if True, `ctrl_multi_modM` is inlined, otherwise it is a nested gate (see `block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    qubits = list(qubits)
+    ctrl, left_qubits = qubits[:1], qubits[1:]
+    x, left_qubits = left_qubits[:N_len], left_qubits[N_len:]
+    y = left_qubits[:2 * N_len]
+
+    ops = []
+    ops += block_ops(ctrl_multi_modM, ctrl_multi_modM_ops, qubits, (a, M, N_len), flat=flat)
+    ops += [(_CSWAP, [ctrl[0], x[j], y[j]]) for j in range(N_len)]
+    ops += block_ops(ctrl_multi_modM, ctrl_multi_modM_ops, qubits, (pow(a, -1, M), M, N_len), flat=flat, inverse=True)
+
+    return ops
+
+@cached_gate
 def ax_modM(a: int, M: int, N_len: Optional[int] = None, x_0_at_first: bool = True) -> Gate:
     r"""Modular exponentiation, $a^x\mod M$. It requires $10N_\mathit{len}-2$ qubits: $x$ uses $N_\mathit{len}$ qubits, $\mathit{x\ for\ Ctrl\ MULT\ MOD}$ uses $N_\mathit{len}$ qubits, $y$ uses $2N_\mathit{len}$ qubits, $\mathit{xx}$ uses $2N_\mathit{len}-1$ qubits, $c$ (which is $c$ for ADDER MOD) uses $2N_\mathit{len}-1$ qubits, $M$ (which is $M$ for ADDER MOD) uses $2N_\mathit{len}-1$ qubits, and $t$ (which is $t$ for ADDER MOD) uses 1 qubit.
 
@@ -171,30 +408,224 @@ def ax_modM(a: int, M: int, N_len: Optional[int] = None, x_0_at_first: bool = Tr
         its gate
     """
 
+    if N_len is None:
+        N_len = int(np.ceil(np.log2(M)))
+
+    qc = QuantumCircuit(QuantumRegister(10 * N_len - 2))
+    append_ops(qc, ax_modM_ops(qc.qubits, a, M, N_len, x_0_at_first, flat=False))
+    return qc.to_gate()
+
+def ax_modM_ops(qubits: Sequence, a: int, M: int, N_len: Optional[int] = None, x_0_at_first: bool = True, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `ax_modM` on the given qubits. With `flat`, they are only X, CX, CCX and CSWAP gates, so a circuit made by `append_ops` needs no unrolling of nested gates.
+
+    Args:
+        qubits (Sequence): $10N_\mathit{len}-2$ qubits in the order of `ax_modM`
+        a (int): see `ax_modM`
+        M (int): see `ax_modM`
+        N_len (Optional[int]): see `ax_modM`
+        x_0_at_first (bool): see `ax_modM`
+        flat (bool): if True, `ctrl_ua_modM` is inlined, otherwise it is a nested gate (see `block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
     M_val = M
     if N_len is None:
         N_len = int(np.ceil(np.log2(M)))
 
-    qubits = QuantumRegister(10 * N_len - 2)
+    qubits = list(qubits)
     x, left_qubits = qubits[:N_len], qubits[N_len:]
-    x_for_ctrl_multi_modM_gate, left_qubits = left_qubits[:N_len], left_qubits[N_len:]
+    x_for_ctrl_multi_modM_gate = left_qubits[:N_len]
+
+    ops = []
+    if x_0_at_first:
+        ops.append((_X, [x_for_ctrl_multi_modM_gate[0]]))
+    for i in range(N_len):
+        ops += block_ops(ctrl_ua_modM, ctrl_ua_modM_ops, [x[i]] + left_qubits, (pow(a, 2 ** i, M_val), M_val, N_len), flat=flat)
+
+    return ops
+
+def _lookup_ops(window: Sequence, x_bit, xx: Sequence, ancillas: Sequence, table: Sequence[int]) -> List[Tuple[Instruction, Sequence]]:
+    r"""A table lookup which XORs `table[k]` into $\mathit{xx}$ if $x_\mathit{bit}=1$, where $k$ is the value of `window`. It is its own inverse.
+    For each $k$, the flag $\mathit{window}=k$ is computed by a chain of CCX into `ancillas` (the window bits which are 0 in $k$ are negated by X around it), so $|\mathit{window}|-1$ clean ancillas are required.
+    """
+
+    ops = []
+    for k, value in enumerate(table):
+        if value == 0:
+            continue
+
+        negated = [(_X, [qubit]) for m, qubit in enumerate(window) if not (k >> m) & 1]
+        chain = []
+        flag = window[0]
+        for m in range(1, len(window)):
+            chain.append((_CCX, [flag, window[m], ancillas[m - 1]]))
+            flag = ancillas[m - 1]
+
+        ops += negated + chain
+        ops += [(_CCX, [flag, x_bit, xx[j]]) for j, char in enumerate(bin(value)[2:][::-1]) if char == '1']
+        ops += chain[::-1] + negated
+
+    return ops
+
+@cached_gate
+def window_multi_modM(a: int, M: int, N_len: int, window: int) -> Gate:
+    r"""MULT MOD by a power selected by a window of exponent bits: $k,x,0\to k,x,a^kx\mod M$, where $k$ is the value of the window register. It is `ctrl_multi_modM` of [arXiv:1905.07682](https://arxiv.org/abs/1905.07682) (windowed arithmetic): $2^ia^k\mod M$ is loaded into $\mathit{xx}$ by a table lookup over the window instead of CCX by one control.
+    It requires $w+9N_\mathit{len}-2$ qubits: the window uses $w$ qubits, and the others are the same as `ctrl_multi_modM` without $\mathit{ctrl}$. The lookup borrows $w-1$ qubits of $c$, which are clean out of `adder_modM`.
+
+    Args:
+        a (int): $a$
+        M (int): $M$ (see `adder_modM`)
+        N_len (int): a number of bits for representing $x$
+        window (int): a number of bits $w$ of the window, at most $2N_\mathit{len}$
+
+    Returns:
+        its gate
+    """
+
+    qc = QuantumCircuit(QuantumRegister(window + 9 * N_len - 2))
+    append_ops(qc, window_multi_modM_ops(qc.qubits, a, M, N_len, window, flat=False))
+    return qc.to_gate()
+
+def window_multi_modM_ops(qubits: Sequence, a: int, M: int, N_len: int, window: int, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `window_multi_modM` on the given qubits.
+
+    Args:
+        qubits (Sequence): $w+9N_\mathit{len}-2$ qubits in the order of `window_multi_modM`
+        a (int): see `window_multi_modM`
+        M (int): see `window_multi_modM`
+        N_len (int): see `window_multi_modM`
+        window (int): see `window_multi_modM`
+        flat (bool): if True, `adder_modM` is inlined, otherwise it is a nested gate (see `block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    if not 1 <= window <= 2 * N_len:
+        raise ValueError(f'window must be in [1, {2 * N_len}], but {window} is given')
+
+    M_val = M
+
+    qubits = list(qubits)
+    k, left_qubits = qubits[:window], qubits[window:]
+    x, left_qubits = left_qubits[:N_len], left_qubits[N_len:]
     y, left_qubits = left_qubits[:2 * N_len], left_qubits[2 * N_len:]
     xx, left_qubits = left_qubits[:2 * N_len - 1], left_qubits[2 * N_len - 1:]
     c, left_qubits = left_qubits[:2 * N_len - 1], left_qubits[2 * N_len - 1:]
     M, left_qubits = left_qubits[:2 * N_len - 1], left_qubits[2 * N_len - 1:]
-    t, left_qubits = left_qubits[:1], qubits[1:]
+    t = left_qubits[:1]
 
-    qc = QuantumCircuit(qubits)
+    powers = [pow(a, k_val, M_val) for k_val in range(2 ** window)]
 
-    if x_0_at_first:
-        qc.x(x_for_ctrl_multi_modM_gate[0])
+    ops = []
     for i in range(N_len):
-        ctrl_multi_modM_gate = ctrl_multi_modM(pow(a, 2 ** i, M_val), M_val, N_len)
-        ctrl_multi_modM_gate_dag = ctrl_multi_modM(pow(a, -2 ** i, M_val), M_val, N_len).inverse()
+        lookup = _lookup_ops(k, x[i], xx, c, [2 ** i * power % M_val for power in powers])
+        ops += lookup
+        ops += block_ops(adder_modM, adder_modM_ops, xx + y + c + M + t, (M_val, 2 * N_len - 1), flat=flat)
+        ops += lookup
+
+    return ops
+
+@cached_gate
+def window_ua_modM(a: int, M: int, N_len: int, window: int) -> Gate:
+    r"""$U_a^k$: $k,x,0\to k,a^kx\mod M,0$, where $k$ is the value of the window register. It is a step of `ax_modM_windowed`: `window_multi_modM` by $a$, swapping $x$ and $y$, and the inverse of `window_multi_modM` by $a^{-1}\mod M$. It requires $w+9N_\mathit{len}-2$ qubits in the same order as `window_multi_modM`.
+
+    Args:
+        a (int): $a$, which must be coprime to $M$
+        M (int): $M$ (see `adder_modM`)
+        N_len (int): a number of bits for representing $x$
+        window (int): see `window_multi_modM`
 
-        qc.append(ctrl_multi_modM_gate, [x[i]] + x_for_ctrl_multi_modM_gate + y + xx + c + M + t)
-        for j in range(N_len):
-            qc.cswap(x[i], x_for_ctrl_multi_modM_gate[j], y[j])
-        qc.append(ctrl_multi_modM_gate_dag, [x[i]] + x_for_ctrl_multi_modM_gate + y + xx + c + M + t)
+    Returns:
+        its gate
+    """
 
+    qc = QuantumCircuit(QuantumRegister(window + 9 * N_len - 2))
+    append_ops(qc, window_ua_modM_ops(qc.qubits, a, M, N_len, window, flat=False))
     return qc.to_gate()
+
+def window_ua_modM_ops(qubits: Sequence, a: int, M: int, N_len: int, window: int, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `window_ua_modM` on the given qubits.
+
+    Args:
+        qubits (Sequence): $w+9N_\mathit{len}-2$ qubits in the order of `window_multi_modM`
+        a (int): see `window_ua_modM`
+        M (int): see `window_ua_modM`
+        N_len (int): see `window_ua_modM`
+        window (int): see `window_ua_modM`
+        flat (bool): if True, `window_multi_modM` is inlined, otherwise it is a nested gate (see `block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    qubits = list(qubits)
+    x, left_qubits = qubits[window:window + N_len], qubits[window + N_len:]
+    y = left_qubits[:2 * N_len]
+
+    ops = []
+    ops += block_ops(window_multi_modM, window_multi_modM_ops, qubits, (a, M, N_len, window), flat=flat)
+    for j in range(N_len): # $y=x$ if $k=0$, so the swap needs no control
+        ops += [(_CX, [x[j], y[j]]), (_CX, [y[j], x[j]]), (_CX, [x[j], y[j]])]
+    ops += block_ops(window_multi_modM, window_multi_modM_ops, qubits, (pow(a, -1, M), M, N_len, window), flat=flat, inverse=True)
+
+    return ops
+
+@cached_gate
+def ax_modM_windowed(a: int, M: int, N_len: Optional[int] = None, window: int = 2, x_0_at_first: bool = True) -> Gate:
+    r"""Modular exponentiation, $a^x\mod M$, by `window_ua_modM` on each window of $w$ bits of $x$. It is the same as `ax_modM` on the same $10N_\mathit{len}-2$ qubits, but it has $\lceil N_\mathit{len}/w\rceil$ multiplications instead of $N_\mathit{len}$, each of which adds $2^w$ table entries by CCX instead of one.
+
+    Args:
+        a (int): $a$
+        M (int): $M$ (see `adder_modM`)
+        N_len (int): a number of bits for representing $x$
+        window (int): a number of bits $w$ of $x$ for each multiplication. 1 makes the same number of multiplications as `ax_modM`
+        x_0_at_first (bool): if True, it adds 1 into the target register before calculating modular exponentiation
+
+    Returns:
+        its gate
+    """
+
+    if N_len is None:
+        N_len = int(np.ceil(np.log2(M)))
+
+    qc = QuantumCircuit(QuantumRegister(10 * N_len - 2))
+    append_ops(qc, ax_modM_windowed_ops(qc.qubits, a, M, N_len, window, x_0_at_first, flat=False))
+    return qc.to_gate()
+
+def ax_modM_windowed_ops(qubits: Sequence, a: int, M: int, N_len: Optional[int] = None, window: int = 2, x_0_at_first: bool = True, flat: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `ax_modM_windowed` on the given qubits (see `ax_modM_ops`).
+
+    Args:
+        qubits (Sequence): $10N_\mathit{len}-2$ qubits in the order of `ax_modM`
+        a (int): see `ax_modM_windowed`
+        M (int): see `ax_modM_windowed`
+        N_len (Optional[int]): see `ax_modM_windowed`
+        window (int): see `ax_modM_windowed`
+        x_0_at_first (bool): see `ax_modM_windowed`
+        flat (bool): if True, `window_ua_modM` is inlined, otherwise it is a nested gate (see `block_ops`)
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    M_val = M
+    if N_len is None:
+        N_len = int(np.ceil(np.log2(M)))
+    if window < 1:
+        raise ValueError(f'window must be positive, but {window} is given')
+
+    qubits = list(qubits)
+    x, left_qubits = qubits[:N_len], qubits[N_len:]
+    x_for_ctrl_multi_modM_gate = left_qubits[:N_len]
+
+    ops = []
+    if x_0_at_first:
+        ops.append((_X, [x_for_ctrl_multi_modM_gate[0]]))
+    for i in range(0, N_len, window):
+        window_len = min(window, N_len - i)
+        ops += block_ops(window_ua_modM, window_ua_modM_ops, x[i:i + window_len] + left_qubits, (pow(a, 2 ** i, M_val), M_val, N_len, window_len), flat=flat)
+
+    return ops
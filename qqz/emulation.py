@@ -0,0 +1,195 @@
+r"""
+Classical emulation of the phase estimation in `order_finding` and `discrete_log`, which samples the ideal measurement outcomes without gate-level simulation.
+
+The state before the inverse QFT is a uniform mixture over $l\in\{0,\dots,r-1\}$ of the eigenstates of $y\to ay\mod M$, so an outcome is sampled by drawing $l$ uniformly and then each register from the kernel of phase estimation of the phase $l/r$ (or $ls/r$ for the register of $b$ in `discrete_log`):
+
+$$
+\Pr(y\mid\varphi)=\left|\frac{1}{2^t}\sum_{x=0}^{2^t-1}e^{2\pi ix(\varphi-y/2^t)}\right|^2=\left(\frac{\mathrm{sinc}(\delta)}{\mathrm{sinc}(\delta/2^t)}\right)^2,\quad\delta=2^t\varphi-y.
+$$
+
+It is exact when all the $2^t$ outcomes are kept. With `window`, only the outcomes nearest to $2^t\varphi$ are kept and renormalized, whose dropped mass is below $1/(\mathit{window}-2)$.
+"""
+
+import time
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from .classical_utils import multiplicative_order, baby_step_giant_step
+
+
+DEFAULT_WINDOW = 2 ** 10
+"""The number of outcomes kept around each peak by default"""
+
+_MAX_CHUNK_ELEMENTS = 2 ** 22
+
+
+def sample_phase_estimation(numerators: np.ndarray, denominator: int, t: int, window: Optional[int] = DEFAULT_WINDOW, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    r"""Samples an outcome of $t$-bit phase estimation of the phase $\varphi=\mathit{numerator}/\mathit{denominator}$ for each numerator.
+    The peaks $2^t\varphi$ are rounded with integers, so it is exact for any size of $t$ and $\mathit{denominator}$.
+
+    Args:
+        numerators (np.ndarray): numerators of the phases, one for each shot
+        denominator (int): the denominator of the phases
+        t (int): a number of qubits of the register
+        window (Optional[int]): a number of outcomes kept around $2^t\varphi$. If None (or not less than $2^t$), all the outcomes are kept
+        rng (Optional[np.random.Generator]): the random generator
+
+    Returns:
+        the measured values in $[0,2^t)$ as Python integers
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    outcome_len = 2 ** t if window is None else min(window, 2 ** t)
+    offsets = np.arange(outcome_len) - (outcome_len - 1) // 2 # $y-\lfloor 2^t\varphi\rceil$
+
+    scaled_numerators = np.asarray(numerators, dtype=object) * 2 ** t
+    nearest = (2 * scaled_numerators + denominator) // (2 * denominator) # $\lfloor 2^t\varphi\rceil$
+    fractions = ((scaled_numerators - nearest * denominator) / denominator).astype(float) # $2^t\varphi-\lfloor 2^t\varphi\rceil\in[-1/2,1/2)$
+
+    indices = np.empty(len(fractions), dtype=np.int64)
+    chunk_len = max(_MAX_CHUNK_ELEMENTS // outcome_len, 1)
+    for start in range(0, len(fractions), chunk_len):
+        delta = fractions[start:start + chunk_len, None] - offsets
+        probabilities = (np.sinc(delta) / np.sinc(delta * 2.0 ** -t)) ** 2
+
+        # inverse transform sampling of all the rows at once: row $i$ occupies $[i,i+1)$ of the flattened cumulative sum
+        rows = np.arange(len(probabilities))
+        cumulative = np.cumsum(probabilities, axis=1)
+        cumulative /= cumulative[:, -1:]
+        cumulative += rows[:, None]
+        chunk_indices = np.searchsorted(cumulative.ravel(), rows + rng.random(len(rows)), side='right') - rows * outcome_len
+        indices[start:start + chunk_len] = np.clip(chunk_indices, 0, outcome_len - 1)
+
+    return (nearest + offsets[indices].astype(object)) % 2 ** t
+
+def uniform_integers(high: int, size: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    r"""Samples integers in $[0,\mathit{high})$ uniformly, even if `high` does not fit in 64 bits.
+
+    Args:
+        high (int): the exclusive upper bound
+        size (int): the number of samples
+        rng (Optional[np.random.Generator]): the random generator
+
+    Returns:
+        the samples as Python integers
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    if high <= 2 ** 62:
+        return rng.integers(0, high, size=size).astype(object)
+
+    byte_len = (high.bit_length() + 7) // 8
+    mask = 2 ** high.bit_length() - 1
+    samples = []
+    while len(samples) < size: # rejection sampling, which accepts more than half of the candidates
+        candidate = int.from_bytes(rng.bytes(byte_len), 'little') & mask
+        if candidate < high:
+            samples.append(candidate)
+    return np.array(samples, dtype=object)
+
+def order_finding_counts(x: int, N: int, t: int, shots: int, r: Optional[int] = None, window: Optional[int] = DEFAULT_WINDOW, rng: Optional[np.random.Generator] = None) -> Dict[str, int]:
+    r"""Counts of the first register of `order_finding.order_finding_circuit` emulated classically.
+
+    Args:
+        x (int): $x$
+        N (int): $N$
+        t (int): a number of qubits of the first register
+        shots (int): the number of shots
+        r (Optional[int]): the order of $x$, which is computed by `classical_utils.multiplicative_order` if None
+        window (Optional[int]): see `sample_phase_estimation`
+        rng (Optional[np.random.Generator]): the random generator
+
+    Returns:
+        a dict from measured bitstrings to their counts
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+    if r is None:
+        r = multiplicative_order(x, N)
+
+    l = uniform_integers(r, shots, rng=rng)
+    values = sample_phase_estimation(l, r, t, window=window, rng=rng)
+
+    return _counts(values, t)
+
+def discrete_log_counts(a: int, b: int, p: int, t: int, shots: int, r: Optional[int] = None, s: Optional[int] = None, window: Optional[int] = DEFAULT_WINDOW, rng: Optional[np.random.Generator] = None) -> Dict[str, int]:
+    r"""Counts of `discrete_log.discrete_log_circuit` emulated classically. Each bitstring is the second register followed by the first register, as in the circuit.
+
+    Args:
+        a (int): $a$
+        b (int): $b$
+        p (int): $p$
+        t (int): a number of qubits of each of the first and second registers
+        shots (int): the number of shots
+        r (Optional[int]): the order of $a$, which is computed by `classical_utils.multiplicative_order` if None
+        s (Optional[int]): the discrete log, which is computed by `classical_utils.baby_step_giant_step` if None
+        window (Optional[int]): see `sample_phase_estimation`
+        rng (Optional[np.random.Generator]): the random generator
+
+    Returns:
+        a dict from measured bitstrings to their counts
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+    if r is None:
+        r = multiplicative_order(a, p)
+    if s is None:
+        s = baby_step_giant_step(a, b, p, r)
+
+    l = uniform_integers(r, shots, rng=rng)
+    first_values = sample_phase_estimation(l * s % r, r, t, window=window, rng=rng) # $b^{x_1}a^{x_2}=a^{sx_1+x_2}$
+    second_values = sample_phase_estimation(l, r, t, window=window, rng=rng)
+
+    return _counts(second_values * 2 ** t + first_values, 2 * t)
+
+def _counts(values: np.ndarray, bits: int) -> Dict[str, int]:
+    return {format(value, f'0{bits}b'): count for value, count in Counter(values).items()}
+
+
+class EmulatedBackend:
+    """A backend-like object for `execution.run_and_post_process`, whose `run` ignores the circuit and returns counts sampled by a function.
+
+    Args:
+        sample_counts (Callable[[int, np.random.Generator], Dict[str, int]]): returns the counts of the given number of shots sampled by the given generator, e.g. `order_finding_counts` with the other arguments bound
+    """
+
+    def __init__(self, sample_counts: Callable[[int, np.random.Generator], Dict[str, int]]):
+        self.sample_counts = sample_counts
+
+    def name(self) -> str:
+        return 'phase_estimation_emulator'
+
+    def run(self, qc, shots: int = 1024, seed_simulator: Optional[int] = None):
+        start = time.perf_counter()
+        counts = self.sample_counts(shots, np.random.default_rng(seed_simulator))
+        return _EmulatedJob(_EmulatedResult(counts, time.perf_counter() - start))
+
+
+class _EmulatedResult:
+    backend_name = 'phase_estimation_emulator'
+    backend_version = '1'
+    results = []
+
+    def __init__(self, counts: Dict[str, int], time_taken: float):
+        self.counts = counts
+        self.time_taken = time_taken
+        self.metadata = {}
+
+    def get_counts(self, experiment=None) -> Dict[str, int]:
+        return self.counts
+
+
+class _EmulatedJob:
+    def __init__(self, result: _EmulatedResult):
+        self._result = result
+
+    def result(self) -> _EmulatedResult:
+        return self._result
@@ -0,0 +1,149 @@
+"""
+Execution of transpiled circuits followed by classical post-processing
+"""
+
+from typing import Callable, List, Optional, Tuple, TypeVar, Union
+
+from . import backends
+from .counts import Counts
+from .result import RunResult, timed
+
+
+T = TypeVar('T')
+
+ADAPTIVE_INITIAL_SHOTS = 32
+ADAPTIVE_GROWTH = 2
+
+
+def get_counts(job, experiment: Optional[int] = None) -> Counts:
+    """Counts of a job as arrays (see `counts.Counts`), which the post-processing consumes without parsing each bitstring again.
+
+    Args:
+        job: a job returned by `backend.run`
+        experiment (Optional[int]): the index of the experiment if the job has multiple circuits
+
+    Returns:
+        the counts
+    """
+
+    return Counts.from_dict(job.result().get_counts(experiment))
+
+def run_and_post_process(qc, backend, post_process: Callable[[Counts], Optional[T]], shots: int = 10000, adaptive: bool = False, initial_shots: int = ADAPTIVE_INITIAL_SHOTS, growth: int = ADAPTIVE_GROWTH, result: Optional[RunResult] = None) -> Tuple[Optional[T], Counts, int]:
+    """Runs a transpiled circuit and post-processes its counts.
+
+    If `adaptive` is True, the shots are run in batches of `initial_shots`, `initial_shots * growth`, ... against the same circuit, and the accumulated counts are post-processed after each batch.
+    It stops as soon as `post_process` returns a (verified) answer, or when `shots` are used up.
+
+    Args:
+        qc: a transpiled circuit, or None for a backend which does not need it (e.g. `emulation.EmulatedBackend`)
+        backend: the backend to run `qc`, e.g. `backends.get_backend`. It is seeded by `backends.run`
+        post_process (Callable[[Counts], Optional[T]]): returns an answer from counts (see `get_counts`), or None if not found
+        shots (int): the number of shots, which is the budget in the adaptive mode
+        adaptive (bool): if True, the shots are scheduled adaptively
+        initial_shots (int): the number of shots of the first batch
+        growth (int): the ratio of the number of shots of a batch to that of the previous one
+        result (Optional[RunResult]): if given, the times of `'simulate'` and `'post_process'`, the circuit, the shots, the counts and the backend metadata of the last batch are recorded
+
+    Returns:
+        the answer (None if not found), the accumulated counts, and the number of shots used
+    """
+
+    timings = None if result is None else result.timings
+    if result is not None and qc is not None:
+        result.set_circuit(qc)
+
+    def run(batch_shots: int) -> Counts:
+        with timed(timings, 'simulate'):
+            job = backends.run(backend, qc, shots=batch_shots)
+            hist = get_counts(job)
+        if result is not None:
+            result.set_backend(job.result())
+            result.shots += batch_shots
+        return hist
+
+    def post_process_timed(hist: Counts) -> Optional[T]:
+        if result is not None:
+            result.counts = hist
+        with timed(timings, 'post_process'):
+            return post_process(hist)
+
+    if not adaptive:
+        hist = run(shots)
+        return post_process_timed(hist), hist, shots
+
+    hist = None
+    shots_used = 0
+    batch_shots = initial_shots
+    while shots_used < shots:
+        batch_shots = min(batch_shots, shots - shots_used)
+        batch_hist = run(batch_shots)
+        hist = batch_hist if hist is None else hist.merge(batch_hist)
+        shots_used += batch_shots
+
+        answer = post_process_timed(hist)
+        if answer is not None:
+            return answer, hist, shots_used
+
+        batch_shots *= growth
+
+    return None, hist, shots_used
+
+def transpile_many(circuits: list, backend) -> list:
+    """Transpiles circuits together, which qiskit parallelizes over processes. If it fails, e.g. since a circuit is too wide for `backend`, each circuit is transpiled alone, so that the others are not lost.
+
+    Args:
+        circuits (list): circuits before transpilation
+        backend: the backend to transpile for
+
+    Returns:
+        the transpiled circuits in the same order, or the exception raised for each
+    """
+
+    try:
+        return list(backends.transpile(circuits, backend))
+    except Exception:
+        pass
+
+    transpiled_circuits = []
+    for qc in circuits:
+        try:
+            transpiled_circuits.append(backends.transpile(qc, backend))
+        except Exception as e:
+            transpiled_circuits.append(e)
+    return transpiled_circuits
+
+def run_many(circuits: list, backend, shots: int = 10000, transpiled: bool = False) -> List[Union[Counts, Exception]]:
+    """Transpiles circuits together (see `transpile_many`) and submits them as one job of multiple experiments, which Aer can parallelize.
+    A circuit which fails only gets its exception, and the others are run.
+
+    Args:
+        circuits (list): circuits before transpilation, or exceptions to pass through
+        backend: the backend to run the circuits
+        shots (int): the number of shots of each circuit
+        transpiled (bool): if True, the circuits are already transpiled for `backend`
+
+    Returns:
+        the counts of each circuit in the same order, or the exception raised for it
+    """
+
+    if not circuits:
+        return []
+
+    hists: List[Union[Counts, Exception]] = list(circuits if transpiled else transpile_many(circuits, backend))
+    indices = [i for i, qc in enumerate(hists) if not isinstance(qc, Exception)]
+    if not indices:
+        return hists
+
+    try:
+        job = backends.run(backend, [hists[i] for i in indices], shots=shots)
+    except Exception as e:
+        for i in indices:
+            hists[i] = e
+        return hists
+
+    for experiment, i in enumerate(indices):
+        try:
+            hists[i] = get_counts(job, experiment)
+        except Exception as e: # e.g. the simulator fails only on this circuit
+            hists[i] = e
+    return hists
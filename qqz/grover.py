@@ -1,13 +1,76 @@
-from typing import Optional
+from typing import Callable, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
-from qiskit import QuantumCircuit, Aer, transpile
-from qiskit.visualization import plot_histogram
-from qiskit.circuit import Gate
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import Gate, QuantumRegister
+from qiskit.circuit.library import MCXGate
+from qiskit.quantum_info import Operator
 
+from .counts import Counts
+from .circuit_cache import transpile_cached, gate_fingerprint
+from .backends import get_backend
+from .execution import run_and_post_process
+from .result import RunResult, emit, timed
+
+
+MCZ_MODES = ('noancilla', 'v-chain', 'v-chain-dirty', 'recursion', 'auto')
+"""Strategies of the MCZ in the diffusion (see `mcz_ancillas`)"""
+
+
+def mcz_ancillas(N_len: int, oracle_qubits_len: int, mcz_mode: str = 'noancilla') -> Tuple[str, int, int]:
+    r"""Allocation of the auxiliary qubits of the MCZ in the diffusion of `grover_circuit`, which is decomposed by the modes of `MCXGate`.
+
+    * `'noancilla'`: no auxiliary qubits, but the depth grows quadratically with `N_len`
+    * `'v-chain'`: a chain of Toffoli gates on $N_\mathit{len}-3$ clean auxiliary qubits, which are added
+    * `'v-chain-dirty'`: the same chain on $N_\mathit{len}-3$ dirty auxiliary qubits, which are borrowed from those of the oracle first and added only for the rest
+    * `'recursion'`: a recursive decomposition on at most 1 added auxiliary qubit
+    * `'auto'`: `'v-chain-dirty'` if the oracle has enough auxiliary qubits to borrow, otherwise `'recursion'` (or `'noancilla'` if it needs no auxiliary qubits)
+
+    Args:
+        N_len (int): a number of qubits of the search space
+        oracle_qubits_len (int): a number of auxiliary qubits of the oracle
+        mcz_mode (str): one of `MCZ_MODES`
+
+    Returns:
+        the chosen mode, a number of the borrowed auxiliary qubits of the oracle, and a number of the added qubits
+    """
+
+    if mcz_mode not in MCZ_MODES:
+        raise ValueError(f'mcz_mode must be one of {MCZ_MODES}, but {mcz_mode!r} is given')
+
+    ctrl_len = N_len - 1
+    if mcz_mode == 'auto':
+        if MCXGate.get_num_ancilla_qubits(ctrl_len, 'v-chain-dirty') == 0:
+            mcz_mode = 'noancilla'
+        elif MCXGate.get_num_ancilla_qubits(ctrl_len, 'v-chain-dirty') <= oracle_qubits_len:
+            mcz_mode = 'v-chain-dirty'
+        else:
+            mcz_mode = 'recursion'
+
+    ancilla_len = MCXGate.get_num_ancilla_qubits(ctrl_len, mcz_mode)
+    borrowed_len = min(ancilla_len, oracle_qubits_len) if mcz_mode == 'v-chain-dirty' else 0
+    return mcz_mode, borrowed_len, ancilla_len - borrowed_len
+
+def grover_circuit(N_len: int, oracle_gate: Gate, oracle_qubits_len: int, k_time: int, mcz_mode: str = 'noancilla') -> QuantumCircuit:
+    """The circuit of `grover` before transpilation.
+
+    Args:
+        N_len (int): a number of qubits of the search space
+        oracle_gate (Gate): the oracle acting on `N_len + oracle_qubits_len` qubits
+        oracle_qubits_len (int): a number of auxiliary qubits of the oracle
+        k_time (int): a number of Grover iterations
+        mcz_mode (str): the strategy of the MCZ in the diffusion (see `mcz_ancillas`), whose auxiliary qubits are added after those of the oracle
+
+    Returns:
+        the circuit which measures the search space
+    """
+
+    mcz_mode, borrowed_len, added_len = mcz_ancillas(N_len, oracle_qubits_len, mcz_mode)
 
-def grover(N_len: int, oracle_gate: Gate, oracle_qubits_len: int, k_time: int, show_hist: Optional[bool] = True) -> int:
     qc = QuantumCircuit(N_len + oracle_qubits_len, N_len)
+    if added_len > 0:
+        qc.add_register(QuantumRegister(added_len))
+    mcz_ancilla_qubits = qc.qubits[N_len:N_len + borrowed_len] + qc.qubits[N_len + oracle_qubits_len:]
 
     qc.h(range(N_len))
 
@@ -19,7 +82,7 @@ def grover(N_len: int, oracle_gate: Gate, oracle_qubits_len: int, k_time: int, s
 
         # MCZ
         qc.h(N_len - 1)
-        qc.mct(list(range(N_len - 1)), N_len - 1)
+        qc.mcx(list(range(N_len - 1)), N_len - 1, mcz_ancilla_qubits or None, mode=mcz_mode)
         qc.h(N_len - 1)
 
         qc.x(range(N_len))
@@ -27,16 +90,208 @@ def grover(N_len: int, oracle_gate: Gate, oracle_qubits_len: int, k_time: int, s
 
     qc.measure(range(N_len), range(N_len))
 
-    backend = Aer.get_backend('aer_simulator_matrix_product_state')
-    qc = transpile(qc, backend)
-    job = backend.run(qc, shots=10000)
-    hist = job.result().get_counts()
+    return qc
+
+
+def grover(N_len: int, oracle_gate: Gate, oracle_qubits_len: int, k_time: int, show_hist: Optional[bool] = True, cache_dir: Optional[str] = None, shots: int = 10000, adaptive: bool = False, verify: Optional[Callable[[int], bool]] = None, stats: Optional[dict] = None, return_result: bool = False, mcz_mode: str = 'noancilla') -> Union[int, RunResult]:
+    """Grover's search algorithm.
+
+    Args:
+        N_len (int): a number of qubits of the search space
+        oracle_gate (Gate): the oracle acting on `N_len + oracle_qubits_len` qubits
+        oracle_qubits_len (int): a number of auxiliary qubits of the oracle
+        k_time (int): a number of Grover iterations
+        cache_dir (Optional[str]): if given, the transpiled circuit is stored in and loaded from this directory (see `circuit_cache.transpile_cached`). The oracle is keyed by `circuit_cache.gate_fingerprint`
+        shots (int): the number of shots, which is the budget if `adaptive` is True
+        adaptive (bool): if True, the shots are run in growing batches until a value passing `verify` is measured (see `execution.run_and_post_process`)
+        verify (Optional[Callable[[int], bool]]): returns whether a value is marked. It is required if `adaptive` is True
+        stats (Optional[dict]): if given, `'shots'` is set to the number of shots used and `'mcz'` to the result of `mcz_ancillas`
+        return_result (bool): if True, a `result.RunResult` is returned instead of the value. The result is passed to the hooks of `result.add_hook` in either case
+        mcz_mode (str): the strategy of the MCZ in the diffusion (see `mcz_ancillas`). The chosen one is reported in `stats` and in the parameters of the result
+
+    Returns:
+        the most frequently measured value (which passes `verify` if given)
+    """
+
+    if adaptive and verify is None:
+        raise ValueError('verify is required for the adaptive mode')
+
+    chosen_mcz_mode, mcz_borrowed_len, mcz_added_len = mcz_ancillas(N_len, oracle_qubits_len, mcz_mode)
+    result = RunResult('grover', params={'N_len': N_len, 'oracle_qubits_len': oracle_qubits_len, 'k_time': k_time, 'shots': shots, 'adaptive': adaptive, 'mcz_mode': chosen_mcz_mode, 'mcz_borrowed_qubits': mcz_borrowed_len, 'mcz_added_qubits': mcz_added_len})
+
+    backend = get_backend(N_len + oracle_qubits_len + mcz_added_len)
+    qc = transpile_cached(
+        lambda: grover_circuit(N_len, oracle_gate, oracle_qubits_len, k_time, mcz_mode=chosen_mcz_mode),
+        backend,
+        cache_dir=cache_dir,
+        algorithm='grover',
+        timings=result.timings,
+        N_len=N_len,
+        oracle=gate_fingerprint(oracle_gate) if cache_dir is not None else None,
+        oracle_qubits_len=oracle_qubits_len,
+        k_time=k_time,
+        mcz_mode=chosen_mcz_mode,
+    )
+
+    def post_process(hist):
+        result.keys_examined = 0
+        for measured_value in hist.sorted().values.tolist():
+            result.keys_examined += 1
+            if verify is None or verify(measured_value):
+                return measured_value
+        return None
+
+    answer, hist, shots_used = run_and_post_process(qc, backend, post_process, shots=shots, adaptive=adaptive, result=result)
+    if stats is not None:
+        stats['shots'] = shots_used
+        stats['mcz'] = (chosen_mcz_mode, mcz_borrowed_len, mcz_added_len)
+
+    result.answer = answer
+    emit(result)
 
     if show_hist:
-        plot_histogram(hist)
+        import matplotlib.pyplot as plt # deferred, since it is slow to import
+        from qiskit.visualization import plot_histogram
+
+        plot_histogram(hist.to_dict())
         plt.show()
 
-    return int(max(hist.items(), key=lambda x: x[1])[0], 2)
+    if answer is None:
+        raise Exception('A marked value is NOT found!')
+    return result if return_result else answer
+
+def optimal_k_time(N_len: int, marked_len: int) -> int:
+    r"""The number of Grover iterations maximizing the probability of measuring a marked value: $\mathrm{round}(\pi/(4\theta)-1/2)$, where $\sin\theta=\sqrt{\mathit{marked\_len}/2^{N_\mathit{len}}}$.
+
+    Args:
+        N_len (int): a number of qubits of the search space
+        marked_len (int): a number of marked values
+
+    Returns:
+        the number of iterations
+    """
+
+    if marked_len == 0 or marked_len == 2 ** N_len:
+        return 0
+    theta = np.arcsin(np.sqrt(marked_len / 2 ** N_len))
+    return max(int(np.round(np.pi / (4 * theta) - 1 / 2)), 0)
+
+def grover_statevector(N_len: int, marked: np.ndarray, k_time: int) -> np.ndarray:
+    r"""The state of `grover_circuit` before measurement, computed without a circuit.
+    The oracle (a sign flip of the marked entries) and the diffusion (a reflection about the mean) keep all the marked amplitudes equal and all the others equal, so after $k$ iterations they are $\sin((2k+1)\theta)/\sqrt{M}$ and $\cos((2k+1)\theta)/\sqrt{2^{N_\mathit{len}}-M}$ with $M$ marked values and $\sin\theta=\sqrt{M/2^{N_\mathit{len}}}$.
+    It equals that of the circuit up to a global phase.
+    The closed form deliberately replaces applying the oracle (a diagonal of $\pm1$) and the diffusion (a rank-one reflection) $k$ times to the $2^{N_\mathit{len}}$ entries, which takes $O(k2^{N_\mathit{len}})$ instead of $O(2^{N_\mathit{len}})$.
+    It is exact only for an oracle given by a predicate, i.e. a sign flip of the marked entries, which is the only kind `grover_emulated` takes.
+
+    Args:
+        N_len (int): a number of qubits of the search space
+        marked (np.ndarray): booleans of length $2^{N_\mathit{len}}$ whether each value is marked
+        k_time (int): a number of Grover iterations
+
+    Returns:
+        the statevector of the search space
+    """
+
+    marked_len = int(np.count_nonzero(marked))
+    theta = np.arcsin(np.sqrt(marked_len / 2 ** N_len))
+    angle = (2 * k_time + 1) * theta
+
+    state = np.empty(2 ** N_len)
+    if marked_len > 0:
+        state[marked] = np.sin(angle) / np.sqrt(marked_len)
+    if marked_len < 2 ** N_len:
+        state[~marked] = np.cos(angle) / np.sqrt(2 ** N_len - marked_len)
+    return state
+
+def grover_emulated(N_len: int, predicate: Callable[[np.ndarray], np.ndarray], k_time: Optional[int] = None, show_hist: Optional[bool] = False, shots: int = 10000, seed: Optional[int] = None, stats: Optional[dict] = None, return_result: bool = False) -> Union[int, RunResult]:
+    """Grover's search algorithm emulated with NumPy on the statevector of the search space (see `grover_statevector`), without ancillas or transpilation.
+
+    Args:
+        N_len (int): a number of qubits of the search space
+        predicate (Callable[[np.ndarray], np.ndarray]): a vectorized oracle, which returns booleans whether each value of `np.arange(2 ** N_len)` is marked
+        k_time (Optional[int]): a number of Grover iterations. If None, `optimal_k_time` of the number of marked values is used
+        shots (int): the number of shots
+        seed (Optional[int]): the seed of sampling
+        stats (Optional[dict]): if given, `'shots'` is set to the number of shots used and `'k_time'` to the number of iterations
+        return_result (bool): if True, a `result.RunResult` is returned instead of the value. The result is passed to the hooks of `result.add_hook` in either case
+
+    Returns:
+        the most frequently measured value which is marked
+
+    Examples:
+
+    ```
+    >>> grover_emulated(10, lambda values: values == 573)
+    573
+    ```
+    """
+
+    result = RunResult('grover_emulated', params={'N_len': N_len, 'k_time': k_time, 'shots': shots, 'seed': seed}, backend={'backend_name': 'numpy'})
+
+    with timed(result.timings, 'build'):
+        marked = np.asarray(predicate(np.arange(2 ** N_len)), dtype=bool)
+        if k_time is None:
+            k_time = optimal_k_time(N_len, int(marked.sum()))
+            result.params['k_time'] = k_time
+
+    with timed(result.timings, 'simulate'):
+        probabilities = grover_statevector(N_len, marked, k_time) ** 2
+        counts = np.random.default_rng(seed).multinomial(shots, probabilities / probabilities.sum())
+    result.width = N_len
+    result.shots = shots
+    result.counts = Counts(np.flatnonzero(counts).astype(np.uint64), counts[counts > 0].astype(np.int64), N_len)
+
+    with timed(result.timings, 'post_process'):
+        measured_values = np.flatnonzero(counts)
+        measured_values = measured_values[np.argsort(-counts[measured_values], kind='stable')]
+        marked_positions = np.flatnonzero(marked[measured_values])
+        answer = int(measured_values[marked_positions[0]]) if len(marked_positions) else None
+        result.keys_examined = int(marked_positions[0]) + 1 if len(marked_positions) else len(measured_values)
+
+    if stats is not None:
+        stats['shots'] = shots
+        stats['k_time'] = k_time
+
+    result.answer = answer
+    emit(result)
+
+    if show_hist:
+        import matplotlib.pyplot as plt # deferred, since it is slow to import
+        from qiskit.visualization import plot_histogram
+
+        plot_histogram(result.counts.to_dict())
+        plt.show()
+
+    if answer is None:
+        raise Exception('A marked value is NOT found!')
+    return result if return_result else answer
+
+def verify_oracle(N_len: int, oracle_gate: Gate, oracle_qubits_len: int, predicate: Callable[[np.ndarray], np.ndarray]) -> bool:
+    r"""Checks that a gate oracle for `grover` is the phase oracle of a vectorized predicate for `grover_emulated`: $|x\rangle|0\rangle\to(-1)^{f(x)}|x\rangle|0\rangle$ up to a global phase, with the auxiliary qubits returned to $|0\rangle$.
+
+    Args:
+        N_len (int): a number of qubits of the search space
+        oracle_gate (Gate): the oracle acting on `N_len + oracle_qubits_len` qubits
+        oracle_qubits_len (int): a number of auxiliary qubits of the oracle
+        predicate (Callable[[np.ndarray], np.ndarray]): the vectorized oracle
+
+    Returns:
+        whether they are equivalent. A predicate and its negation give the same oracle up to the global phase $-1$, so both pass
+
+    Examples:
+
+    ```
+    >>> verify_oracle(3, sample_oracle(3), 1, sample_predicate)
+    True
+    ```
+    """
+
+    unitary = Operator(oracle_gate).data
+    block = unitary[:2 ** N_len, :2 ** N_len] # the auxiliary qubits are the most significant ones, from $|0\rangle$ to $|0\rangle$
+
+    signs = np.where(np.asarray(predicate(np.arange(2 ** N_len)), dtype=bool), -1, 1)
+    global_phase = block[0, 0] * signs[0]
+    return bool(np.allclose(block, global_phase * np.diag(signs), atol=1e-8))
 
 
 def sample_oracle(N_len: int) -> Gate:
@@ -57,6 +312,23 @@ def sample_oracle(N_len: int) -> Gate:
 
     return qc.to_gate()
 
+def sample_predicate(values: np.ndarray) -> np.ndarray:
+    """The vectorized predicate of `sample_oracle`: whether the number of 11 (adjacent 1 bits) is odd.
+
+    Args:
+        values (np.ndarray): values of the search space
+
+    Returns:
+        booleans whether each value is marked
+    """
+
+    pairs = values & (values >> 1)
+    parity = np.zeros_like(pairs)
+    while np.any(pairs):
+        parity ^= pairs & 1
+        pairs = pairs >> 1
+    return parity.astype(bool)
+
 
 if __name__ == '__main__':
     print(grover(3, sample_oracle(3), 1, 1))
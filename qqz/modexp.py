@@ -0,0 +1,243 @@
+r"""
+Engines of modular exponentiation $x,1\to x,a^x\mod M$ shared by `order_finding`, `discrete_log` and `shor`.
+
+Every gate made here acts on $x$ (`x_len` qubits), then the target register, and then the auxiliary register (see `modexp_register_lens`).
+
+* `'vbe'`: `elementary.ax_modM`, the ripple-carry construction of [arXiv:quant-ph/9511018](https://arxiv.org/abs/quant-ph/9511018). With `window` $w>1$, `elementary.ax_modM_windowed`, which multiplies by a power selected by $w$ bits of $x$ at once
+* `'qft'`: `beauregard.ax_modM_qft`, the arithmetic in the Fourier basis of [arXiv:quant-ph/0205095](https://arxiv.org/abs/quant-ph/0205095). It requires $x_\mathit{len}+2\lceil\log_2 M\rceil+2$ qubits
+* `'permutation'`: `ax_modM_permutation`, which applies each controlled multiplication as a single permutation matrix. It does not show the gate-level arithmetic, but it only requires $x_\mathit{len}+\lceil\log_2 M\rceil$ qubits
+"""
+
+from math import gcd
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from qiskit import QuantumCircuit, QuantumRegister
+from qiskit.circuit import Gate, Instruction
+from qiskit.circuit.library import XGate
+try:
+    from qiskit.circuit.library import UnitaryGate
+except ImportError: # qiskit < 1.0
+    from qiskit.extensions import UnitaryGate
+
+from .elementary import ax_modM, ax_modM_ops, ax_modM_windowed, ax_modM_windowed_ops, ctrl_ua_modM, ctrl_ua_modM_ops, cached_gate, append_ops
+from .beauregard import ax_modM_qft, ax_modM_qft_ops, ctrl_ua_modM_qft, ctrl_ua_modM_qft_ops
+
+
+ENGINES = ('vbe', 'qft', 'permutation')
+
+
+def _check_engine(engine: str):
+    if engine not in ENGINES:
+        raise ValueError(f'engine must be one of {ENGINES}, but {engine!r} is given')
+
+def _check_window(engine: str, window: int):
+    _check_engine(engine)
+    if window < 1:
+        raise ValueError(f'window must be positive, but {window} is given')
+    if window > 1 and engine != 'vbe':
+        raise ValueError(f"window is supported only by the engine 'vbe', but {engine!r} is given")
+
+def modexp_register_lens(M: int, x_len: int, engine: str = 'vbe') -> Tuple[int, int]:
+    """Sizes of the registers used by `modexp_gate` besides $x$.
+
+    Args:
+        M (int): $M$
+        x_len (int): a number of bits for representing $x$
+        engine (str): one of `ENGINES`
+
+    Returns:
+        a number of qubits of the target register and that of the auxiliary register
+    """
+
+    _check_engine(engine)
+
+    if engine == 'vbe':
+        return x_len, 8 * x_len - 2
+    if engine == 'qft':
+        n = int(np.ceil(np.log2(M)))
+        return n, n + 2
+    return int(np.ceil(np.log2(M))), 0
+
+def ctrl_modmul_register_lens(M: int, engine: str = 'vbe') -> Tuple[int, int]:
+    r"""Sizes of the registers used by `ctrl_modmul_gate` alone (e.g. by the semi-classical phase estimation) besides the control qubit.
+    The target register only holds $y<M$, so they are those of `modexp_register_lens` for $x_\mathit{len}=\lceil\log_2 M\rceil$ bits, which is also the `x_len` to pass to `ctrl_modmul_gate`.
+
+    Args:
+        M (int): $M$
+        engine (str): one of `ENGINES`
+
+    Returns:
+        a number of qubits of the target register and that of the auxiliary register
+    """
+
+    return modexp_register_lens(M=M, x_len=(M - 1).bit_length(), engine=engine)
+
+def modexp_gate(a: int, M: int, x_len: int, engine: str = 'vbe', x_0_at_first: bool = True, window: int = 1) -> Gate:
+    r"""Modular exponentiation $x,y\to x,ya^x\mod M$ by the chosen engine.
+
+    Args:
+        a (int): $a$
+        M (int): $M$
+        x_len (int): a number of bits for representing $x$
+        engine (str): one of `ENGINES`
+        x_0_at_first (bool): if True, it adds 1 into the target register before calculating modular exponentiation
+        window (int): a number of bits of $x$ for each multiplication (see `elementary.ax_modM_windowed`). Only `'vbe'` supports $w>1$
+
+    Returns:
+        its gate
+    """
+
+    _check_window(engine, window)
+
+    if engine == 'vbe' and window > 1:
+        return ax_modM_windowed(a=a, M=M, N_len=x_len, window=window, x_0_at_first=x_0_at_first)
+    if engine == 'vbe':
+        return ax_modM(a=a, M=M, N_len=x_len, x_0_at_first=x_0_at_first)
+    if engine == 'qft':
+        return ax_modM_qft(a=a, M=M, x_len=x_len, x_0_at_first=x_0_at_first)
+    return ax_modM_permutation(a=a, M=M, x_len=x_len, x_0_at_first=x_0_at_first)
+
+def modexp_ops(qubits: Sequence, a: int, M: int, x_len: int, engine: str = 'vbe', x_0_at_first: bool = True, window: int = 1) -> List[Tuple[Instruction, Sequence]]:
+    """The operations of `modexp_gate` on the given qubits, flattened down to the basic gates of the engine (see `elementary.append_ops`).
+    A circuit made of them needs no unrolling of nested gates, and no definition is kept for each gate.
+
+    Args:
+        qubits (Sequence): the qubits of $x$, the target register and the auxiliary register
+        a (int): $a$
+        M (int): $M$
+        x_len (int): a number of bits for representing $x$
+        engine (str): one of `ENGINES`
+        x_0_at_first (bool): see `modexp_gate`
+        window (int): see `modexp_gate`
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    _check_window(engine, window)
+
+    if engine == 'vbe' and window > 1:
+        return ax_modM_windowed_ops(qubits, a=a, M=M, N_len=x_len, window=window, x_0_at_first=x_0_at_first)
+    if engine == 'vbe':
+        return ax_modM_ops(qubits, a=a, M=M, N_len=x_len, x_0_at_first=x_0_at_first)
+    if engine == 'qft':
+        return ax_modM_qft_ops(qubits, a=a, M=M, x_len=x_len, x_0_at_first=x_0_at_first)
+    return ax_modM_permutation_ops(qubits, a=a, M=M, x_len=x_len, x_0_at_first=x_0_at_first)
+
+def ctrl_modmul_gate(a: int, M: int, x_len: int, engine: str = 'vbe') -> Gate:
+    r"""Controlled modular multiplication $y\to ay\mod M$ by the chosen engine, which is a step of `modexp_gate`.
+    It acts on a control qubit, then the target register and the auxiliary register of `modexp_register_lens`.
+
+    Args:
+        a (int): $a$, which must be coprime to $M$
+        M (int): $M$
+        x_len (int): a number of bits for representing $x$ in `modexp_gate`, which determines the register sizes
+        engine (str): one of `ENGINES`
+
+    Returns:
+        its gate
+    """
+
+    _check_engine(engine)
+
+    if engine == 'vbe':
+        return ctrl_ua_modM(a=a, M=M, N_len=x_len)
+    if engine == 'qft':
+        return ctrl_ua_modM_qft(a=a, M=M, n=int(np.ceil(np.log2(M))))
+    return ctrl_multi_modM_permutation(a=a, M=M)
+
+def ctrl_modmul_ops(qubits: Sequence, a: int, M: int, x_len: int, engine: str = 'vbe') -> List[Tuple[Instruction, Sequence]]:
+    """The operations of `ctrl_modmul_gate` on the given qubits, flattened like `modexp_ops`.
+
+    Args:
+        qubits (Sequence): the control qubit, then the qubits of the target register and the auxiliary register
+        a (int): $a$, which must be coprime to $M$
+        M (int): $M$
+        x_len (int): see `ctrl_modmul_gate`
+        engine (str): one of `ENGINES`
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    _check_engine(engine)
+
+    if engine == 'vbe':
+        return ctrl_ua_modM_ops(qubits, a=a, M=M, N_len=x_len)
+    if engine == 'qft':
+        return ctrl_ua_modM_qft_ops(qubits, a=a, M=M, n=int(np.ceil(np.log2(M))))
+    return [(ctrl_multi_modM_permutation(a=a, M=M), list(qubits))]
+
+@cached_gate
+def ctrl_multi_modM_permutation(a: int, M: int) -> Gate:
+    r"""Ctrl MULT MOD as a permutation matrix: $y\to ay\mod M$ if $\mathit{ctrl}=1$ and $y<M$, otherwise $y\to y$. It requires $1+\lceil\log_2 M\rceil$ qubits: $\mathit{ctrl}$ uses 1 qubit and $y$ uses the others.
+    The matrix is dense, since `branch.BranchSimulator` and Aer apply it as a single gate, so it holds $4^{1+\lceil\log_2 M\rceil}$ complex entries: 64 MiB for $M\le2^{10}$ and 1 GiB for $M\le2^{12}$. Beyond about 12 bits of $M$, use the engine `'vbe'` or `'qft'`.
+
+    Args:
+        a (int): $a$, which must be coprime to $M$
+        M (int): $M$
+
+    Returns:
+        its gate
+    """
+
+    if gcd(a, M) != 1:
+        raise ValueError(f'a={a} is not coprime to M={M}, so multiplication by a is not a permutation')
+
+    y_len = int(np.ceil(np.log2(M)))
+
+    # index of a basis state: ctrl + 2 * y
+    permutation = np.arange(2 ** (y_len + 1))
+    y = np.arange(M)
+    permutation[2 * y + 1] = 2 * (y * a % M) + 1
+
+    matrix = np.zeros((len(permutation), len(permutation)))
+    matrix[permutation, np.arange(len(permutation))] = 1
+
+    return UnitaryGate(matrix, label=f'{a}y mod {M}', check_input=False) # a permutation matrix is unitary, and the check takes cubic time
+
+@cached_gate
+def ax_modM_permutation(a: int, M: int, x_len: int, x_0_at_first: bool = True) -> Gate:
+    r"""Modular exponentiation, $a^x\mod M$, by `ctrl_multi_modM_permutation`. It requires $x_\mathit{len}+\lceil\log_2 M\rceil$ qubits: $x$ uses $x_\mathit{len}$ qubits and $y$ uses the others.
+
+    Args:
+        a (int): $a$
+        M (int): $M$
+        x_len (int): a number of bits for representing $x$
+        x_0_at_first (bool): if True, it adds 1 into the target register before calculating modular exponentiation
+
+    Returns:
+        its gate
+    """
+
+    y_len = int(np.ceil(np.log2(M)))
+
+    qc = QuantumCircuit(QuantumRegister(x_len + y_len))
+    append_ops(qc, ax_modM_permutation_ops(qc.qubits, a, M, x_len, x_0_at_first))
+    return qc.to_gate()
+
+def ax_modM_permutation_ops(qubits: Sequence, a: int, M: int, x_len: int, x_0_at_first: bool = True) -> List[Tuple[Instruction, Sequence]]:
+    r"""The operations of `ax_modM_permutation` on the given qubits (see `elementary.append_ops`).
+
+    Args:
+        qubits (Sequence): $x_\mathit{len}+\lceil\log_2 M\rceil$ qubits in the order of `ax_modM_permutation`
+        a (int): see `ax_modM_permutation`
+        M (int): see `ax_modM_permutation`
+        x_len (int): see `ax_modM_permutation`
+        x_0_at_first (bool): see `ax_modM_permutation`
+
+    Returns:
+        pairs of an operation and its qubits
+    """
+
+    qubits = list(qubits)
+    x, y = qubits[:x_len], qubits[x_len:]
+
+    ops = []
+    if x_0_at_first:
+        ops.append((XGate(), [y[0]]))
+    for i in range(x_len):
+        ops.append((ctrl_multi_modM_permutation(pow(a, 2 ** i, M), M), [x[i]] + y))
+
+    return ops
@@ -1,28 +1,197 @@
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 from math import gcd
 
 import numpy as np
-import matplotlib.pyplot as plt
-from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, Aer, transpile, assemble
-from qiskit.visualization import plot_histogram
-from sympy import Rational
-from sympy.ntheory.continued_fraction import continued_fraction, continued_fraction_convergents
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
 
-from qft import qft
-from elementary import ax_modM
-from classical_utils import lcm
+from .qft import qft
+from .modexp import modexp_gate, modexp_ops, modexp_register_lens, ctrl_modmul_gate, ctrl_modmul_ops, ctrl_modmul_register_lens
+from .elementary import append_ops
+from .classical_utils import lcm, batch_convergents, multiplicative_order
+from .circuit_cache import transpile_cached
+from .backends import get_backend
+from .execution import run_and_post_process, run_many
+from .result import RunResult, emit
+from .emulation import EmulatedBackend, order_finding_counts
 
-def order_finding(x: int, N: int, show_hist: Optional[bool] = False) -> int:
+class OrderNotFoundError(Exception):
+    """Raised by `order_finding` when no measured value gives the order."""
+
+def append_semi_classical_phase_estimation(qc: QuantumCircuit, control_qubit, target_qubits: list, a: int, M: int, x_len: int, classical_registers: List[ClassicalRegister], engine: str = 'vbe', approximation_degree: int = 0, flat: bool = False):
+    r"""Appends the semi-classical phase estimation [arXiv:quant-ph/9511007](https://arxiv.org/abs/quant-ph/9511007) of $y\to ay\mod M$.
+    It is equivalent to `modexp_gate` on $x$ followed by the inverse QFT and measurement of $x$, but $x$ is replaced by one control qubit which is measured and reset for each bit, and the controlled phases of the inverse QFT are conditioned on the measured bits.
+
+    Args:
+        qc (QuantumCircuit): the circuit to append
+        control_qubit: the control qubit
+        target_qubits (list): the target register followed by the auxiliary register (see `modexp.ctrl_modmul_register_lens`), which has to be prepared in $|1\rangle$
+        a (int): $a$
+        M (int): $M$
+        x_len (int): a number of bits of the estimate
+        classical_registers (List[ClassicalRegister]): `x_len` registers of 1 bit. The $i$-th one receives the $i$-th bit of the estimate
+        engine (str): the engine of modular exponentiation (see `modexp.ENGINES`)
+        approximation_degree (int): the conditioned phases are dropped as the controlled phases of `qft.qft`
+        flat (bool): if True, each controlled multiplication is appended as its basic gates (see `modexp.ctrl_modmul_ops`) instead of a nested gate
+    """
+
+    y_len = (M - 1).bit_length() # the registers of `modexp.ctrl_modmul_register_lens`
+    for i in range(x_len):
+        qc.h(control_qubit)
+        if flat:
+            append_ops(qc, ctrl_modmul_ops([control_qubit] + list(target_qubits), a=pow(a, 2 ** (x_len - 1 - i), M), M=M, x_len=y_len, engine=engine))
+        else:
+            qc.append(ctrl_modmul_gate(a=pow(a, 2 ** (x_len - 1 - i), M), M=M, x_len=y_len, engine=engine), [control_qubit] + list(target_qubits))
+        for j in range(max(i - (x_len - 1 - approximation_degree), 0), i):
+            qc.p(-np.pi / 2 ** (i - j), control_qubit).c_if(classical_registers[j], 1)
+        qc.h(control_qubit)
+        qc.measure(control_qubit, classical_registers[i][0])
+        qc.reset(control_qubit)
+
+def order_from_measurements(x: int, N: int, t: int, measured_values: Iterable[int], stats: Optional[dict] = None) -> Optional[int]:
+    r"""Classical post-processing of `order_finding`. It tries the denominators of the `classical_utils.convergents` of $\widetilde{s/r}$, and lcm of two denominators whose numerators are coprime.
+    The convergents of all the values are computed at once, and the denominators are indexed so that each lcm is tried only once.
+
+    Args:
+        x (int): $x$
+        N (int): $N$
+        t (int): a number of qubits of the first register
+        measured_values (Iterable[int]): measured values of the first register in order of priority
+        stats (Optional[dict]): if given, `'keys_examined'` is set to the number of distinct measured values examined
+
+    Returns:
+        order $r$, or None if it is not found
+    """
+
+    measured_values = list(measured_values)
+    all_convergents = batch_convergents(measured_values, t)
+
+    if stats is not None:
+        stats['keys_examined'] = 0
+
+    numerators_by_denominator: Dict[int, Set[int]] = {} # denominators of the convergents found so far
+    tried_r_candidates = set()
+    for keys_examined, measured_value in enumerate(dict.fromkeys(measured_values), 1):
+        if stats is not None:
+            stats['keys_examined'] = keys_examined
+        if measured_value == 0:
+            continue
+
+        for numerator, denominator in all_convergents[measured_value]:
+            if denominator >= N or numerator == 0: # $r<N$
+                continue
+            if denominator not in tried_r_candidates:
+                tried_r_candidates.add(denominator)
+                if pow(x, denominator, N) == 1:
+                    return denominator
+
+            for other_denominator, other_numerators in numerators_by_denominator.items():
+                r_candidate = lcm(denominator, other_denominator)
+                if r_candidate >= N or r_candidate in tried_r_candidates:
+                    continue
+                if any(gcd(numerator, other_numerator) == 1 for other_numerator in other_numerators):
+                    tried_r_candidates.add(r_candidate)
+                    if pow(x, r_candidate, N) == 1:
+                        return r_candidate
+
+            numerators_by_denominator.setdefault(denominator, set()).add(numerator)
+
+    return None
+
+def order_finding_width(N: int, t: int, engine: str = 'vbe', semi_classical: bool = False) -> Tuple[int, int, Optional[int]]:
+    r"""A number of qubits of `order_finding_circuit` and that of the qubits which can be entangled, i.e. all but the auxiliary register, and a bound of the number of basis states in superposition, for `backends.get_backend`.
+
+    Args:
+        N (int): $N$
+        t (int): a number of qubits of the first register
+        engine (str): see `order_finding_circuit`
+        semi_classical (bool): see `order_finding_circuit`
+
+    Returns:
+        the width, the number of the entangled qubits, and $2^{t}$ (the superposition of the first register, which the arithmetic only permutes) or None if `branch.BranchSimulator` does not fit (the engine `'qft'` or `semi_classical`)
+    """
+
+    second_register_len, auxiliary_register_len = ctrl_modmul_register_lens(M=N, engine=engine) if semi_classical else modexp_register_lens(M=N, x_len=t, engine=engine)
+    entangled_len = (1 if semi_classical else t) + second_register_len
+    branches = None if engine == 'qft' or semi_classical else 2 ** (t)
+    return entangled_len + auxiliary_register_len, entangled_len, branches
+
+def order_finding_circuit(x: int, N: int, t: int, engine: str = 'vbe', semi_classical: bool = False, approximation_degree: int = 0, flat: bool = False, window: int = 1) -> QuantumCircuit:
+    r"""The circuit of `order_finding` before transpilation.
+
+    Args:
+        x (int): $x$
+        N (int): $N$
+        t (int): a number of qubits of the first register
+        engine (str): the engine of modular exponentiation (see `modexp.ENGINES`)
+        semi_classical (bool): if True, the first register is replaced by one qubit (see `append_semi_classical_phase_estimation`). The measured bits are stored in $t$ registers of 1 bit
+        approximation_degree (int): the approximation degree of the inverse QFT (see `qft.qft`)
+        flat (bool): if True, the modular exponentiation is appended as its basic gates (see `modexp.modexp_ops`), so the transpiler has no nested gates to unroll and no definition is kept for each of them. The inverse QFT stays one gate, which `branch.BranchSimulator` applies by an FFT
+        window (int): a number of bits of the first register for each multiplication (see `modexp.modexp_gate`). It requires the first register, so not `semi_classical`
+
+    Returns:
+        the circuit which measures the first register
+    """
+
+    if semi_classical and window > 1:
+        raise ValueError('window requires the first register, which semi_classical replaces by one qubit')
+
+    second_register_len, auxiliary_register_len = ctrl_modmul_register_lens(M=N, engine=engine) if semi_classical else modexp_register_lens(M=N, x_len=t, engine=engine)
+
+    first_register = QuantumRegister(1 if semi_classical else t)
+    second_register = QuantumRegister(second_register_len)
+    auxiliary_register = QuantumRegister(auxiliary_register_len)
+
+    if semi_classical:
+        classical_registers = [ClassicalRegister(1) for _ in range(t)]
+        qc = QuantumCircuit(first_register, second_register, auxiliary_register, *classical_registers)
+
+        qc.x(second_register[0])
+        append_semi_classical_phase_estimation(qc, first_register[0], list(second_register) + list(auxiliary_register), a=x, M=N, x_len=t, classical_registers=classical_registers, engine=engine, approximation_degree=approximation_degree, flat=flat)
+
+        return qc
+
+    classical_register = ClassicalRegister(len(first_register))
+
+    qc = QuantumCircuit(first_register, second_register, auxiliary_register, classical_register)
+
+    qc.h(first_register)
+
+    if flat:
+        append_ops(qc, modexp_ops(qc.qubits, a=x, M=N, x_len=t, engine=engine, window=window))
+    else:
+        qc.append(modexp_gate(a=x, M=N, x_len=t, engine=engine, window=window), qc.qubits)
+
+    qc.append(qft(n=len(first_register), approximation_degree=approximation_degree).inverse(), first_register)
+
+    qc.measure(first_register, classical_register)
+
+    return qc
+
+def order_finding(x: int, N: int, show_hist: Optional[bool] = False, cache_dir: Optional[str] = None, engine: str = 'vbe', semi_classical: bool = False, approximation_degree: int = 0, shots: int = 10000, adaptive: bool = False, stats: Optional[dict] = None, return_result: bool = False, emulate: bool = False, flat: bool = False, window: int = 1) -> Union[int, RunResult]:
 #def order_finding(x: int, N: int, epsilon: Optional[float] = 0.2, show_hist: Optional[bool] = False) -> int:
     r"""Order-finding algorithm: it finds $r$ of $x^r\equiv 1\pmod N$. It requires 
 
     Args:
         x (int): $x$
         N (int): $N$
+        cache_dir (Optional[str]): if given, the transpiled circuit is stored in and loaded from this directory (see `circuit_cache.transpile_cached`)
+        engine (str): the engine of modular exponentiation (see `modexp.ENGINES`). `'permutation'` requires much fewer qubits than `'vbe'`
+        semi_classical (bool): if True, the semi-classical phase estimation is used, which requires $t-1$ fewer qubits, and also a smaller target register for `'vbe'` (see `append_semi_classical_phase_estimation`)
+        approximation_degree (int): the approximation degree of the inverse QFT, which drops its smallest rotations (see `qft.qft` and `qft.qft_fidelity_bound`)
+        shots (int): the number of shots, which is the budget if `adaptive` is True
+        adaptive (bool): if True, the shots are run in growing batches until $x^r\equiv 1\pmod N$ is verified (see `execution.run_and_post_process`)
+        stats (Optional[dict]): if given, `'shots'` is set to the number of shots used
+        return_result (bool): if True, a `result.RunResult` is returned instead of $r$. The result is passed to the hooks of `result.add_hook` in either case
+        emulate (bool): if True, no circuit is built, and the outcomes are sampled from the ideal distribution with $r$ computed classically (see `emulation.order_finding_counts`). It tests the post-processing for $N$ beyond the simulators
+        flat (bool): if True, the arithmetic is emitted directly into the circuit, which makes large circuits faster to build and transpile (see `order_finding_circuit`)
+        window (int): a number of bits of the first register for each modular multiplication, which divides their number (see `order_finding_circuit`)
 
     Returns:
         order $r$
 
+    Raises:
+        OrderNotFoundError: if no measured value gives $r$
+
     Examples:
 
     ```
@@ -37,59 +206,147 @@ def order_finding(x: int, N: int, show_hist: Optional[bool] = False) -> int:
     However, $\tilde{r}=2$ is a factor of $r$, so we can get correct $r$ by lcm with another $\tilde{r}$.
     """
 
-    L = int(np.ceil(np.log2(N)))
+    L = (N - 1).bit_length() # $\lceil\log_2 N\rceil$, which also works for $N$ beyond floats
     t = 2 * L# + 1 + int(np.ceil(np.log2(3 + 1 / (2 * epsilon)))) # epsilon requires too many qubits to run this program...
 
-    first_register = QuantumRegister(t)
-    second_register = QuantumRegister(2 * t)
-    auxiliary_register_mid = QuantumRegister(t)
-    auxiliary_register_end = QuantumRegister(6 * t - 2)
-    classical_register = ClassicalRegister(len(first_register))
+    result = RunResult('order_finding', params={'x': x, 'N': N, 't': t, 'engine': engine, 'semi_classical': semi_classical, 'approximation_degree': approximation_degree, 'shots': shots, 'adaptive': adaptive, 'emulate': emulate})
 
-    qc = QuantumCircuit(first_register, auxiliary_register_mid, second_register, auxiliary_register_end, classical_register)
-#    qc.add_register(first_register)
-#    qc.add_register(second_register)
-#    qc.add_register(classical_register)
+    if emulate:
+        r_emulated = multiplicative_order(x, N)
+        backend = EmulatedBackend(lambda shots, rng: order_finding_counts(x=x, N=N, t=t, shots=shots, r=r_emulated, rng=rng))
+        qc = None
+    else:
+        backend = get_backend(*order_finding_width(N=N, t=t, engine=engine, semi_classical=semi_classical))
+        qc = transpile_cached(
+            lambda: order_finding_circuit(x=x, N=N, t=t, engine=engine, semi_classical=semi_classical, approximation_degree=approximation_degree, flat=flat, window=window),
+            backend,
+            cache_dir=cache_dir,
+            algorithm='order_finding',
+            timings=result.timings,
+            x=x,
+            N=N,
+            t=t,
+            engine=engine,
+            semi_classical=semi_classical,
+            approximation_degree=approximation_degree,
+            flat=flat,
+            window=window,
+        )
 
-    qc.h(first_register)
+    post_process_stats = {}
+    def post_process(hist):
+        measured_values = hist.sorted().register(0, t).tolist() # the first register
+        return order_from_measurements(x=x, N=N, t=t, measured_values=measured_values, stats=post_process_stats)
 
-    #import pdb; pdb.set_trace()
-    #qc.append(ax_modM(a=x, M=N, N_len=len(first_register)), [first_register, auxiliary_register_mid, second_register, auxiliary_register_end])
-    qc.append(ax_modM(a=x, M=N, N_len=len(first_register)), qc.qubits[:10 * t - 2])
+    r, hist, shots_used = run_and_post_process(qc, backend, post_process, shots=shots, adaptive=adaptive, result=result)
+    if stats is not None:
+        stats['shots'] = shots_used
 
-    qc.append(qft(n=len(first_register)).inverse(), first_register)
-
-    qc.measure(first_register, classical_register)
-
-    backend = Aer.get_backend('aer_simulator_matrix_product_state')#('aer_simulator')
-    qc = transpile(qc, backend)
-    job = backend.run(qc, shots=10000)
-    hist = job.result().get_counts()
+    result.answer = r
+    result.keys_examined = post_process_stats.get('keys_examined')
+    emit(result)
 
     if show_hist:
-        plot_histogram(hist)
+        import matplotlib.pyplot as plt # deferred, since it is slow to import
+        from qiskit.visualization import plot_histogram
+
+        plot_histogram(hist.to_dict())
         plt.savefig(f'img/order_finding_x{x}_N{N}.png', bbox_inches='tight')
         #plt.savefig(f'img/order_finding_x{x}_N{N}_eps{epsilon}.png', bbox_inches='tight')
 
-    all_fractions = []
-    for measured_key, _ in sorted(hist.items(), key=lambda x: x[1], reverse=True):
-        tilde_s_per_r = Rational(int(measured_key[-t:], 2), 2 ** t)
-        if tilde_s_per_r == 0:
+    if r is not None:
+        return result if return_result else r
+
+    raise OrderNotFoundError('r is NOT found!')
+
+def order_finding_many(instances: Sequence[Tuple[int, int]], engine: str = 'vbe', semi_classical: bool = False, approximation_degree: int = 0, shots: int = 10000, flat: bool = False, window: int = 1) -> List[Union[int, Exception]]:
+    r"""`order_finding` of many instances by one backend job. The circuits are transpiled together and run as a job of multiple experiments (see `execution.run_many`), and each instance is post-processed independently.
+
+    Args:
+        instances (Sequence[Tuple[int, int]]): pairs of $x$ and $N$
+        engine (str): see `order_finding`
+        semi_classical (bool): see `order_finding`
+        approximation_degree (int): see `order_finding`
+        shots (int): the number of shots of each instance
+        flat (bool): see `order_finding`
+        window (int): see `order_finding`
+
+    Returns:
+        order $r$ of each instance in the same order, or the exception raised for it
+    """
+
+    results: List[Union[int, Exception, None]] = [None] * len(instances)
+    circuits, indices, ts = [], [], []
+    for i, (x, N) in enumerate(instances):
+        try:
+            t = 2 * (N - 1).bit_length() # as in `order_finding`
+            circuits.append(order_finding_circuit(x=x, N=N, t=t, engine=engine, semi_classical=semi_classical, approximation_degree=approximation_degree, flat=flat, window=window))
+        except Exception as e:
+            results[i] = e
             continue
+        indices.append(i)
+        ts.append(t)
 
-        fractions = []
-        for fraction in continued_fraction_convergents(continued_fraction(tilde_s_per_r)):
-            if pow(x, fraction.denominator, N) == 1:
-                return fraction.denominator
-            fractions.append(fraction)
+    widths, entangled_lens, branches = zip(*[order_finding_width(N=instances[i][1], t=t, engine=engine, semi_classical=semi_classical) for i, t in zip(indices, ts)] or [(0, 0, None)])
+    backend = get_backend(max(widths), max(entangled_lens), None if None in branches else max(branches))
+    for i, t, hist in zip(indices, ts, run_many(circuits, backend, shots=shots)):
+        if isinstance(hist, Exception):
+            results[i] = hist
+            continue
 
-            for other_fraction in all_fractions:
-                if math.gcd(fraction.numerator, other_fraction.numerator) == 1:
-                    r_candidate = lcm(fraction.denominator, other_fraction.denominator)
-                    if pow(x, r_candidate, N) == 1:
-                        return r_candidate
+        x, N = instances[i]
+        measured_values = hist.sorted().register(0, t).tolist()
+        r = order_from_measurements(x=x, N=N, t=t, measured_values=measured_values)
+        results[i] = r if r is not None else OrderNotFoundError('r is NOT found!')
+
+    return results
+
+_order_cache: Dict[Tuple[int, int], int] = {}
+
+def cached_order_finding(x: int, N: int, **kwargs) -> int:
+    r"""`order_finding` which remembers the found order of each $(x,N)$ in this process. The order is verified, so it does not depend on the other arguments.
+
+    Args:
+        x (int): $x$
+        N (int): $N$
+        kwargs: passed to `order_finding`
+
+    Returns:
+        order $r$
+    """
+
+    if (x, N) not in _order_cache:
+        _order_cache[(x, N)] = order_finding(x=x, N=N, **kwargs)
+    return _order_cache[(x, N)]
+
+def known_order(x: int, N: int) -> Optional[int]:
+    r"""The order of $x$ modulo $N$ remembered by `cached_order_finding` or `remember_order`.
+
+    Args:
+        x (int): $x$
+        N (int): $N$
+
+    Returns:
+        order $r$, or None if it is not known
+    """
+
+    return _order_cache.get((x, N))
+
+def remember_order(x: int, N: int, r: int):
+    r"""Remembers the order of $x$ modulo $N$ found elsewhere, e.g. in another process.
+
+    Args:
+        x (int): $x$
+        N (int): $N$
+        r (int): order $r$
+    """
+
+    _order_cache[(x, N)] = r
+
+def clear_order_cache():
+    """Forgets the orders remembered by `cached_order_finding`."""
 
-    raise Exception('r is NOT found!')
+    _order_cache.clear()
 
 
 if __name__ == '__main__':
@@ -2,27 +2,83 @@
 Uses https://qiskit.org/textbook/ja/ch-algorithms/quantum-counting.html#2.3-%E9%80%86%E9%87%8F%E5%AD%90%E3%83%95%E3%83%BC%E3%83%AA%E3%82%A8%E5%A4%89%E6%8F%9B
 """
 
+from typing import List, Sequence, Tuple
+
 import numpy as np
 from qiskit import QuantumCircuit
-from qiskit.circuit import Gate
+from qiskit.circuit import Gate, Instruction
+from qiskit.circuit.library import HGate, CPhaseGate, SwapGate
+
+from .elementary import append_ops
+
+def qft(n: int, approximation_degree: int = 0) -> Gate:
+    r"""Creates an n-qubit QFT circuit
+
+    Args:
+        n (int): a number of qubits
+        approximation_degree (int): the controlled phases `cp(pi/2**k)` with $k>n-1-\mathit{approximation\_degree}$ are dropped. 0 means the exact QFT, and $n-1-\lceil\log_2 n\rceil$ keeps only $O(n\log n)$ rotations. See `qft_fidelity_bound` for its error
+
+    Returns:
+        its gate, named `qft` if it is exact (and `qft_dg` for its inverse) so that `branch.BranchSimulator` applies it by an FFT
+    """
+    circuit = QuantumCircuit(n, name='qft' if approximation_degree == 0 else f'qft_approx{approximation_degree}')
+    append_ops(circuit, qft_ops(circuit.qubits, n, approximation_degree))
+    return circuit.to_gate()
+
+def qft_ops(qubits: Sequence, n: int, approximation_degree: int = 0) -> List[Tuple[Instruction, Sequence]]:
+    """The operations of `qft` on the given qubits (see `elementary.append_ops`)
+
+    Args:
+        qubits (Sequence): $n$ qubits
+        n (int): a number of qubits
+        approximation_degree (int): see `qft`
 
-def qft(n: int) -> Gate:
-    """Creates an n-qubit QFT circuit"""
-    circuit = QuantumCircuit(n)
-    def swap_registers(circuit, n):
+    Returns:
+        pairs of an operation and its qubits
+    """
+    qubits = list(qubits)
+    max_k = n - 1 - approximation_degree
+    h = HGate()
+    ops = []
+    def swap_registers(ops, n):
         for qubit in range(n//2):
-            circuit.swap(qubit, n-qubit-1)
-        return circuit
-    def qft_rotations(circuit, n):
+            ops.append((SwapGate(), [qubits[qubit], qubits[n-qubit-1]]))
+        return ops
+    def qft_rotations(ops, n):
         """Performs qft on the first n qubits in circuit (without swaps)"""
         if n == 0:
-            return circuit
+            return ops
         n -= 1
-        circuit.h(n)
+        ops.append((h, [qubits[n]]))
         for qubit in range(n):
-            circuit.cp(np.pi/2**(n-qubit), qubit, n)
-        qft_rotations(circuit, n)
-    
-    qft_rotations(circuit, n)
-    swap_registers(circuit, n)
-    return circuit.to_gate()
+            if n - qubit <= max_k:
+                ops.append((CPhaseGate(np.pi/2**(n-qubit)), [qubits[qubit], qubits[n]]))
+        qft_rotations(ops, n)
+
+    qft_rotations(ops, n)
+    swap_registers(ops, n)
+    return ops
+
+def qft_fidelity_bound(n: int, approximation_degree: int = 0) -> Tuple[float, float]:
+    r"""Bounds of the error of `qft` with `approximation_degree`.
+    Dropping `cp(pi/2**k)` moves the operator by $|1-e^{i\pi/2^k}|=2\sin(\pi/2^{k+1})$, and there are $n-k$ such rotations, so the operator norm distance $\epsilon$ from the exact QFT is at most their sum.
+    For every state $|\psi\rangle$, $|\langle\psi|U^\dagger V|\psi\rangle|\geq 1-\epsilon^2/2$.
+
+    Args:
+        n (int): a number of qubits
+        approximation_degree (int): see `qft`
+
+    Returns:
+        the bound of the operator norm distance and the lower bound of the fidelity
+
+    Examples:
+
+    ```
+    >>> qft_fidelity_bound(8, 0)
+    (0.0, 1.0)
+    ```
+    """
+
+    max_k = n - 1 - approximation_degree
+    epsilon = sum((n - k) * 2 * np.sin(np.pi / 2 ** (k + 1)) for k in range(max(max_k + 1, 1), n))
+    return float(epsilon), float(max(1 - epsilon ** 2 / 2, 0))
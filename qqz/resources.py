@@ -0,0 +1,261 @@
+r"""
+Analytical resource estimation of the circuits in `elementary`, without building them.
+
+The counts follow the construction of `elementary` gate by gate: e.g. Ctrl MULT MOD has two CCX for each 1 bit of $2^ia\mod M$.
+They are exact for X, CX, CCX and CSWAP after decomposing all the sub-gates, so they can be used for $M$ of thousands of bits.
+
+```
+>>> resources = ax_modM_resources(a=3, M=2 ** 512 - 569)
+>>> resources.qubits, resources.toffoli
+```
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Resources:
+    """Counts of a circuit after decomposing all the sub-gates.
+
+    Attributes:
+        qubits (int): a number of qubits
+        x (int): a number of X
+        cx (int): a number of CX
+        ccx (int): a number of CCX (Toffoli)
+        cswap (int): a number of CSWAP (Fredkin)
+        depth (int): an upper bound of the depth, which is the sum of the depths of the sub-gates appended in series
+    """
+
+    qubits: int
+    x: int = 0
+    cx: int = 0
+    ccx: int = 0
+    cswap: int = 0
+    depth: int = 0
+
+    @property
+    def toffoli(self) -> int:
+        """A number of Toffoli gates when a CSWAP is decomposed into a CCX between two CX"""
+
+        return self.ccx + self.cswap
+
+    @property
+    def cnot(self) -> int:
+        """A number of CNOT gates when a CSWAP is decomposed into a CCX between two CX"""
+
+        return self.cx + 2 * self.cswap
+
+    def __add__(self, other: 'Resources') -> 'Resources':
+        """Appends `other` in series on the same qubits (so `qubits` is the larger one)"""
+
+        return Resources(
+            qubits=max(self.qubits, other.qubits),
+            x=self.x + other.x,
+            cx=self.cx + other.cx,
+            ccx=self.ccx + other.ccx,
+            cswap=self.cswap + other.cswap,
+            depth=self.depth + other.depth,
+        )
+
+    def __mul__(self, times: int) -> 'Resources':
+        """Appends itself `times` times in series"""
+
+        return Resources(
+            qubits=self.qubits,
+            x=self.x * times,
+            cx=self.cx * times,
+            ccx=self.ccx * times,
+            cswap=self.cswap * times,
+            depth=self.depth * times,
+        )
+
+    __rmul__ = __mul__
+
+
+def _popcount(value: int) -> int:
+    try:
+        return value.bit_count()
+    except AttributeError: # Python < 3.10
+        return bin(value).count('1')
+
+def carry_resources() -> Resources:
+    """Resources of `elementary.carry` (and its inverse)"""
+
+    return Resources(qubits=4, cx=1, ccx=2, depth=3)
+
+def qsum_resources() -> Resources:
+    """Resources of `elementary.qsum`"""
+
+    return Resources(qubits=3, cx=2, depth=2)
+
+def adder_resources(n: int) -> Resources:
+    """Resources of `elementary.adder` (and its inverse)
+
+    Args:
+        n (int): $n$ bits for representing $a$
+
+    Returns:
+        its resources
+    """
+
+    # n CARRY, a CX and a SUM, and then n - 1 pairs of CARRY^\dagger and SUM
+    resources = carry_resources() * n + Resources(qubits=3 * n + 1, cx=1, depth=1) + qsum_resources() + (carry_resources() + qsum_resources()) * (n - 1)
+    return Resources(qubits=3 * n + 1, x=resources.x, cx=resources.cx, ccx=resources.ccx, cswap=resources.cswap, depth=resources.depth)
+
+@lru_cache(maxsize=None)
+def adder_modM_resources(M: int, N_len: int) -> Resources:
+    r"""Resources of `elementary.adder_modM` (and its inverse)
+
+    Args:
+        M (int): $M$
+        N_len (int): a number of bits for representing $a$
+
+    Returns:
+        its resources
+    """
+
+    M_weight = _popcount(M)
+    M_layer = 1 if M_weight > 0 else 0 # X on the 1 bits of M, which act on different qubits
+
+    return Resources(qubits=4 * N_len + 2, x=2 * M_weight + 2, cx=2 + 2 * M_weight, depth=2 * M_layer + 3 + 2 * M_weight + 1) + adder_resources(N_len) * 5
+
+@lru_cache(maxsize=None)
+def ctrl_multi_modM_resources(a: int, M: int, N_len: int) -> Resources:
+    r"""Resources of `elementary.ctrl_multi_modM` (and its inverse). The CCX loading $2^ia\mod M$ into $\mathit{xx}$ are counted from its 1 bits.
+
+    Args:
+        a (int): $a$
+        M (int): $M$
+        N_len (int): a number of bits for representing $x$
+
+    Returns:
+        its resources
+    """
+
+    loaded_bits = 0
+    value = a % M
+    for _ in range(N_len):
+        loaded_bits += _popcount(value) # 1 bits of $2^ia\mod M$
+        value <<= 1
+        if value >= M:
+            value -= M
+
+    # 2 CCX for each loaded bit, then X, N_len CCX copying x to y, and X
+    return Resources(qubits=9 * N_len - 1, x=2, ccx=2 * loaded_bits + N_len, depth=2 * loaded_bits + N_len + 2) + adder_modM_resources(M, 2 * N_len - 1) * N_len
+
+def ctrl_ua_modM_resources(a: int, M: int, N_len: int) -> Resources:
+    r"""Resources of `elementary.ctrl_ua_modM`
+
+    Args:
+        a (int): $a$, which must be coprime to $M$
+        M (int): $M$
+        N_len (int): a number of bits for representing $x$
+
+    Returns:
+        its resources
+    """
+
+    return ctrl_multi_modM_resources(a, M, N_len) + Resources(qubits=9 * N_len - 1, cswap=N_len, depth=N_len) + ctrl_multi_modM_resources(pow(a, -1, M), M, N_len)
+
+def ax_modM_resources(a: int, M: int, N_len: Optional[int] = None, x_0_at_first: bool = True) -> Resources:
+    r"""Resources of `elementary.ax_modM`. It takes $O(N_\mathit{len}^2)$ arithmetic operations on integers of $N_\mathit{len}$ bits for the bit patterns of $2^ia^{2^j}\mod M$.
+
+    Args:
+        a (int): $a$
+        M (int): $M$
+        N_len (int): a number of bits for representing $x$
+        x_0_at_first (bool): if True, it adds 1 into the target register before calculating modular exponentiation
+
+    Returns:
+        its resources
+
+    Examples:
+
+    ```
+    >>> ax_modM_resources(a=7, M=15)
+    Resources(qubits=38, x=337, cx=4800, ccx=4288, cswap=16, depth=9249)
+    ```
+    """
+
+    if N_len is None:
+        N_len = (M - 1).bit_length() # $\lceil\log_2 M\rceil$ without floats, which overflow for large $M$
+
+    resources = Resources(qubits=10 * N_len - 2, x=int(x_0_at_first), depth=int(x_0_at_first))
+    a_power = a % M # $a^{2^i}\mod M$
+    for _ in range(N_len):
+        resources += ctrl_ua_modM_resources(a_power, M, N_len)
+        a_power = a_power * a_power % M
+    return resources
+
+def _lookup_resources(window: int, table) -> Resources:
+    """Resources of the table lookup of `elementary.window_multi_modM` (and its inverse)"""
+
+    x = ccx = depth = 0
+    for k, value in enumerate(table):
+        if value == 0:
+            continue
+        zeros = window - _popcount(k)
+        x += 2 * zeros
+        ccx += 2 * (window - 1) + _popcount(value)
+        depth += 2 * int(zeros > 0) + 2 * (window - 1) + _popcount(value)
+    return Resources(qubits=0, x=x, ccx=ccx, depth=depth)
+
+@lru_cache(maxsize=None)
+def window_multi_modM_resources(a: int, M: int, N_len: int, window: int) -> Resources:
+    r"""Resources of `elementary.window_multi_modM` (and its inverse). The CCX of each table lookup are counted from the 1 bits of $2^ia^k\mod M$.
+
+    Args:
+        a (int): $a$
+        M (int): $M$
+        N_len (int): a number of bits for representing $x$
+        window (int): a number of bits of the window
+
+    Returns:
+        its resources
+    """
+
+    powers = [pow(a, k, M) for k in range(2 ** window)]
+
+    resources = Resources(qubits=window + 9 * N_len - 2)
+    for i in range(N_len):
+        resources += _lookup_resources(window, [2 ** i * power % M for power in powers]) * 2 # loaded and unloaded
+    return resources + adder_modM_resources(M, 2 * N_len - 1) * N_len
+
+def window_ua_modM_resources(a: int, M: int, N_len: int, window: int) -> Resources:
+    r"""Resources of `elementary.window_ua_modM`
+
+    Args:
+        a (int): $a$, which must be coprime to $M$
+        M (int): $M$
+        N_len (int): a number of bits for representing $x$
+        window (int): a number of bits of the window
+
+    Returns:
+        its resources
+    """
+
+    return window_multi_modM_resources(a, M, N_len, window) + Resources(qubits=window + 9 * N_len - 2, cx=3 * N_len, depth=3) + window_multi_modM_resources(pow(a, -1, M), M, N_len, window)
+
+def ax_modM_windowed_resources(a: int, M: int, N_len: Optional[int] = None, window: int = 2, x_0_at_first: bool = True) -> Resources:
+    r"""Resources of `elementary.ax_modM_windowed`, to be compared with `ax_modM_resources`.
+
+    Args:
+        a (int): $a$
+        M (int): $M$
+        N_len (int): a number of bits for representing $x$
+        window (int): a number of bits of $x$ for each multiplication
+        x_0_at_first (bool): if True, it adds 1 into the target register before calculating modular exponentiation
+
+    Returns:
+        its resources
+    """
+
+    if N_len is None:
+        N_len = (M - 1).bit_length()
+
+    resources = Resources(qubits=10 * N_len - 2, x=int(x_0_at_first), depth=int(x_0_at_first))
+    for i in range(0, N_len, window):
+        resources += window_ua_modM_resources(pow(a, 2 ** i, M), M, N_len, min(window, N_len - i))
+    return resources
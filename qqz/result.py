@@ -0,0 +1,108 @@
+"""
+Structured results of runs, and hooks which receive them (e.g. to send the metrics to telemetry)
+
+```
+>>> from qqz.result import add_hook
+>>> add_hook(lambda result: print(result.algorithm, result.timings))
+>>> order_finding(x=7, N=15, return_result=True).answer
+order_finding {'build': ..., 'transpile': ..., 'simulate': ..., 'post_process': ...}
+4
+```
+"""
+
+import time
+import warnings
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from .counts import Counts
+
+
+@dataclass
+class RunResult:
+    """A result of `order_finding`, `discrete_log`, `shor` or `grover`.
+
+    Attributes:
+        algorithm (str): the name of the algorithm
+        answer (Optional[int]): the answer, or None if it is not found
+        params (Dict[str, Any]): the arguments of the run
+        timings (Dict[str, float]): wall times in seconds of the phases `'build'`, `'transpile'` (or `'load'` on a hit of `circuit_cache.transpile_cached`), `'simulate'` and `'post_process'`
+        width (Optional[int]): a number of qubits of the transpiled circuit
+        depth (Optional[int]): the depth of the transpiled circuit
+        op_counts (Dict[str, int]): counts of the operations of the transpiled circuit
+        shots (int): a number of shots used
+        keys_examined (Optional[int]): a number of distinct measured values examined by the post-processing of the last batch
+        backend (Dict[str, Any]): the backend metadata from `job.result()`
+        counts (Optional[Counts]): the counts post-processed last, accumulated over the batches of the adaptive mode
+        sub_results (List[RunResult]): results of the runs used inside, e.g. `order_finding` in `discrete_log`
+    """
+
+    algorithm: str
+    answer: Optional[int] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    width: Optional[int] = None
+    depth: Optional[int] = None
+    op_counts: Dict[str, int] = field(default_factory=dict)
+    shots: int = 0
+    keys_examined: Optional[int] = None
+    backend: Dict[str, Any] = field(default_factory=dict)
+    counts: Optional[Counts] = None
+    sub_results: List['RunResult'] = field(default_factory=list)
+
+    def set_circuit(self, qc):
+        """Sets `width`, `depth` and `op_counts` from a transpiled circuit"""
+
+        self.width = qc.num_qubits
+        self.depth = qc.depth()
+        self.op_counts = dict(qc.count_ops())
+
+    def set_backend(self, job_result):
+        """Sets `backend` from `job.result()`"""
+
+        self.backend = {
+            'backend_name': job_result.backend_name,
+            'backend_version': job_result.backend_version,
+            'time_taken': job_result.time_taken,
+            'metadata': dict(getattr(job_result, 'metadata', None) or {}),
+            'experiment_metadata': [dict(experiment_result.metadata or {}) for experiment_result in job_result.results],
+        }
+
+
+_hooks: List[Callable[[RunResult], None]] = []
+
+
+def add_hook(hook: Callable[[RunResult], None]):
+    """Registers a hook which is called with every `RunResult`, even if the answer is not found.
+
+    Args:
+        hook (Callable[[RunResult], None]): the hook
+    """
+
+    _hooks.append(hook)
+
+def remove_hook(hook: Callable[[RunResult], None]):
+    """Unregisters a hook registered by `add_hook`"""
+
+    _hooks.remove(hook)
+
+def emit(result: RunResult):
+    """Calls the registered hooks with `result`. An exception raised by a hook is turned into a warning, so that telemetry does not break the run."""
+
+    for hook in list(_hooks):
+        try:
+            hook(result)
+        except Exception as e:
+            warnings.warn(f'hook {hook!r} raised {e!r}')
+
+@contextmanager
+def timed(timings: Optional[Dict[str, float]], phase: str):
+    """Adds the wall time of the block to `timings[phase]`, unless `timings` is None"""
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
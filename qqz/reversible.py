@@ -0,0 +1,164 @@
+r"""
+Classical simulation of reversible circuits of X, CX, CCX and CSWAP gates (e.g. those of `elementary`) on all the basis inputs at once
+
+The bits of each qubit are packed into 64-bit words, one bit per input, so a gate updates 64 inputs by a bitwise operation:
+
+* X: $q_t\leftarrow\lnot q_t$
+* CX: $q_t\leftarrow q_t\oplus q_c$
+* CCX: $q_t\leftarrow q_t\oplus(q_{c_1}\land q_{c_2})$
+* CSWAP: $d=(q_a\oplus q_b)\land q_c$, $q_a\leftarrow q_a\oplus d$, $q_b\leftarrow q_b\oplus d$
+
+```
+>>> from qqz.elementary import adder
+>>> a, b, c = simulate_registers(adder(2), [2, 3, 2], [np.array([1, 2, 3]), np.array([3, 3, 3]), np.zeros(3, dtype=int)])
+>>> b
+array([4, 5, 6], dtype=uint64)
+```
+"""
+
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import Gate
+
+
+REVERSIBLE_GATES = {'x': 0, 'cx': 1, 'ccx': 2, 'cswap': 3}
+"""The gate names supported and their opcodes in `reversible_ops`"""
+
+_ALL_ONES = np.uint64(2 ** 64 - 1)
+
+
+def reversible_ops(circuit: Union[QuantumCircuit, Gate]) -> np.ndarray:
+    """Flattens a circuit (or a gate with its definition) into the gates of `REVERSIBLE_GATES`. Each definition of a nested gate (e.g. `elementary.adder` in `elementary.adder_modM`) is flattened only once.
+
+    Args:
+        circuit (Union[QuantumCircuit, Gate]): the circuit
+
+    Returns:
+        an array of shape `(number of gates, 4)`, each row of which is the opcode and up to 3 qubit indices (X: target, CX: control and target, CCX: 2 controls and target, CSWAP: control and 2 targets)
+
+    Raises:
+        ValueError: if the circuit has another gate without a definition
+    """
+
+    flattened: Dict[int, np.ndarray] = {}
+
+    def flatten(definition: QuantumCircuit) -> np.ndarray:
+        if id(definition) in flattened:
+            return flattened[id(definition)]
+
+        blocks = []
+        rows = []
+        for instruction in definition.data:
+            operation = instruction.operation
+            qubits = [definition.find_bit(qubit).index for qubit in instruction.qubits]
+            if operation.name in REVERSIBLE_GATES:
+                rows.append([REVERSIBLE_GATES[operation.name]] + qubits + [0] * (3 - len(qubits)))
+                continue
+
+            if operation.name == 'barrier':
+                continue
+            if operation.definition is None:
+                raise ValueError(f'{operation.name} is not a reversible gate of {sorted(REVERSIBLE_GATES)}')
+
+            if rows:
+                blocks.append(np.array(rows, dtype=np.int64))
+                rows = []
+            ops = flatten(operation.definition).copy()
+            ops[:, 1:] = np.array(qubits, dtype=np.int64)[ops[:, 1:]] # to the qubits of this definition
+            blocks.append(ops)
+        if rows:
+            blocks.append(np.array(rows, dtype=np.int64))
+
+        ops = np.concatenate(blocks) if blocks else np.zeros((0, 4), dtype=np.int64)
+        flattened[id(definition)] = ops
+        return ops
+
+    if isinstance(circuit, Gate):
+        circuit = circuit.definition
+    return flatten(circuit)
+
+def pack(values: np.ndarray, width: int) -> np.ndarray:
+    r"""Packs integers into bit planes.
+
+    Args:
+        values (np.ndarray): integers in $[0,2^\mathit{width})$ with $\mathit{width}\le 64$, one for each input
+        width (int): a number of bits
+
+    Returns:
+        an array of shape `(width, words)` of `np.uint64`, whose bit $k$ of word $w$ of row $j$ is bit $j$ of `values[64w + k]`
+    """
+
+    values = np.asarray(values, dtype=np.uint64)
+    words = -(-len(values) // 64)
+    bits = (values[None, :] >> np.arange(width, dtype=np.uint64)[:, None]) & np.uint64(1)
+    packed = np.packbits(bits.astype(np.uint8), axis=1, bitorder='little')
+    packed = np.pad(packed, ((0, 0), (0, 8 * words - packed.shape[1])))
+    return packed.view(np.uint64)
+
+def unpack(planes: np.ndarray, size: int) -> np.ndarray:
+    """The inverse of `pack`.
+
+    Args:
+        planes (np.ndarray): bit planes of shape `(width, words)`
+        size (int): the number of inputs
+
+    Returns:
+        the integers of `np.uint64`
+    """
+
+    bits = np.unpackbits(np.ascontiguousarray(planes).view(np.uint8), axis=1, bitorder='little')[:, :size]
+    values = np.zeros(size, dtype=np.uint64)
+    for j in range(len(planes)):
+        values |= bits[j].astype(np.uint64) << np.uint64(j)
+    return values
+
+def simulate(ops: np.ndarray, planes: np.ndarray) -> np.ndarray:
+    """Applies the gates of `reversible_ops` to bit planes in place.
+
+    Args:
+        ops (np.ndarray): the gates
+        planes (np.ndarray): bit planes of shape `(num_qubits, words)`, e.g. from `pack`
+
+    Returns:
+        `planes`
+    """
+
+    for opcode, q0, q1, q2 in ops.tolist():
+        if opcode == 0:
+            planes[q0] ^= _ALL_ONES
+        elif opcode == 1:
+            planes[q1] ^= planes[q0]
+        elif opcode == 2:
+            planes[q2] ^= planes[q0] & planes[q1]
+        else:
+            difference = (planes[q1] ^ planes[q2]) & planes[q0]
+            planes[q1] ^= difference
+            planes[q2] ^= difference
+    return planes
+
+def simulate_registers(circuit: Union[QuantumCircuit, Gate, np.ndarray], register_lens: Sequence[int], values: Sequence[np.ndarray]) -> List[np.ndarray]:
+    """Evaluates a reversible circuit on many basis inputs at once. The qubits are split into registers in order (the first register on the lowest qubits), each of which holds an integer.
+
+    Args:
+        circuit (Union[QuantumCircuit, Gate, np.ndarray]): the circuit, or its gates of `reversible_ops` if it is evaluated repeatedly
+        register_lens (Sequence[int]): a number of qubits of each register, at most 64, whose sum is the number of qubits
+        values (Sequence[np.ndarray]): the input values of each register, which have the same length
+
+    Returns:
+        the output values of each register
+    """
+
+    ops = circuit if isinstance(circuit, np.ndarray) else reversible_ops(circuit)
+    size = len(values[0])
+    planes = np.concatenate([pack(register_values, register_len) for register_len, register_values in zip(register_lens, values)])
+
+    simulate(ops, planes)
+
+    outputs = []
+    start = 0
+    for register_len in register_lens:
+        outputs.append(unpack(planes[start:start + register_len], size))
+        start += register_len
+    return outputs
@@ -1,24 +1,143 @@
+import functools
 import random
 import math
-from typing import Optional
+import multiprocessing
+import os
+import queue
+from typing import Iterator, List, Optional, Tuple, Union
 
-import numpy as np
-import matplotlib.pyplot as plt
-from qiskit import QuantumCircuit, Aer, transpile, assemble
-from qiskit.visualization import plot_histogram
-from sympy import Rational
-from sympy.ntheory.continued_fraction import continued_fraction, continued_fraction_convergents
+from .backends import backend_options, configure_backend
+from .order_finding import OrderNotFoundError, order_finding, known_order, remember_order
+from .result import RunResult, emit, timed
 
-from qft import qft
-from elementary import ax_modM
-from order_finding import order_finding
 
+def factor_from_order(a: int, r: int, N: int) -> Optional[int]:
+    r"""Classical part of Shor's factoring algorithm: a non-trivial factor of $N$ from the order $r$ of $a$.
 
-def shor(N: int, show_hist: bool = False):
+    Args:
+        a (int): $a$
+        r (int): the order of $a$ modulo $N$
+        N (int): $N$
+
+    Returns:
+        $\gcd(a^{r/2}\pm 1,N)$ if it is a non-trivial factor, otherwise None
+    """
+
+    if r % 2 == 1:
+        return None
+    half_power = pow(a, r // 2, N)
+    if (half_power + 1) % N == 0:
+        return None
+
+    for factor_candidate in (math.gcd(half_power - 1, N), math.gcd(half_power + 1, N)):
+        if 1 < factor_candidate < N:
+            return factor_candidate
+    return None
+
+def _order_finding_trial(a: int, N: int, order_finding_kwargs: dict) -> Tuple[int, Optional[RunResult]]:
+    try:
+        return a, order_finding(x=a, N=N, return_result=True, **order_finding_kwargs)
+    except OrderNotFoundError:
+        return a, None
+
+def _random_bases(N: int) -> Iterator[int]:
+    # distinct bases in random order, drawn lazily since a factor is usually found after a few of them
+    tried = set()
+    while len(tried) < N - 2:
+        a = random.randrange(2, N)
+        if a not in tried:
+            tried.add(a)
+            yield a
+
+def _search_factor(N: int, order_finding_kwargs: dict, workers: Optional[int], sub_results: List[RunResult]) -> Optional[int]:
+    """The loop of `shor` over bases. The results of `order_finding` are appended to `sub_results`.
+
+    Returns:
+        a factor of $N$, or None if it is not found
+    """
+
+    bases = _random_bases(N)
+
+    if workers is None or workers <= 1:
+        for a in bases:
+            gcd = math.gcd(a, N)
+            if gcd != 1:
+                return gcd
+
+            r = known_order(a, N)
+            if r is None:
+                _, order_finding_result = _order_finding_trial(a, N, order_finding_kwargs)
+                if order_finding_result is None:
+                    continue
+                sub_results.append(order_finding_result)
+                r = order_finding_result.answer
+                remember_order(a, N, r)
+
+            factor_candidate = factor_from_order(a, r, N)
+            if factor_candidate is not None:
+                return factor_candidate
+
+        return None
+
+    # the options of configure_backend are passed to the workers, whose threads share the cores
+    options = backend_options()
+    if options['max_parallel_threads'] == 0:
+        options['max_parallel_threads'] = max((os.cpu_count() or 1) // workers, 1)
+    pool = multiprocessing.get_context('spawn').Pool(workers, initializer=functools.partial(configure_backend, **options)) # forking after Aer has started its OpenMP threads can deadlock
+    finished = queue.Queue() # the results and exceptions of the trials, in the order they finish
+    running = 0
+    try:
+        while True:
+            for a in bases:
+                gcd = math.gcd(a, N)
+                if gcd != 1:
+                    return gcd
+
+                r = known_order(a, N)
+                if r is not None:
+                    factor_candidate = factor_from_order(a, r, N)
+                    if factor_candidate is not None:
+                        return factor_candidate
+                    continue
+
+                pool.apply_async(_order_finding_trial, (a, N, order_finding_kwargs), callback=finished.put, error_callback=finished.put)
+                running += 1
+                if running >= workers:
+                    break
+            if not running:
+                break
+
+            outcome = finished.get()
+            running -= 1
+            if isinstance(outcome, BaseException):
+                raise outcome
+            a, order_finding_result = outcome
+            if order_finding_result is None:
+                continue
+            sub_results.append(order_finding_result)
+            r = order_finding_result.answer
+            remember_order(a, N, r)
+
+            factor_candidate = factor_from_order(a, r, N)
+            if factor_candidate is not None:
+                return factor_candidate
+    finally:
+        pool.terminate() # the trials still in progress are stopped too
+        pool.join()
+
+    return None
+
+def shor(N: int, show_hist: bool = False, engine: str = 'vbe', semi_classical: bool = False, workers: Optional[int] = None, return_result: bool = False) -> Union[int, RunResult]:
     """Shor's factoring algorithm: given $N\in\mathbb{Z}$, it finds a prime factor of $N$.
 
+    Bases $a$ are drawn without replacement, and their orders are remembered by `order_finding.remember_order`, so reruns skip the known bases.
+
     Args:
         N (int): $N$
+        engine (str): the engine of modular exponentiation used by `order_finding` (see `modexp.ENGINES`)
+        semi_classical (bool): if True, `order_finding` uses the semi-classical phase estimation
+        workers (Optional[int]): if more than 1, `order_finding` of that many bases runs in parallel processes, and the remaining work is cancelled as soon as a factor is verified. The workers use the options of `backends.configure_backend`, and share the cores unless `max_parallel_threads` is set
+        return_result (bool): if True, a `result.RunResult` is returned instead of the factor, whose `sub_results` has those of `order_finding` and whose `timings` has the wall time of the whole search as `'total'`. The result is passed to the hooks of `result.add_hook` in either case
 
     Returns:
         A prime factor of $N$
@@ -32,30 +151,21 @@ def shor(N: int, show_hist: bool = False):
     """
 
     if N % 2 == 0:
-        return 2
-
-    for _ in range(N):
-        a = random.randint(2, N - 1)
-        gcd = math.gcd(a, N)
-        if gcd != 1:
-            return gcd
+        result = RunResult('shor', answer=2, params={'N': N})
+        emit(result)
+        return result if return_result else 2
 
-        r = order_finding(x=a, N=N, show_hist=show_hist)
-
-        if r % 2 == 1:
-            continue
-        if (x ** (r // 2) + 1) % N == 0:
-            continue
-
-        factor_candidate = math.gcd(x ** (r // 2) - 1, N)
-        if N % factor_candidate == 0:
-            return factor_candidate
-        factor_candidate = math.gcd(x ** (r // 2) + 1, N)
-        if N % factor_candidate == 0:
-            return factor_candidate
+    order_finding_kwargs = {'show_hist': show_hist, 'engine': engine, 'semi_classical': semi_classical}
 
-    raise Exception('A prime factor is Not found!')
+    result = RunResult('shor', params={'N': N, 'engine': engine, 'semi_classical': semi_classical, 'workers': workers})
+    with timed(result.timings, 'total'):
+        result.answer = _search_factor(N, order_finding_kwargs, workers, result.sub_results)
+    result.shots = sum(sub_result.shots for sub_result in result.sub_results)
+    emit(result)
 
+    if result.answer is None:
+        raise Exception('A prime factor is Not found!')
+    return result if return_result else result.answer
 
 if __name__ == '__main__':
     print(shor(N=9))
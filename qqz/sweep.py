@@ -0,0 +1,384 @@
+r"""
+Sweeps of `shor`, `order_finding`, `discrete_log` and `grover` over families of instances, whose results are streamed to a JSONL file
+
+```
+python -m qqz.sweep order_finding --max-N 21 --output order_finding.jsonl --workers 4
+python -m qqz.sweep shor --max-N 35 --output shor.jsonl
+python -m qqz.sweep discrete_log --max-p 11 --engine permutation --output discrete_log.jsonl
+python -m qqz.sweep grover --N-lens 3 4 5 --output grover.jsonl
+python -m qqz.sweep plot order_finding.jsonl --output-dir img
+```
+
+Each line is a record of an instance written as soon as it finishes: the algorithm, its parameters, the answer (or the error), the wall time, the timings of `result.RunResult` and the measured counts.
+The file is the checkpoint: a sweep run again with the same output skips the instances already recorded, so an interrupted sweep resumes where it stopped. The options such as `--engine` are not a part of the key, so a sweep with other options needs another output.
+The histograms are not plotted while sweeping, but afterwards from the records by the `plot` subcommand (see `plot_records`).
+"""
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import gcd
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from . import backends
+from .backends import METHODS, configure_backend
+from .result import RunResult
+
+
+ALGORITHMS = ('shor', 'order_finding', 'discrete_log', 'grover')
+
+# the options of the sweep passed to each algorithm
+_ALGORITHM_OPTIONS = {
+    'shor': ('engine', 'semi_classical'),
+    'order_finding': ('engine', 'semi_classical', 'approximation_degree', 'shots', 'adaptive', 'emulate', 'flat', 'window', 'cache_dir'),
+    'discrete_log': ('engine', 'semi_classical', 'approximation_degree', 'shots', 'adaptive', 'emulate', 'flat', 'window', 'cache_dir'),
+    'grover': ('shots', 'adaptive', 'emulate', 'cache_dir'),
+}
+
+Instance = Tuple[str, Dict[str, int]]
+
+
+def _is_prime(n: int) -> bool:
+    return n >= 2 and all(n % d != 0 for d in range(2, int(n ** 0.5) + 1))
+
+def shor_instances(max_N: int, min_N: int = 9) -> List[Instance]:
+    r"""The odd composite $N$ in $[\mathit{min\_N},\mathit{max\_N}]$, since `shor` returns 2 for even $N$ without a circuit.
+
+    Args:
+        max_N (int): the largest $N$
+        min_N (int): the smallest $N$
+
+    Returns:
+        pairs of `'shor'` and the parameters
+    """
+
+    return [('shor', {'N': N}) for N in range(max(min_N, 3), max_N + 1) if N % 2 == 1 and not _is_prime(N)]
+
+def order_finding_instances(max_N: int, min_N: int = 3) -> List[Instance]:
+    r"""All the pairs of $N$ in $[\mathit{min\_N},\mathit{max\_N}]$ and $x\in[2,N)$ coprime to $N$.
+
+    Args:
+        max_N (int): the largest $N$
+        min_N (int): the smallest $N$
+
+    Returns:
+        pairs of `'order_finding'` and the parameters
+    """
+
+    return [('order_finding', {'x': x, 'N': N}) for N in range(min_N, max_N + 1) for x in range(2, N) if gcd(x, N) == 1]
+
+def discrete_log_instances(max_p: int, min_p: int = 3) -> List[Instance]:
+    r"""All the triples of a prime $p$ in $[\mathit{min\_p},\mathit{max\_p}]$, $a\in[2,p)$ and $b$ in the subgroup generated by $a$, for which $s$ exists.
+    The instances of the same $a$ and $p$ are consecutive, so that `discrete_log` finds the order once for them.
+
+    Args:
+        max_p (int): the largest $p$
+        min_p (int): the smallest $p$
+
+    Returns:
+        pairs of `'discrete_log'` and the parameters
+    """
+
+    instances = []
+    for p in range(min_p, max_p + 1):
+        if not _is_prime(p):
+            continue
+        for a in range(2, p):
+            powers = sorted({pow(a, s, p) for s in range(p - 1)})
+            instances.extend(('discrete_log', {'a': a, 'b': b, 'p': p}) for b in powers)
+    return instances
+
+def grover_instances(N_lens: Iterable[int]) -> List[Instance]:
+    """`grover.sample_oracle` of each size with `grover.optimal_k_time` iterations.
+
+    Args:
+        N_lens (Iterable[int]): the numbers of qubits of the search spaces
+
+    Returns:
+        pairs of `'grover'` and the parameters
+    """
+
+    from .grover import optimal_k_time, sample_predicate
+
+    return [('grover', {'N_len': N_len, 'k_time': optimal_k_time(N_len, int(sample_predicate(np.arange(2 ** N_len)).sum()))}) for N_len in N_lens]
+
+def instance_key(algorithm: str, params: Dict[str, int]) -> str:
+    """Key of an instance in the records.
+
+    Args:
+        algorithm (str): one of `ALGORITHMS`
+        params (Dict[str, int]): the parameters of the instance
+
+    Returns:
+        a JSON string
+    """
+
+    return json.dumps([algorithm, params], sort_keys=True)
+
+def _run_algorithm(algorithm: str, params: Dict[str, int], options: Dict[str, Any]) -> RunResult:
+    options = {name: value for name, value in options.items() if name in _ALGORITHM_OPTIONS[algorithm]}
+
+    if algorithm == 'shor':
+        from .shor import shor
+        return shor(**params, **options, return_result=True)
+    if algorithm == 'order_finding':
+        from .order_finding import order_finding
+        return order_finding(**params, **options, return_result=True)
+    if algorithm == 'discrete_log':
+        from .discrete_log import discrete_log
+        return discrete_log(**params, **options, return_result=True)
+
+    from .grover import grover, grover_emulated, sample_oracle, sample_predicate
+
+    if options.pop('emulate', False):
+        return grover_emulated(params['N_len'], sample_predicate, k_time=params['k_time'], shots=options.get('shots', 10000), return_result=True)
+    verify = lambda value: bool(sample_predicate(np.array([value]))[0])
+    return grover(params['N_len'], sample_oracle(params['N_len']), 1, params['k_time'], show_hist=False, verify=verify, return_result=True, **options)
+
+def _last_counts(result: RunResult) -> Optional[Dict[str, int]]:
+    for candidate in [result] + result.sub_results[::-1]:
+        if candidate.counts is not None:
+            return candidate.counts.to_dict()
+    return None
+
+def run_instance(algorithm: str, params: Dict[str, int], options: Dict[str, Any], save_counts: bool = True, seed: Optional[int] = None) -> Dict[str, Any]:
+    """Runs an instance and makes its record. An exception raised by the algorithm, e.g. when the answer is not found, is recorded as the error.
+
+    Args:
+        algorithm (str): one of `ALGORITHMS`
+        params (Dict[str, int]): the parameters of the instance
+        options (Dict[str, Any]): the options passed to the algorithm if it accepts them, e.g. `engine` and `shots`
+        save_counts (bool): if True, the counts of the last run (of the last `order_finding` for `shor`) are recorded for `plot_records`
+        seed (Optional[int]): if given, the simulator is seeded for this instance (see `backends.configure_backend`), so that the record does not depend on the worker which runs it. The previous seed is restored afterwards
+
+    Returns:
+        the record
+    """
+
+    previous_seed = backends.backend_options()['seed_simulator']
+    if seed is not None:
+        configure_backend(seed_simulator=seed)
+
+    record = {'algorithm': algorithm, 'params': params, 'answer': None, 'error': None}
+    start = time.perf_counter()
+    try:
+        result = _run_algorithm(algorithm, params, options)
+    except Exception as e:
+        record['error'] = repr(e)
+        result = None
+    finally:
+        if seed is not None:
+            configure_backend(seed_simulator=previous_seed)
+    record['wall_time'] = time.perf_counter() - start
+
+    if result is not None:
+        record['answer'] = result.answer
+        record['timings'] = result.timings
+        record['shots'] = result.shots or sum(sub_result.shots for sub_result in result.sub_results)
+        record['width'] = result.width
+        record['depth'] = result.depth
+        if save_counts:
+            record['counts'] = _last_counts(result)
+    return record
+
+def load_records(path: str) -> Dict[str, Dict[str, Any]]:
+    """Reads the records of a sweep, which may still be running. A line which is not a complete record, e.g. cut off by an interruption, is skipped.
+
+    Args:
+        path (str): the JSONL file
+
+    Returns:
+        a dict from `instance_key` to the last record of each instance
+    """
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'rb') as f:
+        lines = f.read().split(b'\n')
+
+    records = {}
+    for line in lines[:-1]: # the last one is empty, or being written
+        try:
+            record = json.loads(line)
+            records[instance_key(record['algorithm'], record['params'])] = record
+        except (ValueError, TypeError, KeyError):
+            continue
+    return records
+
+def _truncate_partial_line(path: str):
+    # the records appended after a line cut off by an interruption would be joined to it
+    if not os.path.exists(path):
+        return
+
+    with open(path, 'r+b') as f:
+        data = f.read()
+        complete_len = data.rfind(b'\n') + 1
+        if complete_len < len(data):
+            f.truncate(complete_len)
+
+def sweep(instances: Iterable[Instance], output: str, options: Optional[Dict[str, Any]] = None, workers: int = 1, retry_errors: bool = False, save_counts: bool = True, backend_options: Optional[Dict[str, Any]] = None, seed: Optional[int] = None) -> int:
+    """Runs the instances not recorded in `output` yet and appends the record of each as soon as it finishes.
+
+    Args:
+        instances (Iterable[Instance]): pairs of an algorithm and its parameters, e.g. by `order_finding_instances`
+        output (str): the JSONL file, which is also the checkpoint
+        options (Optional[Dict[str, Any]]): see `run_instance`
+        workers (int): if more than 1, the instances run in that many processes
+        retry_errors (bool): if True, the instances recorded with an error run again
+        save_counts (bool): see `run_instance`
+        backend_options (Optional[Dict[str, Any]]): passed to `backends.configure_backend` in each process. In this process, the previous options are restored afterwards
+        seed (Optional[int]): if given, each instance is seeded by it (see `run_instance`)
+
+    Returns:
+        the number of instances run
+    """
+
+    options = options or {}
+    backend_options = backend_options or {}
+
+    _truncate_partial_line(output)
+    records = load_records(output)
+    pending = []
+    for algorithm, params in instances:
+        record = records.get(instance_key(algorithm, params))
+        if record is None or (retry_errors and record['error'] is not None):
+            pending.append((algorithm, params))
+
+    with open(output, 'a') as f:
+        def write(record: Dict[str, Any]):
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+
+        if workers <= 1:
+            previous_backend_options = backends.backend_options()
+            configure_backend(**backend_options)
+            try:
+                for algorithm, params in pending:
+                    write(run_instance(algorithm, params, options, save_counts, seed))
+            finally:
+                configure_backend(**previous_backend_options)
+            return len(pending)
+
+        # forking after Aer has started its OpenMP threads can deadlock
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=functools.partial(configure_backend, **backend_options))
+        futures = [executor.submit(run_instance, algorithm, params, options, save_counts, seed) for algorithm, params in pending]
+        try:
+            for future in as_completed(futures):
+                write(future.result())
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    return len(pending)
+
+def plot_records(path: str, output_dir: str = 'img', algorithm: Optional[str] = None) -> List[str]:
+    """Plots the histogram of each record with counts into a PNG named after the algorithm and its parameters, e.g. `order_finding_x3_N5.png`.
+
+    Args:
+        path (str): the JSONL file of `sweep`
+        output_dir (str): the directory of the PNGs
+        algorithm (Optional[str]): if given, only its records are plotted
+
+    Returns:
+        the paths of the PNGs
+    """
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt # deferred, since it is slow to import
+    from qiskit.visualization import plot_histogram
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    paths = []
+    for record in load_records(path).values():
+        if not record.get('counts') or (algorithm is not None and record['algorithm'] != algorithm):
+            continue
+
+        figsize_x = max(7 * (len(record['counts']) // 8), 7)
+        fig = plot_histogram(record['counts'], figsize=(figsize_x, 5))
+        png_path = os.path.join(output_dir, record['algorithm'] + ''.join(f'_{name}{value}' for name, value in record['params'].items()) + '.png')
+        fig.savefig(png_path, bbox_inches='tight')
+        plt.close(fig)
+        paths.append(png_path)
+    return paths
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='python -m qqz.sweep', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = argparse.ArgumentParser(add_help=False)
+    run_parser.add_argument('--output', required=True)
+    run_parser.add_argument('--workers', type=int, default=1)
+    run_parser.add_argument('--retry-errors', action='store_true')
+    run_parser.add_argument('--no-counts', action='store_true')
+    run_parser.add_argument('--engine', default='vbe')
+    run_parser.add_argument('--semi-classical', action='store_true')
+    run_parser.add_argument('--approximation-degree', type=int, default=0)
+    run_parser.add_argument('--shots', type=int, default=10000)
+    run_parser.add_argument('--adaptive', action='store_true')
+    run_parser.add_argument('--emulate', action='store_true')
+    run_parser.add_argument('--flat', action='store_true')
+    run_parser.add_argument('--window', type=int, default=1)
+    run_parser.add_argument('--cache-dir')
+    run_parser.add_argument('--method', choices=METHODS, default='auto')
+    run_parser.add_argument('--max-parallel-threads', type=int, default=0)
+    run_parser.add_argument('--seed', type=int)
+
+    for algorithm in ('shor', 'order_finding'):
+        subparser = subparsers.add_parser(algorithm, parents=[run_parser])
+        subparser.add_argument('--min-N', type=int, default=9 if algorithm == 'shor' else 3)
+        subparser.add_argument('--max-N', type=int, required=True)
+    subparser = subparsers.add_parser('discrete_log', parents=[run_parser])
+    subparser.add_argument('--min-p', type=int, default=3)
+    subparser.add_argument('--max-p', type=int, required=True)
+    subparser = subparsers.add_parser('grover', parents=[run_parser])
+    subparser.add_argument('--N-lens', type=int, nargs='+', required=True)
+
+    plot_parser = subparsers.add_parser('plot')
+    plot_parser.add_argument('input')
+    plot_parser.add_argument('--output-dir', default='img')
+    plot_parser.add_argument('--algorithm', choices=ALGORITHMS)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'plot':
+        for png_path in plot_records(args.input, args.output_dir, args.algorithm):
+            print(png_path)
+        return
+
+    if args.command == 'shor':
+        instances = shor_instances(args.max_N, args.min_N)
+    elif args.command == 'order_finding':
+        instances = order_finding_instances(args.max_N, args.min_N)
+    elif args.command == 'discrete_log':
+        instances = discrete_log_instances(args.max_p, args.min_p)
+    else:
+        instances = grover_instances(args.N_lens)
+
+    options = {
+        'engine': args.engine,
+        'semi_classical': args.semi_classical,
+        'approximation_degree': args.approximation_degree,
+        'shots': args.shots,
+        'adaptive': args.adaptive,
+        'emulate': args.emulate,
+        'flat': args.flat,
+        'window': args.window,
+        'cache_dir': args.cache_dir,
+    }
+    backend_options = {'method': args.method, 'max_parallel_threads': args.max_parallel_threads}
+    ran = sweep(instances, args.output, options, workers=args.workers, retry_errors=args.retry_errors, save_counts=not args.no_counts, backend_options=backend_options, seed=args.seed)
+    print(f'{ran} of {len(instances)} instances run, recorded in {args.output}')
+
+
+if __name__ == '__main__':
+    main()
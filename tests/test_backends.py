@@ -0,0 +1,119 @@
+import unittest
+from unittest import mock
+
+from qiskit import QuantumCircuit
+
+from qqz.backends import (
+        configure_backend,
+        reset_backend,
+        backend_options,
+        select_method,
+        get_backend,
+        run,
+        )
+from qqz import backends, circuit_cache
+from qqz.circuit_cache import backend_name
+from qqz.discrete_log import discrete_log, discrete_log_multi, discrete_log_width
+from qqz.execution import get_counts, run_many
+from qqz.grover import grover, sample_oracle, sample_predicate
+from qqz.order_finding import order_finding, order_finding_many, order_finding_width, remember_order, clear_order_cache
+
+
+class TestBackends(unittest.TestCase):
+    def tearDown(self):
+        reset_backend()
+
+    def test_select_method(self):
+        self.assertEqual(select_method(10), 'statevector')
+        self.assertEqual(select_method(30), 'matrix_product_state')
+        self.assertEqual(select_method(20, entangled_qubits=4), 'matrix_product_state')
+        self.assertEqual(select_method(*order_finding_width(N=15, t=8)), 'branch')
+        self.assertEqual(select_method(*order_finding_width(N=15, t=8, semi_classical=True)), 'matrix_product_state')
+
+        configure_backend(method='statevector')
+        self.assertEqual(select_method(30), 'statevector')
+
+    def test_pool(self):
+        backend = get_backend(10)
+        self.assertIs(get_backend(12), backend)
+        self.assertEqual(backend_name(backend), 'aer_simulator_statevector')
+        self.assertEqual(backend_name(get_backend(method='matrix_product_state')), 'aer_simulator_matrix_product_state')
+
+        configure_backend(max_parallel_threads=1)
+        self.assertIsNot(get_backend(10), backend)
+        self.assertEqual(get_backend(10).options.max_parallel_threads, 1)
+        self.assertEqual(backend_options()['max_parallel_threads'], 1)
+
+        with self.assertRaises(ValueError):
+            configure_backend(unknown_option=1)
+        with self.assertRaises(ValueError):
+            get_backend()
+
+    def test_seed(self):
+        qc = QuantumCircuit(3, 3)
+        qc.h(range(3))
+        qc.measure(range(3), range(3))
+
+        def hists():
+            configure_backend(seed_simulator=1234)
+            backend = get_backend(3)
+            return [get_counts(run(backend, qc, shots=100)).to_dict() for _ in range(2)]
+
+        first_hists = hists()
+        self.assertEqual(hists(), first_hists)
+        self.assertNotEqual(first_hists[0], first_hists[1]) # a different seed for each run
+
+    def test_algorithms(self):
+        configure_backend(seed_simulator=0)
+        result = order_finding(x=7, N=15, engine='permutation', shots=1000, return_result=True)
+        self.assertEqual((result.answer, result.backend['experiment_metadata'][0]['method']), (4, 'statevector'))
+        result = grover(4, sample_oracle(4), 1, 1, show_hist=False, shots=1000, verify=lambda value: bool(sample_predicate(value)), return_result=True)
+        self.assertEqual(result.backend['experiment_metadata'][0]['method'], 'statevector')
+
+        configure_backend(method='matrix_product_state')
+        result = order_finding(x=7, N=15, engine='permutation', shots=1000, return_result=True)
+        self.assertEqual((result.answer, result.backend['experiment_metadata'][0]['method']), (4, 'matrix_product_state'))
+
+    def test_semi_classical(self):
+        # the target register of vbe is sized by N instead of t, so it fits the matrix product state method
+        self.assertEqual(order_finding_width(N=15, t=8, engine='vbe', semi_classical=True), (35, 5, None))
+        self.assertEqual(discrete_log_width(p=5, t=3, engine='vbe', semi_classical=True), (26, 4, None))
+
+        configure_backend(seed_simulator=0)
+        clear_order_cache()
+        self.assertEqual(order_finding(x=7, N=15, engine='permutation', semi_classical=True, shots=1000), 4)
+        self.assertEqual(discrete_log(a=2, b=3, p=5, engine='permutation', semi_classical=True, shots=1000), 3)
+        clear_order_cache()
+
+    def test_run_many_errors(self):
+        configure_backend(method='statevector')
+        small_qc = QuantumCircuit(2, 2)
+        small_qc.x(0)
+        small_qc.measure(range(2), range(2))
+        wide_qc = QuantumCircuit(40, 1)
+        wide_qc.h(0)
+        wide_qc.measure(0, 0)
+
+        hists = run_many([wide_qc, small_qc], get_backend(40), shots=100)
+        self.assertIsInstance(hists[0], Exception)
+        self.assertEqual(hists[1].to_dict(), {'01': 100})
+
+        results = order_finding_many([(2, 3), (7, 15)], engine='vbe', shots=100)
+        self.assertTrue(all(isinstance(result, Exception) for result in results))
+
+    def test_discrete_log_multi(self):
+        configure_backend(method='statevector', seed_simulator=0)
+        remember_order(2, 7, 3)
+        with mock.patch.object(circuit_cache, 'transpile', wraps=circuit_cache.transpile) as transpile_template, \
+                mock.patch.object(backends, 'transpile', wraps=backends.transpile) as transpile_targets:
+            self.assertEqual(discrete_log_multi(2, [1, 2, 4], 7, engine='permutation', shots=1000), [3, 1, 2])
+        clear_order_cache()
+
+        # the template is transpiled once, and the target halves are transpiled together and composed with it
+        self.assertEqual(transpile_template.call_count, 1)
+        self.assertEqual(transpile_targets.call_count, 1)
+        self.assertEqual(len(transpile_targets.call_args[0][0]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from itertools import product
+from math import gcd
+
+import numpy as np
+from qiskit import QuantumCircuit, transpile
+from qiskit_aer import AerSimulator
+
+from qqz.beauregard import (
+        phi_adder_modM,
+        ctrl_multi_modM_qft,
+        ctrl_ua_modM_qft,
+        ax_modM_qft,
+        )
+from qqz.qft import qft
+
+
+def basis_index(register_lens, values):
+    """The index of the basis state whose registers hold the values, the first register at the lowest bits"""
+
+    index, offset = 0, 0
+    for register_len, value in zip(register_lens, values):
+        index += value << offset
+        offset += register_len
+    return index
+
+
+class TestBeauregard(unittest.TestCase):
+    def assertBasisStates(self, qc, register_lens, cases):
+        """The circuit maps the basis state of the inputs to that of the expected values, up to a phase, for each pair of them.
+        All the inputs are run at once in superposition, entangled with a copy of their varying qubits, so that the outputs of different inputs do not interfere.
+        """
+
+        indices = [basis_index(register_lens, inputs) for inputs, _ in cases]
+        varying_qubits = [i for i in range(qc.num_qubits) if any(index >> i & 1 for index in indices)]
+        copies = [sum((index >> i & 1) << j for j, i in enumerate(varying_qubits)) for index in indices]
+
+        backend = AerSimulator(method='statevector')
+        body = QuantumCircuit(qc.num_qubits)
+        body.append(qc, body.qubits)
+        circuit = QuantumCircuit(qc.num_qubits + len(varying_qubits))
+        amplitudes = np.zeros(2 ** len(varying_qubits))
+        amplitudes[copies] = 1 / np.sqrt(len(cases))
+        copy_qubits = list(range(qc.num_qubits, circuit.num_qubits))
+        circuit.initialize(amplitudes, copy_qubits)
+        for i, copy_qubit in zip(varying_qubits, copy_qubits):
+            circuit.cx(copy_qubit, i)
+        circuit.compose(transpile(body, backend), range(qc.num_qubits), inplace=True)
+        circuit.save_statevector()
+
+        state = backend.run(circuit).result().get_statevector().data
+        for (inputs, expected), copy in zip(cases, copies):
+            probability = abs(state[basis_index(register_lens, expected) + (copy << qc.num_qubits)]) ** 2 * len(cases)
+            self.assertAlmostEqual(probability, 1, places=6, msg=f'inputs={inputs}, expected={expected}')
+
+    def test_phi_adder_modM(self):
+        for n in range(2, 4):
+            register_lens = [1, 1, n + 1, 1]
+            for M in range(2, 2 ** n):
+                for a in range(M):
+                    qc = QuantumCircuit(n + 4)
+                    b = list(range(2, n + 3))
+                    qc.append(qft(n + 1), b)
+                    qc.append(phi_adder_modM(a, M, n), range(n + 4))
+                    qc.append(qft(n + 1).inverse(), b)
+                    self.assertBasisStates(qc, register_lens, [([ctrl0, ctrl1, b_val, 0], [ctrl0, ctrl1, (a + b_val) % M if ctrl0 and ctrl1 else b_val, 0]) for ctrl0, ctrl1, b_val in product(range(2), range(2), range(M))])
+
+    def test_ctrl_multi_modM_qft(self):
+        n = 2
+        register_lens = [1, n, n + 1, 1]
+        for M in range(2, 2 ** n):
+            for a in range(M):
+                self.assertBasisStates(ctrl_multi_modM_qft(a, M, n), register_lens, [([ctrl, x, b, 0], [ctrl, x, (b + a * x) % M if ctrl else b, 0]) for ctrl, x, b in product(range(2), range(2 ** n), range(M))])
+
+    def test_ctrl_ua_modM_qft(self):
+        for n, Ms in [(2, [3]), (3, [5, 7])]:
+            register_lens = [1, n, n + 1, 1]
+            for M in Ms:
+                for a in range(1, M):
+                    if gcd(a, M) != 1:
+                        continue
+                    self.assertBasisStates(ctrl_ua_modM_qft(a, M, n), register_lens, [([ctrl, x, 0, 0], [ctrl, a * x % M if ctrl else x, 0, 0]) for ctrl, x in product(range(2), range(M))])
+
+    def test_ax_modM_qft(self):
+        for x_len, n, M in [(2, 2, 3), (3, 3, 5)]:
+            register_lens = [x_len, n, n + 1, 1]
+            for a in range(2, M):
+                if gcd(a, M) != 1:
+                    continue
+                self.assertBasisStates(ax_modM_qft(a, M, x_len), register_lens, [([x, 0, 0, 0], [x, pow(a, x, M), 0, 0]) for x in range(2 ** x_len)])
+                self.assertBasisStates(ax_modM_qft(a, M, x_len, x_0_at_first=False), register_lens, [([x, y, 0, 0], [x, pow(a, x, M) * y % M, 0, 0]) for x, y in product(range(2 ** x_len), range(M))])
+
+
+if __name__ == '__main__':
+    unittest.main()
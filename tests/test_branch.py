@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+from qiskit.quantum_info import Statevector
+
+from qqz.backends import configure_backend, reset_backend
+from qqz.branch import BranchSimulator
+from qqz.discrete_log import discrete_log_circuit, discrete_log_multi
+from qqz.execution import get_counts
+from qqz.grover import grover_circuit, sample_oracle
+from qqz.order_finding import order_finding, order_finding_circuit, order_finding_many, known_order, clear_order_cache
+
+
+def total_variation(qc, shots=100000):
+    measured_qubits = [qc.find_bit(instruction.qubits[0]).index for instruction in qc.data if instruction.operation.name == 'measure']
+    unmeasured_qc = qc.remove_final_measurements(inplace=False)
+    probabilities = Statevector(unmeasured_qc).probabilities(measured_qubits)
+
+    counts = get_counts(BranchSimulator().run(qc, shots=shots, seed_simulator=0))
+    frequencies = np.zeros(len(probabilities))
+    for value, count in zip(counts.values, counts.frequencies):
+        frequencies[int(value)] += count / shots
+    return np.abs(probabilities - frequencies).sum() / 2
+
+
+class TestBranch(unittest.TestCase):
+    def tearDown(self):
+        reset_backend()
+
+    def test_distributions(self):
+        for qc in [
+                order_finding_circuit(x=7, N=15, t=8, engine='permutation'),
+                order_finding_circuit(x=7, N=15, t=8, engine='permutation', approximation_degree=3),
+                order_finding_circuit(x=2, N=3, t=4, engine='qft'),
+                discrete_log_circuit(a=2, b=4, p=7, t=3, engine='permutation'),
+                grover_circuit(5, sample_oracle(5), 1, 2),
+                ]:
+            self.assertLess(total_variation(qc), 0.01)
+
+    def test_wide_circuits(self):
+        # 38 qubits, which the statevector and MPS methods of Aer cannot run here
+        result = order_finding(x=2, N=3, shots=1000, return_result=True)
+        self.assertEqual(result.answer, 2)
+        self.assertEqual(result.backend['experiment_metadata'][0]['method'], 'branch')
+        self.assertEqual(result.backend['experiment_metadata'][0]['max_branches_used'], 2 ** 4)
+
+        # 78 qubits, emitted flat with half of the multiplications
+        self.assertEqual(order_finding(x=7, N=15, shots=1000, flat=True, window=2), 4)
+
+        configure_backend(method='branch')
+        self.assertEqual(order_finding_many([(2, 3), (4, 5), (7, 15)], engine='permutation', shots=1000), [2, 2, 4])
+
+    def test_discrete_log_multi(self):
+        configure_backend(method='branch')
+        clear_order_cache()
+        self.assertEqual(discrete_log_multi(2, [1, 2, 4], 7, engine='permutation', shots=1000), [3, 1, 2])
+        self.assertEqual(known_order(2, 7), 3)
+        self.assertEqual(discrete_log_multi(2, [4], 7, engine='vbe', shots=1000, flat=True, window=2), [2])
+        clear_order_cache()
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            BranchSimulator().run(order_finding_circuit(x=7, N=15, t=8, engine='permutation', semi_classical=True))
+        with self.assertRaises(ValueError):
+            BranchSimulator(max_branches=2 ** 7).run(order_finding_circuit(x=7, N=15, t=8, engine='permutation'))
+
+
+if __name__ == '__main__':
+    unittest.main()
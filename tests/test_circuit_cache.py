@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from qiskit import QuantumCircuit
+
+from qqz.backends import get_backend, reset_backend
+from qqz.circuit_cache import gate_fingerprint, cache_key, _evict, transpile_cached
+
+
+def bell_circuit():
+    qc = QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure(range(2), range(2))
+    return qc
+
+
+class TestCircuitCache(unittest.TestCase):
+    def tearDown(self):
+        reset_backend()
+
+    def test_hit_and_miss(self):
+        backend = get_backend(method='statevector')
+        builds = []
+
+        def build():
+            builds.append(1)
+            return bell_circuit()
+
+        with tempfile.TemporaryDirectory() as directory:
+            timings = {}
+            qc = transpile_cached(build, backend, cache_dir=directory, algorithm='bell', timings=timings, x=1)
+            self.assertEqual((len(builds), set(timings)), (1, {'build', 'transpile'}))
+
+            timings = {}
+            cached_qc = transpile_cached(build, backend, cache_dir=directory, algorithm='bell', timings=timings, x=1)
+            self.assertEqual((len(builds), set(timings)), (1, {'load'})) # neither built nor transpiled
+            self.assertEqual(cached_qc, qc)
+
+            transpile_cached(build, backend, cache_dir=directory, algorithm='bell', x=2)
+            transpile_cached(build, get_backend(method='matrix_product_state'), cache_dir=directory, algorithm='bell', x=1)
+            self.assertEqual(len(builds), 3)
+            self.assertEqual(len(os.listdir(directory)), 3)
+
+            transpile_cached(build, backend, algorithm='bell', x=1) # no cache_dir
+            self.assertEqual(len(builds), 4)
+
+    def test_cache_key(self):
+        statevector = get_backend(method='statevector')
+        key = cache_key('order_finding', statevector, x=7, N=15, engine='vbe')
+        self.assertEqual(cache_key('order_finding', statevector, engine='vbe', N=15, x=7), key)
+        self.assertNotEqual(cache_key('order_finding', get_backend(method='matrix_product_state'), x=7, N=15, engine='vbe'), key)
+        self.assertNotEqual(cache_key('order_finding', statevector, x=7, N=15, engine='permutation'), key)
+        self.assertNotEqual(cache_key('order_finding', statevector, x=7, N=15, engine='vbe', approximation_degree=1), key)
+        self.assertNotEqual(cache_key('discrete_log', statevector, x=7, N=15, engine='vbe'), key)
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for i in range(4):
+                path = os.path.join(directory, f'{i}.qpy')
+                with open(path, 'wb') as f:
+                    f.write(b'0' * 100)
+                os.utime(path, (i, i)) # 0.qpy is the least recently used
+            with open(os.path.join(directory, 'other.txt'), 'wb') as f:
+                f.write(b'0' * 1000)
+
+            _evict(directory, 400)
+            self.assertEqual(len(os.listdir(directory)), 5)
+
+            _evict(directory, 250)
+            self.assertEqual(sorted(os.listdir(directory)), ['2.qpy', '3.qpy', 'other.txt'])
+
+    def test_gate_fingerprint(self):
+        def gate(angle):
+            inner = QuantumCircuit(2)
+            inner.cx(0, 1)
+            inner.rz(angle, 1)
+            qc = QuantumCircuit(3)
+            qc.h(0)
+            qc.append(inner.to_gate(), [2, 0])
+            return qc.to_gate()
+
+        # the anonymous names differ, but the definitions are the same
+        self.assertNotEqual(gate(0.5).name, gate(0.5).name)
+        self.assertEqual(gate_fingerprint(gate(0.5)), gate_fingerprint(gate(0.5)))
+        self.assertNotEqual(gate_fingerprint(gate(0.5)), gate_fingerprint(gate(0.25)))
+
+
+if __name__ == '__main__':
+    unittest.main()
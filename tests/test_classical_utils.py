@@ -0,0 +1,46 @@
+import unittest
+from fractions import Fraction
+
+from qqz.classical_utils import (
+        lcm,
+        decode_bin,
+        convergents,
+        batch_convergents,
+        )
+
+
+def fraction_convergents(numerator, denominator):
+    result = []
+    value = Fraction(numerator, denominator)
+    terms = []
+    while True:
+        terms.append(value.numerator // value.denominator)
+        fraction = Fraction(terms[-1])
+        for term in reversed(terms[:-1]):
+            fraction = term + 1 / fraction
+        result.append((fraction.numerator, fraction.denominator))
+        value -= terms[-1]
+        if value == 0:
+            return tuple(result)
+        value = 1 / value
+
+
+class TestClassicalUtils(unittest.TestCase):
+    def test_lcm(self):
+        self.assertEqual(lcm(4, 6), 12)
+        self.assertIsInstance(lcm(4, 6), int)
+
+    def test_decode_bin(self):
+        self.assertEqual(decode_bin('011'), 3)
+
+    def test_convergents(self):
+        for t in range(1, 8):
+            for value in range(2 ** t):
+                self.assertEqual(convergents(value, 2 ** t), fraction_convergents(value, 2 ** t))
+
+    def test_batch_convergents(self):
+        self.assertEqual(batch_convergents([3, 3, 0], 3), {3: ((0, 1), (1, 2), (1, 3), (3, 8)), 0: ((0, 1),)})
+
+
+if __name__ == '__main__':
+    unittest.main()
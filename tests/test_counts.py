@@ -0,0 +1,36 @@
+import unittest
+
+import numpy as np
+
+from qqz.counts import Counts
+
+
+class TestCounts(unittest.TestCase):
+    def test_from_dict(self):
+        counts = Counts.from_dict({'01 10': 3, '11 00': 1, '00 01': 3})
+        self.assertEqual(counts.num_bits, 4)
+        self.assertEqual(counts.shots, 7)
+        self.assertEqual(counts.values.tolist(), [0b0110, 0b1100, 0b0001])
+
+        first_values, second_values = counts.split([2, 2])
+        self.assertEqual(first_values.tolist(), [2, 0, 1])
+        self.assertEqual(second_values.tolist(), [1, 3, 0])
+        self.assertEqual(counts.register(1, 2).tolist(), [3, 2, 0])
+
+        self.assertEqual(counts.sorted().values.tolist(), [0b0110, 0b0001, 0b1100])
+        self.assertEqual(counts.to_dict(), {'0110': 3, '1100': 1, '0001': 3})
+
+    def test_merge(self):
+        counts = Counts.from_dict({'10': 2, '01': 1}).merge(Counts.from_samples(np.array([1, 3, 3]), 2))
+        self.assertEqual(counts.to_dict(), {'01': 2, '10': 2, '11': 2})
+        self.assertEqual(len(counts), 3)
+
+    def test_wide(self):
+        key = '1' + '0' * 69 + '1'
+        counts = Counts.from_dict({key: 5})
+        self.assertEqual(counts.values.tolist(), [2 ** 70 + 1])
+        self.assertEqual([values.tolist() for values in counts.split([1, 70])], [[1], [2 ** 69]])
+        self.assertEqual(counts.to_dict(), {key: 5})
+
+if __name__ == '__main__':
+    unittest.main()
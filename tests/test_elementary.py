@@ -1,66 +1,149 @@
 import unittest
+from math import gcd
 
 import numpy as np
-from sympy.physics.quantum.qubit import matrix_to_qubit
-from qiskit import QuantumCircuit, Aer, transpile
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Operator
 
 from qqz.elementary import (
         adder,
-        adder_modN,
-        ctrl_multi_modN,
-        ax_modN,
+        adder_modM,
+        ctrl_multi_modM,
+        ctrl_ua_modM,
+        ax_modM,
+        ax_modM_ops,
+        ax_modM_windowed,
+        window_ua_modM,
+        append_ops,
+        inverse_ops,
+        gate_cache_info,
+        clear_gate_cache,
         )
+from qqz.beauregard import ctrl_ua_modM_qft, ctrl_ua_modM_qft_ops
+from qqz.qft import qft, qft_ops
+from qqz.reversible import reversible_ops, simulate_registers
 
 
-def run_qc_and_get_ket_vector(qc):
-    backend = Aer.get_backend('aer_simulator_statevector')
-    qc = transpile(qc, backend)
-    qc.save_statevector()
+def grid(*ranges):
+    """All the combinations of the values, one array per range"""
 
-    job = backend.run(qc)
-    statevector = job.result().get_statevector(qc)
-    return matrix_to_qubit(np.array(statevector)[:, np.newaxis])
+    return [values.ravel() for values in np.meshgrid(*ranges, indexing='ij')]
 
+def zeros(size, count):
+    return [np.zeros(size, dtype=np.uint64) for _ in range(count)]
 
-class TestElementary(unittest.TestCase):
-    def test_adder(self):
-        qc = QuantumCircuit(2 + (2 + 1) + 2)
-        qc.x([0, 1])
-        qc.x(2)
-
-        qc.append(adder(2), range(2 + (2 + 1) + 2))
-
-        ket_vector = run_qc_and_get_ket_vector(qc)
-        self.assertEqual(str(ket_vector), '1.0*|0010011>')
-
-    def test_adder_modN(self):
-        qc = QuantumCircuit(2 + (2 + 1) + 2 + 2 + 1)
-        qc.x([0, 1])
-        qc.x(2)
-
-        qc.append(adder_modN(3), range(2 + (2 + 1) + 2 + 2 + 1))
-
-        ket_vector = run_qc_and_get_ket_vector(qc)
-        self.assertEqual(str(ket_vector), '1.0*|0000000111>')
 
-    def test_ctrl_multi_modN(self):
-        qc = QuantumCircuit(9 * 2 - 1)
-        qc.h(0)
-        qc.x(2)
-
-        qc.append(ctrl_multi_modN(a=2, N=3), range(9 * 2 - 1))
-
-        ket_vector = run_qc_and_get_ket_vector(qc)
-        self.assertEqual(str(ket_vector), '0.707106781186547*|00000000000001101> + 0.707106781186548*|00000000000010100>')
-
-    def test_ax_modN(self):
-        qc = QuantumCircuit(10 * 2 - 2)
-        qc.h([0, 1])
-
-        qc.append(ax_modN(a=2, N=3), range(10 * 2 - 2))
+class TestElementary(unittest.TestCase):
+    def assertRegisters(self, outputs, expected):
+        for output, expected_values in zip(outputs, expected):
+            np.testing.assert_array_equal(output, np.asarray(expected_values, dtype=np.uint64))
 
-        ket_vector = run_qc_and_get_ket_vector(qc)
-        self.assertEqual(str(ket_vector), '0.5*|000000000000000100> + 0.5*|000000000000000110> + 0.5*|000000000000001001> + 0.5*|000000000000001011>')
+    def test_adder(self):
+        for n in range(1, 6):
+            a, b = grid(np.arange(2 ** n), np.arange(2 ** n))
+            outputs = simulate_registers(adder(n), [n, n + 1, n], [a, b] + zeros(len(a), 1))
+            self.assertRegisters(outputs, [a, a + b, np.zeros(len(a))])
+
+    def test_adder_modM(self):
+        for N_len in range(1, 5):
+            for M in range(2, 2 ** N_len):
+                a, b = grid(np.arange(M), np.arange(M))
+                outputs = simulate_registers(adder_modM(M, N_len), [N_len, N_len + 1, N_len, N_len, 1], [a, b] + zeros(len(a), 3))
+                self.assertRegisters(outputs, [a, (a + b) % M] + [np.zeros(len(a))] * 3)
+
+    def test_ctrl_multi_modM(self):
+        for N_len in range(2, 4):
+            register_lens = [1, N_len, 2 * N_len] + [2 * N_len - 1] * 3 + [1]
+            for M in range(2, 2 ** N_len):
+                ctrl, x = grid(np.arange(2), np.arange(2 ** N_len))
+                for a in range(M):
+                    outputs = simulate_registers(ctrl_multi_modM(a, M, N_len), register_lens, [ctrl, x] + zeros(len(x), 5))
+                    self.assertRegisters(outputs, [ctrl, x, np.where(ctrl == 1, a * x % M, x)] + [np.zeros(len(x))] * 4)
+
+    def test_ctrl_ua_modM(self):
+        for N_len in range(2, 4):
+            register_lens = [1, N_len, 2 * N_len] + [2 * N_len - 1] * 3 + [1]
+            for M in range(2, 2 ** N_len):
+                ctrl, x = grid(np.arange(2), np.arange(M))
+                for a in range(1, M):
+                    if gcd(a, M) != 1:
+                        continue
+                    outputs = simulate_registers(ctrl_ua_modM(a, M, N_len), register_lens, [ctrl, x] + zeros(len(x), 5))
+                    self.assertRegisters(outputs, [ctrl, np.where(ctrl == 1, a * x % M, x)] + [np.zeros(len(x))] * 5)
+
+    def test_ax_modM(self):
+        for N_len, Ms in [(2, range(3, 4)), (3, [5, 7])]: # building the gates takes much longer than simulating them
+            register_lens = [N_len, N_len, 2 * N_len] + [2 * N_len - 1] * 3 + [1]
+            for M in Ms:
+                for a in range(2, M):
+                    if gcd(a, M) != 1:
+                        continue
+                    powers = np.array([pow(a, x, M) for x in range(2 ** N_len)])
+
+                    x = np.arange(2 ** N_len)
+                    outputs = simulate_registers(ax_modM(a, M, N_len), register_lens, [x] + zeros(len(x), 6))
+                    self.assertRegisters(outputs, [x, powers] + [np.zeros(len(x))] * 5)
+
+                    x, y = grid(np.arange(2 ** N_len), np.arange(M))
+                    outputs = simulate_registers(ax_modM(a, M, N_len, x_0_at_first=False), register_lens, [x, y] + zeros(len(x), 5))
+                    self.assertRegisters(outputs, [x, powers[x] * y % M] + [np.zeros(len(x))] * 5)
+
+    def test_window_ua_modM(self):
+        N_len, M = 3, 7
+        register_lens = [2, N_len, 2 * N_len] + [2 * N_len - 1] * 3 + [1]
+        k, x = grid(np.arange(4), np.arange(M))
+        for a in range(1, M):
+            outputs = simulate_registers(window_ua_modM(a, M, N_len, 2), register_lens, [k, x] + zeros(len(x), 5))
+            self.assertRegisters(outputs, [k, np.array([pow(a, int(k_val), M) for k_val in k]) * x % M] + [np.zeros(len(x))] * 5)
+
+    def test_ax_modM_windowed(self):
+        for N_len, M, windows in [(2, 3, [2]), (3, 7, [2, 3])]: # building the gates takes much longer than simulating them
+            register_lens = [N_len, N_len, 2 * N_len] + [2 * N_len - 1] * 3 + [1]
+            a = 2
+            powers = np.array([pow(a, x, M) for x in range(2 ** N_len)])
+            for window in windows:
+                x = np.arange(2 ** N_len)
+                outputs = simulate_registers(ax_modM_windowed(a, M, N_len, window), register_lens, [x] + zeros(len(x), 6))
+                self.assertRegisters(outputs, [x, powers] + [np.zeros(len(x))] * 5)
+
+                x, y = grid(np.arange(2 ** N_len), np.arange(M))
+                outputs = simulate_registers(ax_modM_windowed(a, M, N_len, window, x_0_at_first=False), register_lens, [x, y] + zeros(len(x), 5))
+                self.assertRegisters(outputs, [x, powers[x] * y % M] + [np.zeros(len(x))] * 5)
+
+    def test_flat_ops(self):
+        gate = ax_modM(2, 5, 3)
+        qc = QuantumCircuit(gate.num_qubits)
+        append_ops(qc, ax_modM_ops(qc.qubits, 2, 5, 3))
+        self.assertLessEqual(set(qc.count_ops()), {'x', 'cx', 'ccx', 'cswap'})
+        self.assertEqual(len(reversible_ops(qc)), len(reversible_ops(gate)))
+        register_lens = [3, 3, 6, 5, 5, 5, 1]
+        x, y = grid(np.arange(8), np.arange(5))
+        inputs = [x, y] + zeros(len(x), 5)
+        self.assertRegisters(simulate_registers(qc, register_lens, inputs), simulate_registers(gate, register_lens, inputs))
+
+        gate = ctrl_ua_modM_qft(2, 3, 2)
+        qc = QuantumCircuit(gate.num_qubits)
+        append_ops(qc, ctrl_ua_modM_qft_ops(qc.qubits, 2, 3, 2))
+        self.assertTrue(Operator(qc).equiv(Operator(gate)))
+
+        qc = QuantumCircuit(4)
+        append_ops(qc, inverse_ops(qft_ops(qc.qubits, 4)))
+        self.assertTrue(Operator(qc).equiv(Operator(qft(4).inverse())))
+
+    def test_gate_cache(self):
+        clear_gate_cache()
+        gate = ctrl_ua_modM(2, 5, 3)
+        info = gate_cache_info()
+        self.assertGreater(info['hits'], 0) # adder_modM is shared by the multiplications by $a$ and $a^{-1}$
+
+        self.assertIs(ctrl_ua_modM(a=2, M=5, N_len=3), gate)
+        self.assertIs(adder_modM(5, 5), adder_modM(M=5, N_len=5))
+        self.assertEqual(gate_cache_info()['hits'], info['hits'] + 3)
+        self.assertEqual(gate_cache_info()['misses'], info['misses'])
+
+        clear_gate_cache()
+        self.assertEqual(gate_cache_info()['size'], 0)
+        self.assertIsNot(ctrl_ua_modM(2, 5, 3), gate)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from qqz.classical_utils import multiplicative_order, baby_step_giant_step
+from qqz.emulation import (
+        sample_phase_estimation,
+        order_finding_counts,
+        discrete_log_counts,
+        )
+from qqz.order_finding import order_from_measurements
+
+
+class TestEmulation(unittest.TestCase):
+    def test_multiplicative_order(self):
+        for N in range(2, 100):
+            for x in range(1, N):
+                if np.gcd(x, N) == 1:
+                    r = multiplicative_order(x, N)
+                    self.assertEqual(pow(x, r, N), 1)
+                    self.assertTrue(all(pow(x, r_smaller, N) != 1 for r_smaller in range(1, r)))
+                    for s in range(r):
+                        self.assertEqual(baby_step_giant_step(x, pow(x, s, N), N), s)
+
+    def test_exact_phases(self):
+        # $2^t\varphi$ is an integer, so the outcome is deterministic
+        rng = np.random.default_rng(0)
+        values = sample_phase_estimation(np.array([0, 1, 2, 3]), 4, 6, window=None, rng=rng)
+        self.assertEqual(list(values), [0, 16, 32, 48])
+
+    def test_kernel(self):
+        rng = np.random.default_rng(0)
+        t = 3
+        values = sample_phase_estimation(np.ones(200000, dtype=int), 3, t, window=None, rng=rng)
+        frequencies = np.bincount(values.astype(int), minlength=2 ** t) / len(values)
+        delta = 2 ** t / 3 - np.arange(2 ** t)
+        expected = (np.sinc(delta) / np.sinc(delta / 2 ** t)) ** 2
+        np.testing.assert_allclose(frequencies, expected, atol=5e-3)
+
+    def test_order_finding_counts(self):
+        rng = np.random.default_rng(0)
+        N = 1000003 * 101
+        t = 2 * (N - 1).bit_length()
+        hist = order_finding_counts(2, N, t, 100, rng=rng)
+        measured_values = [int(measured_key, 2) for measured_key in sorted(hist, key=hist.get, reverse=True)]
+        self.assertEqual(order_from_measurements(2, N, t, measured_values), multiplicative_order(2, N))
+
+    def test_discrete_log_counts(self):
+        rng = np.random.default_rng(0)
+        hist = discrete_log_counts(2, 4, 7, 3, 1000, rng=rng)
+        self.assertEqual(sum(hist.values()), 1000)
+        self.assertTrue(all(len(measured_key) == 6 for measured_key in hist))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from qiskit import QuantumCircuit
+
+from qqz.backends import configure_backend, reset_backend, get_backend, transpile
+from qqz.execution import run_and_post_process
+from qqz.order_finding import order_finding, clear_order_cache
+from qqz.result import RunResult
+
+
+class TestExecution(unittest.TestCase):
+    def setUp(self):
+        qc = QuantumCircuit(1, 1)
+        qc.x(0)
+        qc.measure(0, 0)
+        self.backend = get_backend(1)
+        self.qc = transpile(qc, self.backend)
+
+    def tearDown(self):
+        reset_backend()
+
+    def run_adaptive(self, min_shots, shots):
+        """Adaptive run whose answer is verified once `min_shots` are accumulated, with the accumulated shots of each post-processing"""
+
+        seen_shots = []
+
+        def post_process(hist):
+            seen_shots.append(hist.shots)
+            return int(hist.values[0]) if hist.shots >= min_shots else None
+
+        result = RunResult('test')
+        answer, hist, shots_used = run_and_post_process(self.qc, self.backend, post_process, shots=shots, adaptive=True, initial_shots=32, growth=2, result=result)
+        self.assertEqual(hist.shots, shots_used)
+        self.assertEqual(result.shots, shots_used)
+        return answer, shots_used, seen_shots
+
+    def test_adaptive_stops_early(self):
+        self.assertEqual(self.run_adaptive(1, 10000), (1, 32, [32]))
+        self.assertEqual(self.run_adaptive(100, 10000), (1, 224, [32, 96, 224])) # batches of 32, 64 and 128
+
+    def test_adaptive_budget(self):
+        self.assertEqual(self.run_adaptive(10 ** 6, 100), (None, 100, [32, 96, 100])) # the last batch is cut to the budget
+
+    def test_not_adaptive(self):
+        answer, hist, shots_used = run_and_post_process(self.qc, self.backend, lambda hist: int(hist.values[0]), shots=500)
+        self.assertEqual((answer, hist.to_dict(), shots_used), (1, {'1': 500}, 500))
+
+    def test_order_finding(self):
+        configure_backend(seed_simulator=0)
+        clear_order_cache()
+        stats = {}
+        result = order_finding(x=7, N=15, engine='permutation', shots=10000, adaptive=True, stats=stats, return_result=True)
+        self.assertEqual(result.answer, 4)
+        self.assertLess(stats['shots'], 10000) # verified long before the budget
+        self.assertEqual((result.shots, result.counts.shots), (stats['shots'], stats['shots']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+from qiskit.quantum_info import Statevector
+
+from qqz.grover import (
+        MCZ_MODES,
+        mcz_ancillas,
+        grover_circuit,
+        grover_statevector,
+        grover_emulated,
+        optimal_k_time,
+        verify_oracle,
+        sample_oracle,
+        sample_predicate,
+        )
+
+
+class TestGrover(unittest.TestCase):
+    def test_grover_statevector(self):
+        for N_len, k_time in [(2, 1), (3, 1), (4, 2), (5, 3)]:
+            qc = grover_circuit(N_len, sample_oracle(N_len), 1, k_time)
+            qc.remove_final_measurements()
+            probabilities = Statevector(qc).probabilities(list(range(N_len)))
+            marked = sample_predicate(np.arange(2 ** N_len))
+            np.testing.assert_allclose(grover_statevector(N_len, marked, k_time) ** 2, probabilities, atol=1e-8)
+
+    def test_mcz_modes(self):
+        N_len = 6
+        marked = sample_predicate(np.arange(2 ** N_len))
+        for mcz_mode in MCZ_MODES:
+            qc = grover_circuit(N_len, sample_oracle(N_len), 1, 2, mcz_mode=mcz_mode)
+            qc.remove_final_measurements()
+            probabilities = Statevector(qc).probabilities(list(range(N_len)))
+            np.testing.assert_allclose(grover_statevector(N_len, marked, 2) ** 2, probabilities, atol=1e-8)
+
+        self.assertEqual(mcz_ancillas(N_len, 1, 'v-chain-dirty'), ('v-chain-dirty', 1, 2))
+        self.assertEqual(mcz_ancillas(N_len, 3, 'auto'), ('v-chain-dirty', 3, 0))
+
+    def test_optimal_k_time(self):
+        self.assertEqual(optimal_k_time(10, 1), 25)
+        self.assertEqual(optimal_k_time(2, 1), 1)
+        self.assertEqual(optimal_k_time(3, 0), 0)
+
+    def test_grover_emulated(self):
+        stats = {}
+        self.assertEqual(grover_emulated(12, lambda values: values == 1234, seed=0, stats=stats), 1234)
+        self.assertEqual(stats['k_time'], optimal_k_time(12, 1))
+
+    def test_verify_oracle(self):
+        for N_len in range(2, 6):
+            self.assertTrue(verify_oracle(N_len, sample_oracle(N_len), 1, sample_predicate))
+            self.assertFalse(verify_oracle(N_len, sample_oracle(N_len), 1, lambda values: values == 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
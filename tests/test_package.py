@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+import unittest
+
+
+class TestPackage(unittest.TestCase):
+    def test_shadowing_functions(self):
+        # a fresh interpreter, since the submodules are already imported by the other tests
+        code = '\n'.join([
+            'import qqz.order_finding, qqz.qft, qqz.shor',
+            'import qqz',
+            'from qqz import shor',
+            'assert callable(qqz.order_finding) and callable(qqz.qft) and callable(qqz.shor), (qqz.order_finding, qqz.qft, qqz.shor)',
+            'assert shor(9) == 3',
+        ])
+        subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+if __name__ == '__main__':
+    unittest.main()
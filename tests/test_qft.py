@@ -0,0 +1,31 @@
+import unittest
+
+import numpy as np
+from qiskit.quantum_info import Operator
+
+from qqz.qft import qft, qft_fidelity_bound
+
+
+class TestQFT(unittest.TestCase):
+    def test_fidelity_bound(self):
+        rng = np.random.default_rng(0)
+        for n in range(1, 7):
+            exact = Operator(qft(n)).data
+            states = rng.normal(size=(2 ** n, 64)) + 1j * rng.normal(size=(2 ** n, 64))
+            states = np.hstack([states / np.linalg.norm(states, axis=0), np.eye(2 ** n)])
+            for approximation_degree in range(n):
+                approximated = Operator(qft(n, approximation_degree=approximation_degree)).data
+                epsilon, fidelity = qft_fidelity_bound(n, approximation_degree)
+
+                distance = np.linalg.norm(exact - approximated, ord=2)
+                self.assertLessEqual(distance, epsilon + 1e-9, msg=f'n={n}, approximation_degree={approximation_degree}')
+                if approximation_degree == 0:
+                    self.assertEqual((epsilon, fidelity), (0.0, 1.0))
+                    self.assertAlmostEqual(distance, 0)
+
+                overlaps = np.abs(np.einsum('ij,ij->j', states.conj(), exact.conj().T @ approximated @ states))
+                self.assertGreaterEqual(overlaps.min(), fidelity - 1e-9, msg=f'n={n}, approximation_degree={approximation_degree}')
+
+
+if __name__ == '__main__':
+    unittest.main()
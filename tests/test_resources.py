@@ -0,0 +1,73 @@
+import unittest
+
+from qiskit import QuantumCircuit, transpile
+
+from qqz.elementary import (
+        adder,
+        adder_modM,
+        ctrl_multi_modM,
+        ctrl_ua_modM,
+        ax_modM,
+        window_ua_modM,
+        ax_modM_windowed,
+        )
+from qqz.resources import (
+        adder_resources,
+        adder_modM_resources,
+        ctrl_multi_modM_resources,
+        ctrl_ua_modM_resources,
+        ax_modM_resources,
+        window_ua_modM_resources,
+        ax_modM_windowed_resources,
+        )
+
+
+def decomposed_counts(gate):
+    qc = QuantumCircuit(gate.num_qubits)
+    qc.append(gate, qc.qubits)
+    qc = transpile(qc, basis_gates=['x', 'cx', 'ccx', 'cswap'], optimization_level=0)
+    counts = qc.count_ops()
+    return (qc.num_qubits, counts.get('x', 0), counts.get('cx', 0), counts.get('ccx', 0), counts.get('cswap', 0)), qc.depth()
+
+
+class TestResources(unittest.TestCase):
+    def assertResources(self, gate, resources):
+        counts, depth = decomposed_counts(gate)
+        self.assertEqual(counts, (resources.qubits, resources.x, resources.cx, resources.ccx, resources.cswap))
+        self.assertLessEqual(depth, resources.depth)
+
+    def test_adder(self):
+        for n in range(1, 5):
+            self.assertResources(adder(n), adder_resources(n))
+
+    def test_adder_modM(self):
+        for M, N_len in [(3, 2), (5, 3), (7, 3), (11, 4)]:
+            self.assertResources(adder_modM(M, N_len), adder_modM_resources(M, N_len))
+
+    def test_ctrl_multi_modM(self):
+        for a, M, N_len in [(2, 3, 2), (2, 5, 3), (3, 7, 3)]:
+            self.assertResources(ctrl_multi_modM(a, M, N_len), ctrl_multi_modM_resources(a, M, N_len))
+            self.assertResources(ctrl_ua_modM(a, M, N_len), ctrl_ua_modM_resources(a, M, N_len))
+
+    def test_ax_modM(self):
+        for a, M, N_len in [(2, 3, 2), (3, 7, 3)]:
+            for x_0_at_first in (True, False):
+                self.assertResources(ax_modM(a, M, N_len, x_0_at_first), ax_modM_resources(a, M, N_len, x_0_at_first))
+
+    def test_ax_modM_windowed(self):
+        for a, M, N_len, window in [(2, 3, 2, 2), (3, 7, 3, 2), (3, 7, 3, 3)]:
+            self.assertResources(window_ua_modM(a, M, N_len, window), window_ua_modM_resources(a, M, N_len, window))
+            self.assertResources(ax_modM_windowed(a, M, N_len, window), ax_modM_windowed_resources(a, M, N_len, window))
+
+        # half of the multiplications, each of which has a lookup of 4 entries
+        resources = ax_modM_windowed_resources(a=3, M=2 ** 16 - 15, window=2)
+        self.assertLess(resources.toffoli, ax_modM_resources(a=3, M=2 ** 16 - 15).toffoli * 0.6)
+
+    def test_large_M(self):
+        resources = ax_modM_resources(a=3, M=2 ** 64 - 59)
+        self.assertEqual(resources.qubits, 10 * 64 - 2)
+        self.assertEqual(resources.toffoli, resources.ccx + resources.cswap)
+
+
+if __name__ == '__main__':
+    unittest.main()
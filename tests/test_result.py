@@ -0,0 +1,45 @@
+import unittest
+
+from qqz.result import (
+        RunResult,
+        add_hook,
+        remove_hook,
+        emit,
+        timed,
+        )
+
+
+class TestResult(unittest.TestCase):
+    def test_hooks(self):
+        received = []
+        def failing_hook(result):
+            raise RuntimeError('telemetry is down')
+
+        add_hook(received.append)
+        add_hook(failing_hook)
+        try:
+            result = RunResult('order_finding', answer=4)
+            with self.assertWarns(UserWarning):
+                emit(result)
+        finally:
+            remove_hook(received.append)
+            remove_hook(failing_hook)
+
+        self.assertEqual(received, [result])
+        emit(result)
+        self.assertEqual(received, [result])
+
+    def test_timed(self):
+        timings = {}
+        for _ in range(2):
+            with timed(timings, 'simulate'):
+                pass
+        self.assertEqual(list(timings), ['simulate'])
+        self.assertGreaterEqual(timings['simulate'], 0)
+
+        with timed(None, 'simulate'):
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import multiprocessing
+import random
+import unittest
+
+from qqz.backends import configure_backend, reset_backend
+from qqz.order_finding import clear_order_cache
+from qqz.result import add_hook, remove_hook
+from qqz.shor import shor
+
+
+class TestShor(unittest.TestCase):
+    def tearDown(self):
+        reset_backend()
+        clear_order_cache()
+
+    def test_workers(self):
+        clear_order_cache()
+        configure_backend(method='matrix_product_state')
+        random.seed(0) # the bases 8, 14, 2, ... which are coprime to 15
+        result = shor(N=15, engine='permutation', workers=2, return_result=True)
+        self.assertIn(result.answer, (3, 5))
+        self.assertGreater(len(result.sub_results), 0)
+        self.assertEqual(result.sub_results[0].backend['experiment_metadata'][0]['method'], 'matrix_product_state') # configured in the workers too
+        self.assertEqual(multiprocessing.active_children(), []) # the remaining trials are stopped
+
+    def test_errors(self):
+        random.seed(0)
+        with self.assertRaises(ValueError): # only r NOT found is skipped
+            shor(N=15, engine='nope')
+        with self.assertRaises(ValueError): # raised in the workers too
+            shor(N=15, engine='nope', workers=2)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_even(self):
+        received = []
+        add_hook(received.append)
+        try:
+            self.assertEqual(shor(N=10), 2)
+        finally:
+            remove_hook(received.append)
+        self.assertEqual([(result.algorithm, result.answer) for result in received], [('shor', 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+
+from qqz.backends import backend_options, configure_backend, get_backend, reset_backend
+from qqz.sweep import (
+        order_finding_instances,
+        discrete_log_instances,
+        load_records,
+        sweep,
+        plot_records,
+        )
+
+
+class TestSweep(unittest.TestCase):
+    def tearDown(self):
+        reset_backend()
+
+    def test_instances(self):
+        self.assertEqual(order_finding_instances(5), [('order_finding', {'x': x, 'N': N}) for N, x in [(3, 2), (4, 3), (5, 2), (5, 3), (5, 4)]])
+        self.assertEqual([params['b'] for _, params in discrete_log_instances(7) if params['a'] == 2 and params['p'] == 7], [1, 2, 4])
+
+    def test_resume(self):
+        options = {'emulate': True, 'shots': 1000}
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'order_finding.jsonl')
+            self.assertEqual(sweep(order_finding_instances(5), output, options, seed=0), 5)
+
+            # a malformed line and an interrupted write of the next record, which plotting does not touch
+            with open(output, 'a') as f:
+                f.write('not a record\n{"algorithm": "order_')
+            self.assertEqual(len(load_records(output)), 5)
+            plot_records(output, os.path.join(directory, 'img'), algorithm='shor')
+            with open(output) as f:
+                self.assertTrue(f.read().endswith('"order_'))
+            self.assertEqual(sweep(order_finding_instances(7), output, options, seed=0), 6)
+
+            with open(output) as f:
+                records = f.read().splitlines()
+            self.assertEqual(len(records), 12)
+            self.assertEqual(load_records(output)[json.dumps(['order_finding', {'N': 7, 'x': 3}])]['answer'], 6)
+            self.assertEqual(sweep(order_finding_instances(7), output, options), 0)
+
+            paths = plot_records(output, os.path.join(directory, 'img'))
+            self.assertEqual(len(paths), 11)
+            self.assertTrue(os.path.exists(os.path.join(directory, 'img', 'order_finding_x3_N7.png')))
+
+    def test_backend_options(self):
+        configure_backend(seed_simulator=7)
+        backend = get_backend(3)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'order_finding.jsonl')
+            sweep(order_finding_instances(5), output, {'engine': 'permutation', 'shots': 100}, seed=0)
+            self.assertIs(get_backend(3), backend) # not discarded by seeding each instance
+            sweep(order_finding_instances(7), output, {'engine': 'permutation', 'shots': 100}, backend_options={'method': 'statevector'}, seed=0)
+        self.assertEqual((backend_options()['method'], backend_options()['seed_simulator']), ('auto', 7))
+
+    def test_workers(self):
+        options = {'emulate': True, 'shots': 1000}
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'order_finding.jsonl')
+            self.assertEqual(sweep(order_finding_instances(5), output, options, workers=2, seed=0), 5)
+            self.assertEqual(sweep(order_finding_instances(7), output, options, workers=2, backend_options={'method': 'statevector'}, seed=0), 6)
+            records = load_records(output)
+            self.assertEqual(len(records), 11)
+            self.assertTrue(all(record['error'] is None for record in records.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()